@@ -0,0 +1,7 @@
+"""
+Standalone performance benchmarks.
+
+Each module is runnable with ``python -m benchmarks.<name>`` from the project
+root. Benchmarks build their data in a throwaway test database, so they never
+touch ``db.sqlite3``.
+"""
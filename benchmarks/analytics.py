@@ -0,0 +1,81 @@
+"""
+Progression analytics: per-row Python versus the NumPy column path.
+
+    python -m benchmarks.analytics --sets 1000000
+
+Seeds one exercise's history and times both halves of
+/api/analytics/progression/. "load" fetches the rows: Decimal weights and
+date objects through values_list() before, float/ISO-text casts into arrays
+after. "compute" derives per-day best Epley 1RM, volume, trailing 7-day
+volume and PR flags: a Python loop before, workouts.analytics after.
+"""
+import argparse
+import datetime
+import json
+from collections import OrderedDict
+
+from benchmarks.utils import measure, seed_history, setup_django, test_database
+
+EXERCISE = 'Bench Press'
+
+
+def python_progression(rows):
+    days = OrderedDict()
+    for day, reps, weight in rows:
+        weight = float(weight)
+        estimate = weight if reps == 1 else weight * (1 + reps / 30)
+        best, volume = days.get(day, (0.0, 0.0))
+        days[day] = (max(best, estimate), volume + reps * weight)
+    result, running, window = [], float('-inf'), []
+    for day, (best, volume) in days.items():
+        window = [(d, v) for d, v in window if (day - d).days < 7] + [(day, volume)]
+        result.append((day, best, volume, sum(v for _, v in window), best > running))
+        running = max(running, best)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sets', type=int, default=1_000_000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from workouts import analytics
+    from workouts.models import Set
+
+    if analytics.np is None:
+        raise SystemExit("NumPy is not installed.")
+
+    with test_database():
+        user = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='x')
+        seed_history(user, args.sets, start=datetime.date(1900, 1, 1), exercise_names=[EXERCISE])
+
+        def load_before():
+            return list(
+                Set.objects.filter(user=user, exercise__name=EXERCISE)
+                .order_by('exercise__workout__date')
+                .values_list('exercise__workout__date', 'reps', 'weight')
+            )
+
+        def load_after():
+            return analytics.load_columns(user, EXERCISE)
+
+        rows, columns = load_before(), load_after()
+        results = {
+            'sets': args.sets,
+            'load': {
+                'before': measure(load_before, args.runs, warmup=1),
+                'after': measure(load_after, args.runs, warmup=1),
+            },
+            'compute': {
+                'before': measure(lambda: python_progression(rows), args.runs, warmup=1),
+                'after': measure(lambda: analytics.progression(*columns), args.runs, warmup=1),
+            },
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
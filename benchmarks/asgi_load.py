@@ -0,0 +1,133 @@
+"""
+Read throughput and tail latency by deployment: the sync views under
+gunicorn (config.wsgi), the same views under uvicorn (config.asgi), and the
+async views (/api/async/...) under uvicorn.
+
+    python -m benchmarks.asgi_load --workers 2 --connections 8,64 --duration 15
+
+Seeds one user's history into a file database, then for every deployment
+and connection count starts the server and keeps that many keep-alive
+connections busy with GETs of the workout and set lists and of a workout.
+Needs gunicorn and uvicorn.
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.sqlite_load import ROOT, SERVER_ENV, build_database, free_port
+from benchmarks.utils import summarize
+
+
+def deployments(workers):
+    gunicorn = [sys.executable, '-m', 'gunicorn', 'config.wsgi:application', '--workers', str(workers), '--log-level', 'warning']
+    uvicorn = [sys.executable, '-m', 'uvicorn', 'config.asgi:application', '--workers', str(workers), '--log-level', 'warning', '--no-access-log']
+    yield 'wsgi (gunicorn, sync views)', gunicorn, '/api/'
+    yield 'asgi (uvicorn, sync views)', uvicorn, '/api/'
+    yield 'asgi (uvicorn, async views)', uvicorn, '/api/async/'
+
+
+def start_server(command, database):
+    port = free_port()
+    bind = ['--bind', f'127.0.0.1:{port}'] if 'gunicorn' in command else ['--host', '127.0.0.1', '--port', str(port)]
+    server = subprocess.Popen(
+        [*command, *bind], cwd=ROOT, stderr=subprocess.DEVNULL,
+        env={**os.environ, **SERVER_ENV, 'SQLITE_PATH': str(database)},
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'{command[2]} exited with status {server.returncode}')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            return server, port
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('server did not start')
+
+
+def drive(port, token, prefix, workout_id, connections, duration):
+    paths = [f'{prefix}workouts/?page_size=20', f'{prefix}sets/?page_size=50', f'{prefix}workouts/{workout_id}/']
+    headers = {'Authorization': f'Bearer {token}'}
+    samples, statuses = [], {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local, local_statuses, i = [], {}, offset
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', paths[i % len(paths)], headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                status = 'connection error'
+            if status == 200:
+                local.append(time.perf_counter() - start)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+            i += 1
+        with lock:
+            samples.extend(local)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        'ok_per_second': round(len(samples) / duration, 1),
+        'errors': {str(status): count for status, count in statuses.items() if status != 200},
+        **(summarize(samples) if samples else {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='server worker processes')
+    parser.add_argument('--connections', default='8,64', help='concurrent connections to compare')
+    parser.add_argument('--duration', type=float, default=15, help='seconds per run')
+    parser.add_argument('--sets', type=int, default=20_000, help='seeded sets')
+    args = parser.parse_args()
+
+    results = {'workers': args.workers}
+    with tempfile.TemporaryDirectory() as directory:
+        template = Path(directory) / 'template.sqlite3'
+        token = build_database(template, args.sets)
+        from django.db import connections
+        from workouts.models import Workout
+        workout_id = Workout.objects.values_list('id', flat=True).first()
+        connections.close_all()
+        for name, command, prefix in deployments(args.workers):
+            results[name] = {}
+            for count in (int(n) for n in args.connections.split(',') if n):
+                database = Path(directory) / 'run.sqlite3'
+                shutil.copyfile(template, database)
+                server, port = start_server(command, database)
+                try:
+                    results[name][f'{count} connections'] = drive(
+                        port, token, prefix, workout_id, count, args.duration
+                    )
+                finally:
+                    server.terminate()
+                    server.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
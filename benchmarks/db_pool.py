@@ -0,0 +1,122 @@
+"""
+Connection handling per request: a new connection each time, persistent
+connections (CONN_MAX_AGE) and, on PostgreSQL, psycopg pools of several sizes.
+
+    python -m benchmarks.db_pool --threads 8 --requests 200
+    DB_ENGINE=postgresql DB_HOST=... python -m benchmarks.db_pool --pool-sizes 2,4,8,16
+
+Each configuration runs in its own process, configured through the same
+environment variables as the settings. Client threads send GET
+/api/workouts/ and /api/sets/ through the Django test client, which opens
+and releases connections at request boundaries the way a threaded server
+does. SQLite runs the new-connection and persistent cases only.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.utils import seed_history, setup_django, summarize, test_database
+
+URLS = ('/api/workouts/?page_size=20', '/api/sets/?page_size=50')
+
+# Caches and throttles would decide what reaches the database.
+BENCH_ENV = {
+    'RESPONSE_CACHE_TTL': '0',
+    'THROTTLE_RATE_USER': '1000000/minute',
+    'THROTTLE_RATE_SETS': '1000000/minute',
+}
+
+
+def configurations(engine, pool_sizes):
+    yield 'new connection per request', {'DB_CONN_MAX_AGE': '0'}
+    yield 'persistent (CONN_MAX_AGE=60)', {'DB_CONN_MAX_AGE': '60'}
+    if engine == 'postgresql':
+        for size in pool_sizes:
+            yield f'pool max_size={size}', {'DB_POOL_MAX_SIZE': str(size), 'DB_POOL_MIN_SIZE': str(size)}
+
+
+def run(threads, requests, total_sets):
+    """One configuration, in this process: returns its summary."""
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.test import Client
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    if os.environ.get('DB_ENGINE', 'sqlite') == 'sqlite':
+        # A file database (main() picks the path): the in-memory test
+        # database never reconnects.
+        call_command('migrate', verbosity=0)
+        context = None
+    else:
+        context = test_database()
+        context.__enter__()
+    try:
+        user = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='x')
+        seed_history(user, total_sets)
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        samples, errors = [], []
+        lock = threading.Lock()
+
+        def client(offset):
+            local, failed = [], 0
+            test_client = Client(headers=headers, HTTP_HOST='localhost')
+            for i in range(requests):
+                start = time.perf_counter()
+                response = test_client.get(URLS[(offset + i) % len(URLS)])
+                local.append(time.perf_counter() - start)
+                failed += response.status_code != 200
+            with lock:
+                samples.extend(local)
+                errors.append(failed)
+
+        workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        return {'requests_per_second': round(len(samples) / elapsed, 1), 'errors': sum(errors), **summarize(samples)}
+    finally:
+        if context is not None:
+            context.__exit__(None, None, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='requests per thread')
+    parser.add_argument('--sets', type=int, default=20_000, help='seeded sets')
+    parser.add_argument('--pool-sizes', default='2,4,8,16', help='PostgreSQL pool max sizes to compare')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run(args.threads, args.requests, args.sets)))
+        return
+
+    engine = os.environ.get('DB_ENGINE', 'sqlite')
+    results = {'engine': engine, 'threads': args.threads, 'requests_per_thread': args.requests}
+    pool_sizes = [int(size) for size in args.pool_sizes.split(',') if size]
+    with tempfile.TemporaryDirectory() as directory:
+        for index, (name, env) in enumerate(configurations(engine, pool_sizes)):
+            sqlite_path = str(Path(directory) / f'{index}.sqlite3')
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.db_pool', '--child', '--threads', str(args.threads),
+                 '--requests', str(args.requests), '--sets', str(args.sets)],
+                env={**os.environ, **BENCH_ENV, 'SQLITE_PATH': sqlite_path, **env},
+                capture_output=True, text=True, check=True,
+            ).stdout
+            results[name] = json.loads(output.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+"""
+Every endpoint in workouts/urls.py and users/urls.py through the Django test
+client, against a generated dataset: requests per second, latency
+percentiles, queries and allocated memory per request, as JSON.
+
+    python -m benchmarks.endpoints --users 10 --years 2 --output baseline.json
+    python -m benchmarks.endpoints --users 10 --years 2 --compare baseline.json
+    python -m benchmarks.endpoints --only workout,set-batch --runs 50
+
+The dataset comes from workouts.dataset (what `manage.py generate_dataset`
+writes) in the test database. Requests are made as the first generated user,
+one at a time, after a few warm-up requests; whatever a request needs first
+(a fresh row to delete, an unused refresh token) is prepared outside the
+timing. One more request per endpoint runs with queries captured and
+tracemalloc on. Reads go first, so the writes' rows do not change what they
+return.
+
+With --compare, an endpoint whose p50 or p95 grew by more than --tolerance
+over the baseline, or that runs more queries, is reported as a regression
+and the exit status is 1. Response caching and throttling are off unless
+set in the environment (RESPONSE_CACHE_TTL, THROTTLE_RATE_*).
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import ExitStack
+
+from benchmarks.sqlite_load import ROOT, SERVER_ENV
+from benchmarks.utils import setup_django, summarize, test_database
+
+BENCH_ENV = {
+    **SERVER_ENV,
+    'THROTTLE_RATE_LOGIN': '1000000/minute',
+    'THROTTLE_RATE_REGISTER': '1000000/minute',
+}
+
+PASSWORD = 'bench-password'
+
+NEW_WORKOUT = {
+    'name': 'Benchmark Push',
+    'exercises': [
+        {'name': name, 'sets': [{'set_number': n, 'reps': 8, 'weight': '60.0'} for n in range(1, 5)]}
+        for name in ('Bench Press', 'Overhead Press', 'Dip')
+    ],
+}
+
+IMPORT_CSV = 'date,workout,exercise,set_number,reps,weight\n' + ''.join(
+    f'{{date}},Imported,{name},{n},5,100\n' for name in ('Squat', 'Lunge') for n in range(1, 5)
+)
+
+
+class Fixture:
+    """The benchmark user's rows, and throwaway ones for requests that use them up."""
+
+    def __init__(self, user):
+        from workouts.models import Exercise, Set, Workout
+
+        self.user = user
+        self.workout_ids = itertools.cycle(Workout.objects.filter(user=user).values_list('id', flat=True))
+        self.exercise_ids = itertools.cycle(Exercise.objects.filter(user=user).values_list('id', flat=True))
+        self.set_ids = itertools.cycle(Set.objects.filter(user=user).values_list('id', flat=True))
+        self.counter = itertools.count()
+
+    def next(self):
+        return next(self.counter)
+
+    def day(self):
+        # Far enough ahead that new workouts do not mix with the generated ones.
+        return (datetime.date.today() + datetime.timedelta(days=400 + self.next())).isoformat()
+
+    def throwaway_workout(self):
+        from workouts.models import Exercise, Set, Workout
+
+        workout = Workout.objects.create(user=self.user, date=self.day(), name='Throwaway')
+        exercise = Exercise.objects.create(workout=workout, user=self.user, name='Squat')
+        sets = Set.objects.bulk_create([
+            Set(exercise=exercise, user=self.user, set_number=n, reps=5, weight=100) for n in range(1, 5)
+        ])
+        return workout, exercise, sets[0]
+
+    def refresh_token(self):
+        from users.serializers import ClaimsTokenObtainPairSerializer
+
+        return str(ClaimsTokenObtainPairSerializer.get_token(self.user))
+
+
+def endpoints():
+    """(name, method, prepare, admin); prepare(fixture) returns the path and the client's keyword arguments."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.urls import reverse
+
+    def get(name, **query):
+        return lambda f: (reverse(name), {'data': query})
+
+    def get_detail(name, ids):
+        return lambda f: (reverse(name, args=[next(getattr(f, ids))]), {})
+
+    def body(name, payload, args=None):
+        return lambda f: (reverse(name, args=args(f) if args else None), {'data': payload(f), 'format': 'json'})
+
+    def new_set(f, exercise_id=None):
+        return {'exercise': exercise_id or next(f.exercise_ids), 'set_number': 9, 'reps': 5, 'weight': '100.0'}
+
+    def registration(n):
+        return {'username': f'registered{n}', 'email': f'registered{n}@example.com', 'password': PASSWORD}
+
+    def upload(f):
+        csv = IMPORT_CSV.replace('{date}', f.day()).encode()
+        return reverse('import'), {'data': {'file': SimpleUploadedFile('history.csv', csv, content_type='text/csv')}}
+
+    # Reads
+    yield 'workout-list-create', 'get', get('workout-list-create'), False
+    yield 'workout-list-create (search)', 'get', get('workout-list-create', search='push'), False
+    yield 'workout-detail', 'get', get_detail('workout-detail', 'workout_ids'), False
+    yield 'exercise-list-create', 'get', get('exercise-list-create'), False
+    yield 'exercise-detail', 'get', get_detail('exercise-detail', 'exercise_ids'), False
+    yield 'set-list-create', 'get', get('set-list-create'), False
+    yield 'set-list-create (page_size=50)', 'get', get('set-list-create', page_size=50), False
+    yield 'set-detail', 'get', get_detail('set-detail', 'set_ids'), False
+    yield 'sync', 'get', get('sync'), False
+    yield 'export (csv)', 'get', get('export'), False
+    yield 'export (ndjson)', 'get', get('export', type='ndjson'), False
+    yield 'stats-volume', 'get', get('stats-volume', exercise='Squat'), False
+    yield 'stats-records', 'get', get('stats-records'), False
+    yield 'analytics-progression', 'get', get('analytics-progression', exercise='Squat'), False
+    yield 'response-cache-stats', 'get', get('response-cache-stats'), True
+    yield 'async-workout-list', 'get', get('async-workout-list'), False
+    yield 'async-workout-detail', 'get', get_detail('async-workout-detail', 'workout_ids'), False
+    yield 'async-exercise-list', 'get', get('async-exercise-list'), False
+    yield 'async-exercise-detail', 'get', get_detail('async-exercise-detail', 'exercise_ids'), False
+    yield 'async-set-list', 'get', get('async-set-list'), False
+    yield 'async-set-detail', 'get', get_detail('async-set-detail', 'set_ids'), False
+
+    # Writes
+    yield 'workout-list-create', 'post', body('workout-list-create', lambda f: {**NEW_WORKOUT, 'date': f.day()}), False
+    yield 'workout-detail', 'patch', body(
+        'workout-detail', lambda f: {'name': f'Renamed {f.next()}'}, lambda f: [next(f.workout_ids)]
+    ), False
+    yield 'workout-detail', 'delete', lambda f: (reverse('workout-detail', args=[f.throwaway_workout()[0].pk]), {}), False
+    yield 'exercise-list-create', 'post', body(
+        'exercise-list-create', lambda f: {'workout': next(f.workout_ids), 'name': 'Lunge'}
+    ), False
+    yield 'exercise-detail', 'patch', body(
+        'exercise-detail', lambda f: {'name': 'Dip' if f.next() % 2 else 'Pull Up'}, lambda f: [next(f.exercise_ids)]
+    ), False
+    yield 'exercise-detail', 'delete', lambda f: (reverse('exercise-detail', args=[f.throwaway_workout()[1].pk]), {}), False
+    yield 'set-list-create', 'post', body('set-list-create', new_set), False
+    yield 'set-batch', 'post', body('set-batch', lambda f: [new_set(f, f.throwaway_workout()[1].pk)] * 20), False
+    yield 'set-detail', 'patch', body('set-detail', lambda f: {'reps': f.next() % 12 + 1}, lambda f: [next(f.set_ids)]), False
+    yield 'set-detail', 'delete', lambda f: (reverse('set-detail', args=[f.throwaway_workout()[2].pk]), {}), False
+    yield 'import', 'post', upload, False
+
+    # Accounts
+    yield 'register', 'post', body('register', lambda f: registration(f.next())), False
+    yield 'token_obtain_pair', 'post', body(
+        'token_obtain_pair', lambda f: {'username': f.user.username, 'password': PASSWORD}
+    ), False
+    yield 'token_refresh', 'post', body('token_refresh', lambda f: {'refresh': f.refresh_token()}), False
+    yield 'logout', 'post', body('logout', lambda f: {'refresh': f.refresh_token()}), False
+
+
+def request(client, method, path, kwargs):
+    response = getattr(client, method)(path, **kwargs)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def run_endpoint(client, fixture, method, prepare, runs, warmup):
+    from django.db import connections
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(warmup):
+        request(client, method, *prepare(fixture))
+    samples, statuses = [], Counter()
+    for _ in range(runs):
+        path, kwargs = prepare(fixture)
+        start = time.perf_counter()
+        response = request(client, method, path, kwargs)
+        samples.append(time.perf_counter() - start)
+        statuses[str(response.status_code)] += 1
+
+    path, kwargs = prepare(fixture)
+    with ExitStack() as stack:
+        captured = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+        tracemalloc.start()
+        request(client, method, path, kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        'requests_per_second': round(len(samples) / sum(samples), 1),
+        **summarize(samples),
+        'queries': sum(len(queries) for queries in captured),
+        'peak_allocated_kib': round(peak / 1024, 1),
+        'statuses': dict(statuses),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of `results` against `baseline`, as readable lines."""
+    regressions = []
+    for name, current in results['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if before is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if current[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f'{name}: {metric} {before[metric]} -> {current[metric]}')
+        if current['queries'] > before['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {current['queries']}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--years', type=float, default=1, help='history per user')
+    parser.add_argument('--days-per-week', type=int, default=3)
+    parser.add_argument('--runs', type=int, default=100, help='timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--only', help='comma-separated substrings of the endpoints to run')
+    parser.add_argument('--output', help='write the results here as well as to stdout')
+    parser.add_argument('--compare', help='results of an earlier run to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='latency growth allowed by --compare')
+    args = parser.parse_args()
+
+    for name, value in BENCH_ENV.items():
+        os.environ.setdefault(name, value)
+    setup_django()
+    import django
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from workouts.dataset import generate
+    from users.serializers import ClaimsTokenObtainPairSerializer
+
+    only = [part for part in (args.only or '').split(',') if part]
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'started': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'runs': args.runs,
+            'warmup': args.warmup,
+        },
+        'endpoints': {},
+    }
+    with test_database() as connection:
+        results['meta']['database'] = connection.vendor
+        results['meta']['dataset'] = generate(
+            users=args.users, years=args.years, days_per_week=args.days_per_week, password=PASSWORD,
+        )
+        User = get_user_model()
+        user = User.objects.get(username='bench0')
+        admin = User.objects.create_superuser('bench-admin', 'bench-admin@example.com', PASSWORD)
+        fixture = Fixture(user)
+        clients = {}
+        for as_admin in (False, True):
+            clients[as_admin] = APIClient()
+            token = ClaimsTokenObtainPairSerializer.get_token(admin if as_admin else user).access_token
+            clients[as_admin].credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        for name, method, prepare, as_admin in endpoints():
+            key = f'{method.upper()} {name}'
+            if only and not any(part in key for part in only):
+                continue
+            print(f'{key}...', file=sys.stderr)
+            results['endpoints'][key] = run_endpoint(
+                clients[as_admin], fixture, method, prepare, args.runs, args.warmup
+            )
+    # Linux reports kilobytes.
+    results['meta']['max_rss_mib'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Bulk import throughput: sets written per second by WorkoutImporter.
+
+    python -m benchmarks.import_throughput --sets 200000
+
+Builds a CSV in memory (one workout a day, four exercises of five sets) and
+imports it into an empty test database, then imports it again to time the
+all-duplicates path a resumed import goes through.
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import random
+import time
+
+from benchmarks.utils import EXERCISE_NAMES, setup_django, test_database
+
+
+def build_csv(total_sets, sets_per_exercise=5, exercises_per_workout=4):
+    rng = random.Random(0)
+    start = datetime.date(2000, 1, 1)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['date', 'workout', 'exercise', 'set_number', 'reps', 'weight'])
+    per_workout = sets_per_exercise * exercises_per_workout
+    for i in range(total_sets):
+        day = start + datetime.timedelta(days=i // per_workout)
+        exercise = EXERCISE_NAMES[(i // sets_per_exercise) % exercises_per_workout]
+        writer.writerow([day.isoformat(), 'Session', exercise, i % sets_per_exercise + 1,
+                         rng.randint(3, 12), rng.randint(40, 400) / 2])
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sets', type=int, default=200_000)
+    parser.add_argument('--chunk-rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from workouts.importer import WorkoutImporter, read_rows
+
+    data = build_csv(args.sets)
+    with test_database():
+        user = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='x')
+        results = {'sets': args.sets, 'chunk_rows': args.chunk_rows}
+        for label in ('fresh', 'repeat'):
+            started = time.perf_counter()
+            result = WorkoutImporter(user, chunk_rows=args.chunk_rows).run(read_rows(io.StringIO(data), 'csv'))
+            elapsed = time.perf_counter() - started
+            results[label] = {
+                'seconds': round(elapsed, 3),
+                'rows_per_second': round(result.rows / elapsed),
+                'sets_created': result.sets_created,
+                'sets_skipped': result.sets_skipped,
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Cost of config.metrics.MetricsMiddleware per request.
+
+    python -m benchmarks.metrics_overhead --runs 20000
+
+A few percent of an API request is within the run-to-run noise of timing
+whole requests, so the parts are timed separately: the middleware around a
+view that does nothing, sampled and not, and the query execute wrapper
+around a query that does nothing. They are then put against what GET
+/api/workouts/ costs through the test client: its median time and its
+query count.
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.utils import measure, seed_history, setup_django, summarize, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20_000)
+    parser.add_argument('--sets', type=int, default=2_000, help='seeded sets')
+    args = parser.parse_args()
+
+    # Throttle classes are bound when the views are imported.
+    os.environ.update(RESPONSE_CACHE_TTL='0', THROTTLE_RATE_USER='1000000/minute')
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.http import HttpResponse
+    from django.test import Client, RequestFactory, override_settings
+    from django.test.utils import CaptureQueriesContext
+    from django.db import connections
+    from rest_framework_simplejwt.tokens import AccessToken
+    from config import metrics
+
+    request = RequestFactory().get('/api/workouts/')
+    response = HttpResponse(b'{}' * 2000)
+    middleware = metrics.MetricsMiddleware(lambda request: response)
+    results = {'sample_rate': settings.METRICS_SAMPLE_RATE}
+    with override_settings(METRICS_SAMPLE_RATE=0):
+        results['middleware, unsampled'] = measure(lambda: middleware(request), args.runs)
+    with override_settings(METRICS_SAMPLE_RATE=1):
+        results['middleware, sampled'] = measure(lambda: middleware(request), args.runs)
+
+    # Microseconds: a wrapped no-op query is below measure()'s resolution.
+    execute = lambda sql, params, many, context: None
+    for sampled in ('unsampled', 'sampled'):
+        token = metrics._sample.set(metrics.Sample() if sampled == 'sampled' else None)
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            metrics.account_query(execute, '', (), False, {})
+        results[f'query wrapper, {sampled}'] = {'mean_us': round((time.perf_counter() - start) / args.runs * 1e6, 3)}
+        metrics._sample.reset(token)
+
+    with test_database():
+        user = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='x')
+        seed_history(user, args.sets)
+        client = Client(headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'}, HTTP_HOST='localhost')
+        with CaptureQueriesContext(connections['default']) as queries:
+            assert client.get('/api/workouts/').status_code == 200
+        query_count = len(queries)
+        samples = []
+        for _ in range(500):
+            start = time.perf_counter()
+            client.get('/api/workouts/')
+            samples.append(time.perf_counter() - start)
+    request_ms = summarize(samples)['p50_ms']
+    results['GET /api/workouts/'] = {'p50_ms': request_ms, 'queries': query_count}
+
+    rate = settings.METRICS_SAMPLE_RATE
+    per_request = {
+        sampled: results[f'middleware, {sampled}']['mean_ms'] + query_count * results[f'query wrapper, {sampled}']['mean_us'] / 1000
+        for sampled in ('unsampled', 'sampled')
+    }
+    expected = (1 - rate) * per_request['unsampled'] + rate * per_request['sampled']
+    results['overhead_pct'] = {
+        f'at sample rate {rate}': round(expected / request_ms * 100, 3),
+        'every request sampled': round(per_request['sampled'] / request_ms * 100, 3),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Building and rendering a 100-workout page with nested exercises and sets:
+the model serializers versus the values() serializers, each rendered with
+DRF's JSONRenderer and with FastJSONRenderer (orjson, and its stdlib
+fallback).
+
+    python -m benchmarks.rendering --workouts 100 --runs 50
+
+"build" loads the page and produces the data (the queries included, as the
+serializers' prefetches and the values() serializers' own lookups are part
+of the cost); "render" turns that data into bytes. Every variant must render
+the same document, which is checked first.
+"""
+import argparse
+import json
+import unittest.mock
+
+from benchmarks.utils import measure, seed_history, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workouts', type=int, default=100, help='workouts on the page')
+    parser.add_argument('--exercises', type=int, default=4, help='exercises per workout')
+    parser.add_argument('--sets', type=int, default=5, help='sets per exercise')
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from rest_framework.renderers import JSONRenderer
+    from config import renderers
+    from workouts.models import Workout
+    from workouts.serializers import WorkoutSerializer, WorkoutValuesSerializer
+
+    with test_database():
+        user = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='x')
+        seed_history(user, args.workouts * args.exercises * args.sets, args.exercises, args.sets)
+        page = Workout.objects.filter(user=user).order_by('-date', 'id')[:args.workouts]
+
+        def serializer_data():
+            workouts = page.prefetch_related(*WorkoutSerializer.nested_prefetches())
+            return WorkoutSerializer(workouts, many=True).data
+
+        def values_data():
+            serializer = WorkoutValuesSerializer()
+            return serializer.to_representation(serializer.values(page))
+
+        def stdlib_render(data):
+            with unittest.mock.patch.object(renderers, 'orjson', None):
+                return renderers.FastJSONRenderer().render(data)
+
+        variants = {
+            'serializer + JSONRenderer': (serializer_data, JSONRenderer().render),
+            'serializer + FastJSONRenderer': (serializer_data, renderers.FastJSONRenderer().render),
+            'values + FastJSONRenderer (stdlib fallback)': (values_data, stdlib_render),
+            'values + FastJSONRenderer': (values_data, renderers.FastJSONRenderer().render),
+        }
+        documents = {json.dumps(json.loads(render(build()))) for build, render in variants.values()}
+        assert len(documents) == 1, 'the variants render different documents'
+
+        results = {
+            'workouts': args.workouts,
+            'sets': args.workouts * args.exercises * args.sets,
+            'orjson': renderers.orjson is not None,
+            'bytes': len(renderers.FastJSONRenderer().render(values_data())),
+        }
+        for name, (build, render) in variants.items():
+            data = build()
+            results[name] = {
+                'build': measure(build, args.runs),
+                'render': measure(lambda: render(data), args.runs),
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
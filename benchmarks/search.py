@@ -0,0 +1,72 @@
+"""
+Workout search: LIKE '%term%' scans versus the full-text index.
+
+    python -m benchmarks.search --workouts 50000
+
+Seeds one user's workouts with a few sentences of notes each and times
+what the first page of /api/workouts/?search=<term> does (COUNT(*) plus ten
+rows) for a common and a rare term. "before" is SearchFilter-style
+icontains matching; "after" is workouts.search.FullTextSearchFilter.
+"""
+import argparse
+import datetime
+import json
+import random
+
+from benchmarks.utils import measure, setup_django, test_database
+
+WORDS = (
+    'felt strong heavy light tired fresh slow fast tempo pause paused grind '
+    'easy hard form depth lockout knee elbow grip belt straps warmup backoff '
+    'volume deload week session morning evening gym home sleep food sore'
+).split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workouts', type=int, default=50_000)
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db.models import Q
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from workouts.models import Workout
+    from workouts.search import FullTextSearchFilter
+
+    rng = random.Random(0)
+    with test_database():
+        user = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='x')
+        start = datetime.date(1990, 1, 1)
+        Workout.objects.bulk_create(
+            [
+                Workout(
+                    user=user, date=start + datetime.timedelta(days=i), name=f'Session {i}',
+                    notes=' '.join(rng.choice(WORDS) for _ in range(40)) + (' zercher' if i % 997 == 0 else ''),
+                )
+                for i in range(args.workouts)
+            ],
+            batch_size=5000,
+        )
+        base = Workout.objects.filter(user=user).order_by('-date', 'id')
+
+        def page(queryset):
+            def run():
+                queryset.count()
+                list(queryset[:10])
+            return run
+
+        results = {'workouts': args.workouts}
+        for term in ('deload', 'zercher'):
+            request = Request(APIRequestFactory().get('/', {'search': term}))
+            results[term] = {
+                'before': measure(page(base.filter(Q(name__icontains=term) | Q(notes__icontains=term))), args.runs),
+                'after': measure(page(FullTextSearchFilter().filter_queryset(request, base, None)), args.runs),
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Set list ownership filter: three-table join versus the denormalized owner.
+
+    python -m benchmarks.set_list --users 3 --sets 100000
+
+"Before" is the pre-denormalization queryset (``exercise__workout__user``),
+"after" filters on ``Set.user``. Each run does what the first page of
+``/api/sets/`` does: one COUNT(*) plus a page of ten rows.
+"""
+import argparse
+import json
+
+from benchmarks.utils import measure, seed_history, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=3)
+    parser.add_argument('--sets', type=int, default=100_000, help='sets per user')
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from workouts.models import Set
+
+    with test_database():
+        User = get_user_model()
+        users = [
+            User.objects.create_user(username=f'bench{i}', email=f'bench{i}@example.com', password='x')
+            for i in range(args.users)
+        ]
+        for user in users:
+            seed_history(user, args.sets)
+        user = users[0]
+
+        def page(queryset):
+            def run():
+                queryset.count()
+                list(queryset.select_related('exercise', 'exercise__workout').order_by('-id')[:10])
+            return run
+
+        results = {
+            'sets_per_user': args.sets,
+            'users': args.users,
+            'before': measure(page(Set.objects.filter(exercise__workout__user=user)), args.runs),
+            'after': measure(page(Set.objects.filter(user=user)), args.runs),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Concurrent reads and writes against SQLite under gunicorn: Django's default
+connection setup versus the WAL configuration in settings.SQLITE_PRAGMAS.
+
+    python -m benchmarks.sqlite_load --workers 4 --clients 16 --duration 20
+
+Seeds one user's history into a file database, then for each mode copies it,
+starts gunicorn with that many sync workers and drives it over HTTP from
+client threads for a fixed time. A request is a write (POST /api/workouts/)
+with probability --write-ratio, otherwise a read of the workout or set list.
+"before" is rollback-journal mode with synchronous=FULL and deferred
+transactions, as Django configures SQLite out of the box. Needs gunicorn.
+"""
+import argparse
+import datetime
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.utils import seed_history, setup_django, summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODES = {
+    'before': {
+        'SQLITE_JOURNAL_MODE': 'delete',
+        'SQLITE_SYNCHRONOUS': 'full',
+        'SQLITE_CACHE_SIZE': '-2000',
+        'SQLITE_MMAP_SIZE': '0',
+        'SQLITE_TEMP_STORE': 'default',
+        'SQLITE_TRANSACTION_MODE': 'DEFERRED',
+    },
+    'after': {},
+}
+
+# Every worker process keeps its own caches and throttle history; neither
+# should decide what reaches the database here.
+SERVER_ENV = {
+    'RESPONSE_CACHE_TTL': '0',
+    'THROTTLE_RATE_USER': '1000000/minute',
+    'THROTTLE_RATE_ANON': '1000000/minute',
+    'THROTTLE_RATE_SETS': '1000000/minute',
+}
+
+READS = ('/api/workouts/?page_size=20', '/api/sets/?page_size=50')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def build_database(path, total_sets):
+    """Migrate and seed a database at `path`; returns a bearer token for its user."""
+    os.environ.update(SQLITE_PATH=str(path), SQLITE_JOURNAL_MODE='delete')
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db import connections
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    call_command('migrate', verbosity=0)
+    user = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='x')
+    seed_history(user, total_sets)
+    token = str(AccessToken.for_user(user))
+    connections.close_all()
+    return token
+
+
+def start_server(database, workers, env):
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+            '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+        ],
+        cwd=ROOT,
+        # Failed requests are counted by status; their tracebacks are noise here.
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, **SERVER_ENV, **env, 'SQLITE_PATH': str(database)},
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {server.returncode}')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            return server, port
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def drive(port, token, clients, duration, write_ratio):
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+    latencies = {'read': [], 'write': []}
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local = {'read': [], 'write': []}
+        local_statuses = {}
+        while time.monotonic() < deadline:
+            if rng.random() < write_ratio:
+                kind, method, url = 'write', 'POST', '/api/workouts/'
+                day = datetime.date(2000, 1, 1) + datetime.timedelta(days=rng.randrange(10_000))
+                body = json.dumps({'date': day.isoformat(), 'name': f'Load {seed}'})
+            else:
+                kind, method, url, body = 'read', 'GET', rng.choice(READS), None
+            start = time.perf_counter()
+            try:
+                conn.request(method, url, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                status = 'connection error'
+            elapsed = time.perf_counter() - start
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+            if status in (200, 201):
+                local[kind].append(elapsed)
+        with lock:
+            for kind, samples in local.items():
+                latencies[kind].extend(samples)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = {
+        'ok_per_second': round(sum(len(s) for s in latencies.values()) / duration, 1),
+        'errors': {str(status): count for status, count in statuses.items() if status not in (200, 201)},
+    }
+    for kind, samples in latencies.items():
+        result[kind] = {'per_second': round(len(samples) / duration, 1), **(summarize(samples) if samples else {})}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent client threads')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per mode')
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--sets', type=int, default=50_000, help='seeded sets')
+    args = parser.parse_args()
+
+    results = {'workers': args.workers, 'clients': args.clients, 'write_ratio': args.write_ratio}
+    with tempfile.TemporaryDirectory() as directory:
+        template = Path(directory) / 'template.sqlite3'
+        token = build_database(template, args.sets)
+        for mode, env in MODES.items():
+            database = Path(directory) / f'{mode}.sqlite3'
+            shutil.copyfile(template, database)
+            server, port = start_server(database, args.workers, env)
+            try:
+                results[mode] = drive(port, token, args.clients, args.duration, args.write_ratio)
+            finally:
+                server.terminate()
+                server.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Cost of one throttle check per request.
+
+    python -m benchmarks.throttle --rate 5000/minute
+
+"before" is DRF's UserRateThrottle: a list of timestamps per client in the
+locmem cache, rewritten on every request, so a check gets slower as the
+limit grows. "after" is config.throttling.SlidingWindowThrottle with its
+SQLite store and with a cache store (locmem here; Redis in production adds
+a network round trip per call). The window is pre-filled to the limit
+minus the measured runs, so every check is an allowed one.
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.utils import measure, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', default='5000/minute')
+    parser.add_argument('--runs', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.test import override_settings
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.throttling import UserRateThrottle
+    from config import throttling
+
+    limit = int(args.rate.split('/')[0])
+    fill = max(0, limit - args.runs - 10)
+    request = Request(APIRequestFactory().get('/'))
+    request.user = get_user_model()(pk=1, username='bench')
+    view = object()
+
+    rates = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'user': args.rate}}
+    results = {'rate': args.rate}
+    with override_settings(REST_FRAMEWORK=rates), tempfile.TemporaryDirectory() as directory:
+        UserRateThrottle.THROTTLE_RATES = rates['DEFAULT_THROTTLE_RATES']
+        cache.clear()
+        for _ in range(fill):
+            UserRateThrottle().allow_request(request, view)
+        results['before (UserRateThrottle, locmem list)'] = measure(
+            lambda: UserRateThrottle().allow_request(request, view), args.runs, warmup=0
+        )
+
+        stores = {
+            'after (sliding window, sqlite)': throttling.SQLiteCounterStore(os.path.join(directory, 'throttle.sqlite3')),
+            'after (sliding window, locmem cache)': throttling.CacheCounterStore('throttle'),
+        }
+        for name, store in stores.items():
+            throttling._stores[settings.THROTTLE_STORE] = store
+            results[name] = measure(lambda: throttling.SlidingWindowThrottle().allow_request(request, view), args.runs)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Refresh-token blacklist: pruning throughput and the cost of a blacklist check.
+
+    python -m benchmarks.token_blacklist --tokens 200000
+
+Seeds outstanding tokens (--expired of them expired, every other one
+blacklisted), times the blacklist check a refresh makes with and without the
+bloom filter, then prunes with users.tokens.prune_expired_tokens and reports
+table sizes before and after.
+"""
+import argparse
+import datetime
+import json
+import time
+import uuid
+
+from benchmarks.utils import measure, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, default=200_000)
+    parser.add_argument('--expired', type=float, default=0.8, help='fraction of tokens already expired')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--runs', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.test import override_settings
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+    from rest_framework_simplejwt.utils import aware_utcnow
+    from users.tokens import FilteredRefreshToken, blacklist_filter, prune_expired_tokens, table_sizes
+
+    with test_database():
+        user = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='x')
+        now = aware_utcnow()
+        cutoff = int(args.tokens * args.expired)
+        tokens = OutstandingToken.objects.bulk_create(
+            [
+                OutstandingToken(
+                    user=user, jti=uuid.uuid4().hex, token='x',
+                    expires_at=now + datetime.timedelta(days=-1 if i < cutoff else 1),
+                )
+                for i in range(args.tokens)
+            ],
+            batch_size=5000,
+        )
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=t) for t in tokens[::2]], batch_size=5000)
+
+        refresh = FilteredRefreshToken.for_user(user)
+        results = {'tokens': args.tokens, 'before': table_sizes(), 'blacklist_check': {}}
+        for name, ttl in (('database', 0), ('bloom filter', 3600)):
+            with override_settings(JWT_BLACKLIST_FILTER_TTL=ttl):
+                blacklist_filter.clear()
+                start = time.perf_counter()
+                refresh.check_blacklist()
+                first = time.perf_counter() - start
+                results['blacklist_check'][name] = {
+                    'first_check_ms': round(first * 1000, 3), **measure(refresh.check_blacklist, args.runs),
+                }
+
+        pruned = prune_expired_tokens(batch_size=args.batch_size)
+        pruned['tokens_per_second'] = round(pruned['outstanding_deleted'] / pruned['seconds'])
+        results['prune'] = pruned
+        results['after'] = table_sizes()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
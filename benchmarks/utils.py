@@ -0,0 +1,95 @@
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database(verbosity=0):
+    """Create the test database for the duration of the block."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    return {
+        'runs': len(samples),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3),
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+def measure(fn, runs, warmup=5):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+EXERCISE_NAMES = ['Bench Press', 'Squat', 'Deadlift', 'Overhead Press', 'Barbell Row', 'Pull Up', 'Lunge', 'Dip']
+
+
+def seed_history(user, total_sets, exercises_per_workout=4, sets_per_exercise=5, start=None, batch_size=5000,
+                 exercise_names=EXERCISE_NAMES):
+    """Bulk-insert roughly ``total_sets`` sets for ``user``, one workout per day."""
+    import datetime
+    import random
+    from decimal import Decimal
+    from workouts.models import Exercise, ExerciseType, Set, Workout
+
+    rng = random.Random(user.pk)
+    sets_per_workout = exercises_per_workout * sets_per_exercise
+    workout_count = max(1, -(-total_sets // sets_per_workout))
+    start = start or datetime.date.today() - datetime.timedelta(days=workout_count)
+
+    workouts = Workout.objects.bulk_create(
+        [Workout(user=user, date=start + datetime.timedelta(days=i), name=f'Session {i}') for i in range(workout_count)],
+        batch_size=batch_size,
+    )
+    types = ExerciseType.objects.resolve(user.pk, exercise_names)
+    exercises = Exercise.objects.bulk_create(
+        [
+            Exercise(workout=workout, user=user, name=name, exercise_type_id=types[name])
+            for workout in workouts
+            for name in (rng.choice(exercise_names) for _ in range(exercises_per_workout))
+        ],
+        batch_size=batch_size,
+    )
+    sets = []
+    for exercise in exercises:
+        for number in range(1, sets_per_exercise + 1):
+            if len(sets) == total_sets:
+                break
+            sets.append(Set(
+                exercise=exercise, user=user, set_number=number,
+                reps=rng.randint(3, 12), weight=Decimal(rng.randint(40, 400)) / 2,
+            ))
+    Set.objects.bulk_create(sets, batch_size=batch_size)
+    return len(sets)
@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
+from django.db import connection
+
+from config.sqlite import verify_pragmas
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Fail at boot rather than under load if SQLite ignored its PRAGMAs.
+verify_pragmas(connection, settings.SQLITE_PRAGMAS)
+connection.close()
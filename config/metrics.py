@@ -0,0 +1,254 @@
+"""
+Per-endpoint request metrics, exposed at /metrics in the Prometheus text
+format.
+
+MetricsMiddleware times every request and records its response size in
+in-process histograms labelled with the URL name (`workout-list-create`,
+`set-detail`, ...) and method. A METRICS_SAMPLE_RATE share of requests is
+also accounted in detail: database queries and their time, through an
+execute wrapper on every connection, the time serializers spend turning
+objects into response data (see serialization()), and the time spent
+rendering that data into the response body.
+
+Histograms are per process: with several workers, each scrape sees the
+worker that answered it, so run Prometheus against every worker or keep
+to one per host.
+"""
+import contextlib
+import contextvars
+import hmac
+import random
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Anything else is labelled "other": clients choose the method.
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# name -> (help, buckets)
+METRICS = {
+    'http_request_duration_seconds': ('Wall time of the request through the middleware stack.', TIME_BUCKETS),
+    'http_response_size_bytes': ('Size of the response body; streamed responses are not counted.', SIZE_BUCKETS),
+    'http_request_db_queries': ('Database queries per request (sampled requests).', COUNT_BUCKETS),
+    'http_request_db_duration_seconds': ('Time in database queries per request (sampled requests).', TIME_BUCKETS),
+    'http_response_serialize_seconds': ('Time in serializers building the response data (sampled requests).', TIME_BUCKETS),
+    'http_response_render_seconds': ('Time rendering the response data into the body (sampled requests).', TIME_BUCKETS),
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram; callers hold the registry lock."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        # `le` bounds are inclusive, hence bisect_left.
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+_lock = threading.Lock()
+_histograms = {}  # (metric, view, method) -> Histogram
+
+
+def observe(values, view, method):
+    """Record {metric: value} for one request."""
+    with _lock:
+        for metric, value in values.items():
+            histogram = _histograms.get((metric, view, method))
+            if histogram is None:
+                histogram = _histograms[metric, view, method] = Histogram(METRICS[metric][1])
+            histogram.observe(value)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics():
+    with _lock:
+        snapshot = {key: (list(h.counts), h.sum) for key, h in _histograms.items()}
+    lines = [
+        '# HELP http_metrics_sample_rate Share of requests with query and render accounting.',
+        '# TYPE http_metrics_sample_rate gauge',
+        f'http_metrics_sample_rate {_number(float(settings.METRICS_SAMPLE_RATE))}',
+    ]
+    for metric, (help_text, buckets) in METRICS.items():
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+        for (name, view, method), (counts, total) in sorted(snapshot.items()):
+            if name != metric:
+                continue
+            labels = f'view="{_escape(view)}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{{labels}}} {_number(total)}')
+            lines.append(f'{metric}_count{{{labels}}} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    The histograms in Prometheus' text format, for requests carrying
+    `Authorization: Bearer <METRICS_TOKEN>`. Without a token configured the
+    endpoint does not exist.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404
+    header = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(header.encode(), f'Bearer {token}'.encode()):
+        response = HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class Sample:
+    __slots__ = ('queries', 'db_time', 'serialize_time', 'render_time')
+
+    def __init__(self):
+        self.queries, self.db_time, self.serialize_time, self.render_time = 0, 0.0, None, None
+
+
+# Set for sampled requests. A context variable rather than a thread-local so
+# it follows async views' queries into sync_to_async threads.
+_sample = contextvars.ContextVar('metrics_sample', default=None)
+
+
+def account_query(execute, sql, params, many, context):
+    sample = _sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.db_time += time.perf_counter() - start
+
+
+@contextlib.contextmanager
+def serialization():
+    """
+    Accounts the block as serialization time, queries it runs included.
+    Views wrap the one place a response's data is built, not each serializer.
+    """
+    sample = _sample.get()
+    if sample is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.serialize_time = (sample.serialize_time or 0.0) + time.perf_counter() - start
+
+
+def install_query_accounting(connection, **kwargs):
+    if account_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(account_query)
+
+
+connection_created.connect(install_query_accounting)
+
+
+class MetricsMiddleware:
+    """Goes first in MIDDLEWARE, so the time covers every other middleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django would run a sync hook in a thread.
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start, token = self.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            sample = self.end(token)
+        self.record(request, response, start, sample)
+        return response
+
+    async def __acall__(self, request):
+        start, token = self.begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            sample = self.end(token)
+        self.record(request, response, start, sample)
+        return response
+
+    @staticmethod
+    def begin():
+        start = time.perf_counter()
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return start, None
+        # Connections opened before this module was imported have no wrapper.
+        for connection in connections.all(initialized_only=True):
+            install_query_accounting(connection)
+        return start, _sample.set(Sample())
+
+    @staticmethod
+    def end(token):
+        if token is None:
+            return None
+        sample = _sample.get()
+        _sample.reset(token)
+        return sample
+
+    def process_template_response(self, request, response):
+        sample = _sample.get()
+        if sample is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(lambda _: setattr(sample, 'render_time', time.perf_counter() - start))
+        return response
+
+    async def aprocess_template_response(self, request, response):
+        return self.process_template_response(request, response)
+
+    @staticmethod
+    def record(request, response, start, sample):
+        values = {'http_request_duration_seconds': time.perf_counter() - start}
+        if not response.streaming:
+            values['http_response_size_bytes'] = len(response.content)
+        if sample is not None:
+            values['http_request_db_queries'] = sample.queries
+            values['http_request_db_duration_seconds'] = sample.db_time
+            if sample.serialize_time is not None:
+                values['http_response_serialize_seconds'] = sample.serialize_time
+            if sample.render_time is not None:
+                values['http_response_render_seconds'] = sample.render_time
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match and match.view_name else 'unmatched'
+        observe(values, view, request.method if request.method in METHODS else 'other')
@@ -0,0 +1,175 @@
+"""
+N+1 query detection.
+
+Every SELECT run while tracking is on is reduced to its shape: the SQL
+with literals and parameter lists collapsed. A shape that runs
+NPLUSONE_THRESHOLD times or more is an N+1: one query per row of something
+loaded earlier. Parameters are not compared, since rows that share a
+parent (every workout of one user) repeat the very same lookup. The
+report carries the project frames that issued the second of the queries.
+
+NPlusOneMiddleware tracks each request when NPLUSONE_MODE is 'log'
+(staging: a warning per pattern) or 'raise' (tests: the request fails
+with NPlusOneError). NPlusOneTestMixin turns on 'raise' for a test case
+and adds assertNoNPlusOne() for code that runs outside a request.
+"""
+import contextvars
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_ROOT = str(Path(__file__).resolve().parent.parent)
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """The query's shape: literals become ? and IN lists of any length look alike."""
+    return _LISTS.sub('(...)', _LITERALS.sub('?', sql))
+
+
+def project_stack(limit=8):
+    """The innermost frames from this project's code, innermost last."""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(_ROOT) and 'site-packages' not in frame.filename
+        and not frame.filename.endswith(('nplusone.py', 'metrics.py', 'middleware.py'))
+    ]
+    return frames[-limit:]
+
+
+class QueryTracker:
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.stacks = {}
+        self.examples = {}
+
+    def record(self, sql):
+        shape = fingerprint(sql)
+        self.counts[shape] += 1
+        if self.counts[shape] == 2:
+            self.stacks[shape] = project_stack()
+            self.examples[shape] = sql
+
+    def patterns(self):
+        """(sql, count, stack) for every shape run at least `threshold` times."""
+        return [
+            (self.examples[shape], count, self.stacks[shape])
+            for shape, count in self.counts.items() if count >= self.threshold
+        ]
+
+    def report(self, context):
+        lines = []
+        for sql, count, stack in self.patterns():
+            lines.append(f'{count} queries of the same shape in {context}:\n    {sql}')
+            lines.extend('  ' + line.rstrip() for line in traceback.format_list(stack))
+        return '\n'.join(lines)
+
+
+# A context variable so async views' queries in sync_to_async threads count.
+_tracker = contextvars.ContextVar('nplusone_tracker', default=None)
+
+
+def track_query(execute, sql, params, many, context):
+    tracker = _tracker.get()
+    if tracker is not None and not many and sql.lstrip()[:6].upper() == 'SELECT':
+        tracker.record(sql)
+    return execute(sql, params, many, context)
+
+
+def install(connection, **kwargs):
+    if track_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_query)
+
+
+connection_created.connect(install)
+
+
+@contextmanager
+def tracking(threshold=None):
+    """Track the queries run in this context; yields the QueryTracker."""
+    # Connections opened before this module was imported have no wrapper.
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+    tracker = QueryTracker(threshold or settings.NPLUSONE_THRESHOLD)
+    token = _tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _tracker.reset(token)
+
+
+class NPlusOneMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.NPLUSONE_MODE not in ('log', 'raise'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with tracking() as tracker:
+            response = self.get_response(request)
+        self.check(request, tracker)
+        return response
+
+    async def __acall__(self, request):
+        with tracking() as tracker:
+            response = await self.get_response(request)
+        self.check(request, tracker)
+        return response
+
+    @staticmethod
+    def check(request, tracker):
+        report = tracker.report(f'{request.method} {request.path}')
+        if not report:
+            return
+        if settings.NPLUSONE_MODE == 'raise':
+            raise NPlusOneError(report)
+        logger.warning(report)
+
+
+class NPlusOneTestMixin:
+    """
+    Fails any request a test makes that runs an N+1 pattern (the test
+    client re-raises NPlusOneError), and provides assertNoNPlusOne().
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        from django.test import override_settings
+
+        override = override_settings(NPLUSONE_MODE='raise')
+        override.enable()
+        cls.addClassCleanup(override.disable)
+        super().setUpClass()
+
+    @contextmanager
+    def assertNoNPlusOne(self, threshold=None):
+        with tracking(threshold) as tracker:
+            yield tracker
+        report = tracker.report(self.id())
+        if report:
+            raise self.failureException(report)
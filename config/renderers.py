@@ -0,0 +1,77 @@
+"""
+JSON rendering and parsing with orjson.
+
+orjson writes dicts, lists, strings, numbers, dates and datetimes in C, so
+rows from serializers.ValuesSerializer (Decimals, dates and datetimes as the
+database hands them over) are rendered without a Python call per value;
+only Decimals go through `default`. Output matches DRF's JSONRenderer:
+datetimes in ISO 8601 with `Z` for UTC, Decimals as strings unless
+COERCE_DECIMAL_TO_STRING is off, compact and not ASCII-escaped. One
+difference: NaN and infinities become null rather than an error.
+
+orjson is optional: without it, and for requests orjson cannot honour (an
+`indent` other than 2, or settings asking for non-compact or ASCII output),
+both classes fall back to DRF's stdlib-json implementations.
+"""
+import decimal
+
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+class DecimalJSONEncoder(JSONEncoder):
+    """DRF's encoder, with Decimals written the way DecimalField writes them."""
+
+    def default(self, obj):
+        if isinstance(obj, decimal.Decimal):
+            return str(obj) if api_settings.COERCE_DECIMAL_TO_STRING else float(obj)
+        return super().default(obj)
+
+
+_fallback = DecimalJSONEncoder()
+
+
+def _default(obj):
+    # Called by orjson for whatever it has no native encoding for.
+    return _fallback.default(obj)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    encoder_class = DecimalJSONEncoder
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type or '', renderer_context or {})
+        if orjson is None or indent not in (None, 2) or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        options = self.options | orjson.OPT_INDENT_2 if indent else self.options
+        ret = orjson.dumps(data, default=_default, option=options)
+        # Escaped by DRF too, for JSON embedded in JavaScript.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        # orjson reads UTF-8 only, the JSON default.
+        charset = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or charset.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
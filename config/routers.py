@@ -0,0 +1,52 @@
+"""
+Read-replica routing.
+
+Replicas are the aliases in settings.DATABASE_REPLICAS. Reads go to one of
+them only while a context has opted in with use_replicas(), which the
+read-only API views do for GET requests (workouts.views.ReplicaReadMixin).
+Everything else, including the reads a write request makes, stays on the
+primary.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+
+_use_replicas = contextvars.ContextVar('use_replicas', default=False)
+
+
+def use_replicas():
+    """Send this context's reads to the replicas; returns a token for stop_replicas()."""
+    return _use_replicas.set(True)
+
+
+def stop_replicas(token):
+    _use_replicas.reset(token)
+
+
+def choose_replica():
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replicas.get():
+            return choose_replica()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the primary's rows, so objects loaded from any of
+        # them may be related to each other.
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
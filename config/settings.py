@@ -11,9 +11,12 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
+from django.core.exceptions import ImproperlyConfigured
 import sys
 
+from config.sqlite import init_command
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -72,6 +75,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',
+    'config.nplusone.NPlusOneMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -80,7 +85,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'config.middleware.StaticFilesMiddleware',  # WhiteNoise, async-capable
     
 ]
 
@@ -107,13 +112,118 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE selects the backend: 'sqlite' (the default) or 'postgresql'.
+# Connections are kept for DB_CONN_MAX_AGE seconds instead of being opened
+# per request, and checked before reuse after an error or idle period.
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+# Applied to every new SQLite connection and checked at startup (see
+# config/sqlite.py). WAL lets readers run alongside the single writer, and
+# synchronous=NORMAL is durable against application crashes in WAL mode
+# (only an OS crash or power loss can drop the last transactions). A
+# negative cache_size is in KiB, per connection.
+SQLITE_PRAGMAS = {
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default='wal'),
+    'synchronous': config('SQLITE_SYNCHRONOUS', default='normal'),
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-65536, cast=int),
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+    'temp_store': config('SQLITE_TEMP_STORE', default='memory'),
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int),
+}
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            'OPTIONS': {
+                'init_command': init_command(SQLITE_PRAGMAS),
+                # Take the write lock when a transaction begins. A deferred
+                # transaction that reads and then writes cannot wait out a
+                # concurrent writer: busy_timeout does not apply to that upgrade.
+                'transaction_mode': config('SQLITE_TRANSACTION_MODE', default='IMMEDIATE'),
+            },
+        }
+    }
+elif DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='workouts'),
+            'USER': config('DB_USER', default='workouts'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            'OPTIONS': {},
+        }
     }
+    # psycopg's connection pool (needs psycopg[pool]). A pool replaces
+    # persistent connections, so CONN_MAX_AGE is 0 while it is on; size it
+    # to the threads in one worker process, not the whole deployment.
+    DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=0, cast=int)
+    if DB_POOL_MAX_SIZE:
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+        }
+else:
+    raise ImproperlyConfigured(f"DB_ENGINE must be 'sqlite' or 'postgresql', not {DB_ENGINE!r}.")
+
+# Read replicas: one alias per host in DB_REPLICA_HOSTS, otherwise configured
+# like the primary. The read-only API views send their GET queries to them
+# (config/routers.py); a user who wrote within REPLICA_PIN_SECONDS keeps
+# reading from the primary so replication lag cannot hide their own writes.
+DATABASE_REPLICAS = []
+for index, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    DATABASE_REPLICAS.append(f'replica{index}')
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Per-user API responses (see workouts/cache.py). The locmem backend evicts
+# least recently used entries once MAX_ENTRIES is reached; point
+# RESPONSE_CACHE_BACKEND at a shared backend when running several workers.
+# A TTL of 0 turns the response cache off.
+RESPONSE_CACHE_ALIAS = 'responses'
+THROTTLE_CACHE_ALIAS = 'throttle'
+RESPONSE_CACHE_TTL = config('RESPONSE_CACHE_TTL', default=300, cast=int)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    RESPONSE_CACHE_ALIAS: {
+        'BACKEND': config('RESPONSE_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('RESPONSE_CACHE_LOCATION', default='workout-responses'),
+        'TIMEOUT': RESPONSE_CACHE_TTL,
+        'OPTIONS': {
+            'MAX_ENTRIES': config('RESPONSE_CACHE_MAX_ENTRIES', default=5000, cast=int),
+        },
+    },
+    # Throttle counters when THROTTLE_STORE is 'cache'; e.g.
+    # django.core.cache.backends.redis.RedisCache at redis://host:6379/1.
+    THROTTLE_CACHE_ALIAS: {
+        'BACKEND': config('THROTTLE_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('THROTTLE_CACHE_LOCATION', default='throttle'),
+    },
 }
 
+# In-process exercise name -> ExerciseType id lookups (see workouts/catalog.py).
+# 0 turns the lookup cache off.
+EXERCISE_TYPE_CACHE_SIZE = config('EXERCISE_TYPE_CACHE_SIZE', default=10000, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -163,18 +273,34 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-        'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.UserRateThrottle',        # Limits per authenticated user
-        'rest_framework.throttling.AnonRateThrottle',        # Limits per anonymous user
+    # orjson when installed, else stdlib json (see config/renderers.py).
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'config.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'config.throttling.SlidingWindowThrottle',
     ],
+    # Per scope: views pick one with `throttle_scope` (or, for writes only,
+    # `write_throttle_scope`), the rest are 'user' (authenticated) or 'anon'
+    # (per client IP).
     'DEFAULT_THROTTLE_RATES': {
-        'user': '10/minute',    # Allow 10 requests per user per minute
-        'anon': '5/minute',     # Allow 5 requests per anonymous IP per minute
+        'user': config('THROTTLE_RATE_USER', default='10/minute'),
+        'anon': config('THROTTLE_RATE_ANON', default='5/minute'),
+        'login': config('THROTTLE_RATE_LOGIN', default='5/minute'),
+        'register': config('THROTTLE_RATE_REGISTER', default='5/minute'),
+        # Logging a session writes a set at a time.
+        'sets': config('THROTTLE_RATE_SETS', default='120/minute'),
     },
     'EXCEPTION_HANDLER': 'config.exceptions.custom_exception_handler',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -186,8 +312,12 @@ REST_FRAMEWORK = {
     ],
 }
 
-# if 'test' in sys.argv: # isnt working ?
-#     REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'] = []
+# Where throttle counters live (see config/throttling.py): 'sqlite' keeps
+# them in a local file shared by the workers on this host; 'cache' uses the
+# THROTTLE_CACHE_ALIAS cache, which should be Redis when there is more than
+# one host.
+THROTTLE_STORE = config('THROTTLE_STORE', default='sqlite')
+THROTTLE_SQLITE_PATH = config('THROTTLE_SQLITE_PATH', default=str(BASE_DIR / 'throttle.sqlite3'))
 
 from datetime import timedelta
 
@@ -197,10 +327,35 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.FilteredTokenRefreshSerializer',
 }
 
+# Refresh interval of the in-process bloom filter over blacklisted refresh
+# tokens (see users/tokens.py). A token blacklisted by another worker can
+# still refresh once within this window; 0 always asks the database.
+JWT_BLACKLIST_FILTER_TTL = config('JWT_BLACKLIST_FILTER_TTL', default=10, cast=int)
+
+# How long API authentication trusts a cached "this account is active" (see
+# users/authentication.py); deactivating a user takes up to this long to lock
+# out tokens that are already issued. 0 checks the database on every request.
+AUTH_ACTIVE_CACHE_TTL = config('AUTH_ACTIVE_CACHE_TTL', default=60, cast=int)
+
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+# Request metrics (see config/metrics.py). Every request is timed; this share
+# also gets query and render accounting. /metrics answers only requests
+# sending `Authorization: Bearer <METRICS_TOKEN>`, and is off while it is empty.
+METRICS_SAMPLE_RATE = config('METRICS_SAMPLE_RATE', default=0.1, cast=float)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# N+1 query detection per request (see config/nplusone.py): 'log' warns with
+# the offending stack (staging), 'raise' fails the request (tests), empty
+# leaves the middleware out. A SELECT shape repeated this many times in one
+# request counts as one.
+NPLUSONE_MODE = config('NPLUSONE_MODE', default='')
+NPLUSONE_THRESHOLD = config('NPLUSONE_THRESHOLD', default=3, cast=int)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -228,4 +383,15 @@ LOGGING = {
 }
 
 if 'test' in sys.argv:
-    SECURE_SSL_REDIRECT = False
\ No newline at end of file
+    SECURE_SSL_REDIRECT = False
+    # Counters would carry over between tests; throttle tests attach the
+    # throttle themselves.
+    REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'] = []
+    # Tests that exercise the response cache turn it on explicitly.
+    RESPONSE_CACHE_TTL = 0
+    # Test transactions roll back, so cached catalog ids would go stale.
+    EXERCISE_TYPE_CACHE_SIZE = 0
+    # Test transactions roll back and reuse user ids.
+    AUTH_ACTIVE_CACHE_TTL = 0
+    # Blacklist rows that tests write directly never reach the filter.
+    JWT_BLACKLIST_FILTER_TTL = 0
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+SQLite connection setup.
+
+settings.SQLITE_PRAGMAS becomes the database's `init_command`, so every new
+connection runs the PRAGMAs before its first query. verify_pragmas() reads
+them back once per process at startup (config/wsgi.py, config/asgi.py):
+SQLite ignores a PRAGMA it cannot honour, and WAL in particular stays off on
+filesystems without shared-memory support, which would otherwise only show
+up as "database is locked" errors under load.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+# Not applicable to in-memory databases (the test database), which always
+# report 'memory' and no mapping.
+_FILE_ONLY = {'journal_mode', 'mmap_size'}
+
+# PRAGMAs that read back as a number rather than the name they were set with.
+_NAMED_VALUES = {
+    'synchronous': {'off': 0, 'normal': 1, 'full': 2, 'extra': 3},
+    'temp_store': {'default': 0, 'file': 1, 'memory': 2},
+}
+
+
+def init_command(pragmas):
+    return ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items())
+
+
+def _normalize(name, value):
+    if isinstance(value, str):
+        value = value.lower()
+        return _NAMED_VALUES.get(name, {}).get(value, value)
+    return value
+
+
+def verify_pragmas(connection, pragmas):
+    """Raise ImproperlyConfigured unless `connection` is running with `pragmas`."""
+    if connection.vendor != 'sqlite':
+        return
+    mismatched = []
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            if name in _FILE_ONLY and connection.is_in_memory_db():
+                continue
+            cursor.execute(f'PRAGMA {name}')
+            actual = cursor.fetchone()[0]
+            if _normalize(name, actual) != _normalize(name, value):
+                mismatched.append(f'{name} is {actual!r}, configured {value!r}')
+    if mismatched:
+        raise ImproperlyConfigured(
+            f'SQLite database {connection.settings_dict["NAME"]} did not accept its PRAGMAs: '
+            + '; '.join(mismatched)
+        )
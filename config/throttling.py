@@ -0,0 +1,156 @@
+"""
+Request throttling with sliding-window counters in a store shared by every
+worker process.
+
+DRF's SimpleRateThrottle keeps a list of request timestamps per client in
+the default cache: per process with locmem, so N workers allow N times the
+limit, and every request rewrites a list as long as the limit. Here each
+client and scope has one integer counter per fixed window. The rate is
+estimated from the current window plus the previous one, weighted by how
+much of it still overlaps the sliding window. That costs an atomic
+increment and one read per request, whatever the limit.
+
+Scopes: a view's `throttle_scope` picks its rate from DEFAULT_THROTTLE_RATES
+(login, register, sets, ...), and `write_throttle_scope` does so for unsafe
+methods only; other requests use 'user' or 'anon'.
+THROTTLE_STORE selects where counters live: 'sqlite' (a local file, shared
+by the processes on one host) or 'cache' (the THROTTLE_CACHE_ALIAS cache,
+e.g. Redis in production, whose incr is atomic).
+"""
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+_DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'100/minute' -> (100, 60)"""
+    count, period = rate.split('/')
+    return int(count), _DURATIONS[period[0]]
+
+
+class CacheCounterStore:
+    """Counters in a Django cache; atomic across processes when the backend's incr is (Redis, Memcached)."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def hit(self, key, window, duration):
+        cache = caches[self.alias]
+        current_key = f'{key}:{window}'
+        # Kept for two windows: the next one still weighs this one in.
+        cache.add(current_key, 0, timeout=2 * duration)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:  # evicted between add() and incr()
+            cache.set(current_key, 1, timeout=2 * duration)
+            current = 1
+        return cache.get(f'{key}:{window - 1}', 0), current
+
+
+class SQLiteCounterStore:
+    """Counters in a local SQLite file, one upsert per hit; a stand-in for Redis on a single host."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            # Counters are disposable: no fsync, and readers never wait.
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            # Window numbers of different durations don't compare, so rows
+            # carry the time they expire at.
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS throttle_counter '
+                '(key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at INTEGER NOT NULL) WITHOUT ROWID'
+            )
+            self.local.conn, self.local.pruned_at = conn, 0
+        return conn
+
+    def hit(self, key, window, duration):
+        conn = self.connection()
+        start = window * duration
+        if start > self.local.pruned_at:
+            # Once per new window per thread: drop counters nothing reads any
+            # more. Kept for two windows, as the next one still weighs this
+            # one in.
+            self.local.pruned_at = start
+            conn.execute('DELETE FROM throttle_counter WHERE expires_at <= ?', (start,))
+        current = conn.execute(
+            'INSERT INTO throttle_counter (key, count, expires_at) VALUES (?, 1, ?) '
+            'ON CONFLICT (key) DO UPDATE SET count = count + 1 RETURNING count',
+            (f'{key}:{window}', start + 2 * duration),
+        ).fetchone()[0]
+        row = conn.execute('SELECT count FROM throttle_counter WHERE key = ?', (f'{key}:{window - 1}',)).fetchone()
+        return (row[0] if row else 0), current
+
+
+_stores = {}
+
+
+def get_store():
+    name = settings.THROTTLE_STORE
+    if name not in _stores:
+        if name == 'sqlite':
+            _stores[name] = SQLiteCounterStore(settings.THROTTLE_SQLITE_PATH)
+        elif name == 'cache':
+            _stores[name] = CacheCounterStore(settings.THROTTLE_CACHE_ALIAS)
+        else:
+            raise ImproperlyConfigured(f"THROTTLE_STORE must be 'sqlite' or 'cache', not {name!r}.")
+    return _stores[name]
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Limits each client per scope. Requests over the limit are counted too,
+    so a client that keeps hammering stays throttled rather than getting
+    through again at the start of every window.
+    """
+    timer = time.time
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope and request.method not in SAFE_METHODS:
+            scope = getattr(view, 'write_throttle_scope', None)
+        if scope:
+            return scope
+        return 'user' if request.user and request.user.is_authenticated else 'anon'
+
+    def get_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{super().get_ident(request)}'
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        self.limit, self.duration = parse_rate(rate)
+        now = self.timer()
+        window, into = divmod(now, self.duration)
+        window = int(window)
+        self.previous, self.current = get_store().hit(f'throttle:{scope}:{self.get_ident(request)}', window, self.duration)
+        self.remaining_fraction = 1 - into / self.duration
+        return self.previous * self.remaining_fraction + self.current <= self.limit
+
+    def wait(self):
+        # Until the previous window's weight has decayed enough, or failing
+        # that until the current window becomes the previous one.
+        left = self.remaining_fraction * self.duration
+        if self.previous:
+            excess = self.previous * self.remaining_fraction + self.current - self.limit
+            return min(left, excess / self.previous * self.duration)
+        return left
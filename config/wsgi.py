@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
+from django.db import connection
+
+from config.sqlite import verify_pragmas
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Fail at boot rather than under load if SQLite ignored its PRAGMAs.
+verify_pragmas(connection, settings.SQLITE_PRAGMAS)
+connection.close()
@@ -0,0 +1,98 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+# Token claims that carry a user field, besides the id.
+CLAIM_FIELDS = ('username',)
+
+
+def active_cache_key(user_id):
+    return f'auth:active:{user_id}'
+
+
+def is_active(user_id):
+    """
+    Whether the user exists and is active, remembered for
+    AUTH_ACTIVE_CACHE_TTL seconds (0 checks the database every time).
+    """
+    ttl = settings.AUTH_ACTIVE_CACHE_TTL
+    if ttl:
+        cached = cache.get(active_cache_key(user_id))
+        if cached is not None:
+            return cached
+    active = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}, is_active=True).exists()
+    if ttl:
+        cache.set(active_cache_key(user_id), active, timeout=ttl)
+    return active
+
+
+async def ais_active(user_id):
+    """is_active() for async views."""
+    ttl = settings.AUTH_ACTIVE_CACHE_TTL
+    if ttl:
+        cached = await cache.aget(active_cache_key(user_id))
+        if cached is not None:
+            return cached
+    active = await User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}, is_active=True).aexists()
+    if ttl:
+        await cache.aset(active_cache_key(user_id), active, timeout=ttl)
+    return active
+
+
+def claims_user(validated_token):
+    """
+    A User built from the token alone. Fields without a claim are deferred,
+    so Django loads one from the database only if something reads it.
+    """
+    claims = {api_settings.USER_ID_FIELD: validated_token[api_settings.USER_ID_CLAIM]}
+    claims.update((field, validated_token[field]) for field in CLAIM_FIELDS if field in validated_token)
+    fields = [f for f in User._meta.concrete_fields if f.attname in claims]
+    # Claims are JSON: simplejwt writes the id as a string.
+    return User.from_db(None, [f.attname for f in fields], [f.to_python(claims[f.attname]) for f in fields])
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the user query on every request. The views
+    only filter on request.user, which needs nothing beyond the token's
+    claims; whether the account is still active is checked through a short
+    cache instead (see is_active).
+    """
+
+    def get_user(self, validated_token):
+        # Revocation on password change compares against the stored hash.
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        if not is_active(self.claimed_user_id(validated_token)):
+            raise AuthenticationFailed(_("User not found or inactive"), code="user_inactive")
+        return claims_user(validated_token)
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views (workouts.async_views)."""
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return await sync_to_async(self.authenticate)(request)
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        # Signature and expiry checks need no I/O.
+        validated_token = self.get_validated_token(raw_token)
+        if not await ais_active(self.claimed_user_id(validated_token)):
+            raise AuthenticationFailed(_("User not found or inactive"), code="user_inactive")
+        return claims_user(validated_token), validated_token
+
+    @staticmethod
+    def claimed_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from users.tokens import prune_expired_tokens, table_sizes
+
+
+class Command(BaseCommand):
+    help = "Delete expired refresh tokens and their blacklist entries in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Tokens deleted per transaction.")
+        parser.add_argument('--max-seconds', type=float, help="Stop after this long; the next run carries on.")
+
+    def handle(self, *args, **options):
+        before = table_sizes()
+        result = prune_expired_tokens(options['batch_size'], options['max_seconds'])
+        after = table_sizes()
+        rate = result['outstanding_deleted'] / result['seconds'] if result['seconds'] else 0
+        self.stdout.write(
+            f"Outstanding tokens: {before['outstanding']} -> {after['outstanding']}, "
+            f"blacklisted: {before['blacklisted']} -> {after['blacklisted']}."
+        )
+        message = (
+            f"Pruned {result['outstanding_deleted']} expired tokens "
+            f"({result['blacklisted_deleted']} blacklisted) in {result['batches']} batches, "
+            f"{result['seconds']}s, {rate:.0f} tokens/s."
+        )
+        if result['complete']:
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(self.style.WARNING(message + " Stopped at --max-seconds; expired tokens remain."))
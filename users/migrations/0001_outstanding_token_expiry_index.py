@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Index token_blacklist's expires_at, which pruning filters on. The table
+    belongs to simplejwt, so the index is plain SQL rather than model state.
+    """
+
+    dependencies = [
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX users_outstandingtoken_expires_idx ON token_blacklist_outstandingtoken (expires_at)',
+            'DROP INDEX users_outstandingtoken_expires_idx',
+        ),
+    ]
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import active_cache_key
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_active_status(sender, instance, **kwargs):
+    # Only this process's cache; other workers catch up within AUTH_ACTIVE_CACHE_TTL.
+    cache.delete(active_cache_key(instance.pk))
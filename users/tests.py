@@ -1,9 +1,19 @@
-from django.test import TestCase
+import datetime
+import io
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from users.authentication import ClaimsJWTAuthentication
+from users.tokens import BloomFilter, FilteredRefreshToken, blacklist_filter, prune_expired_tokens
 
 User = get_user_model()
 
@@ -84,4 +94,107 @@ class UserAuthTests(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
         response = self.client.post(self.logout_url, {'refresh': 'invalidtoken'})
         self.assertEqual(response.status_code, 400)
-        self.assertIn('error', response.data)
\ No newline at end of file
+        self.assertIn('error', response.data)
+
+
+@override_settings(AUTH_ACTIVE_CACHE_TTL=60)
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='claims', email='claims@example.com', password='Password123!')
+        self.addCleanup(cache.clear)
+
+    def authenticate(self, token):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return ClaimsJWTAuthentication().authenticate(request)[0]
+
+    def test_login_tokens_carry_the_username(self):
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'claims', 'password': 'Password123!'})
+        self.assertEqual(AccessToken(response.data['access'])['username'], 'claims')
+
+    def test_user_comes_from_claims_and_loads_lazily(self):
+        token = AccessToken.for_user(self.user)
+        token['username'] = 'claims'
+        self.authenticate(token)  # caches the active check
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+            self.assertEqual((user.pk, user.username), (self.user.pk, 'claims'))
+            self.assertTrue(user.is_authenticated)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'claims@example.com')
+
+    def test_deactivated_user_is_rejected(self):
+        token = AccessToken.for_user(self.user)
+        self.authenticate(token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tokens', email='tokens@example.com', password='Password123!')
+        blacklist_filter.clear()
+        self.addCleanup(blacklist_filter.clear)
+
+    def outstanding(self, jti, expires_in, blacklisted=False):
+        token = OutstandingToken.objects.create(
+            user=self.user, jti=jti, token='x', expires_at=aware_utcnow() + datetime.timedelta(days=expires_in)
+        )
+        if blacklisted:
+            BlacklistedToken.objects.create(token=token)
+
+    def test_prune_deletes_only_expired_tokens_in_batches(self):
+        for i in range(5):
+            self.outstanding(f'old{i}', -1, blacklisted=i % 2 == 0)
+        self.outstanding('live', 1, blacklisted=True)
+        result = prune_expired_tokens(batch_size=2)
+        self.assertEqual(
+            (result['outstanding_deleted'], result['blacklisted_deleted'], result['batches'], result['complete']),
+            (5, 3, 3, True),
+        )
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+    def test_prune_command_reports_sizes(self):
+        self.outstanding('old', -1, blacklisted=True)
+        out = io.StringIO()
+        call_command('prune_tokens', stdout=out)
+        self.assertIn('Outstanding tokens: 1 -> 0, blacklisted: 1 -> 0.', out.getvalue())
+        self.assertIn('Pruned 1 expired tokens (1 blacklisted)', out.getvalue())
+
+    @override_settings(JWT_BLACKLIST_FILTER_TTL=60)
+    def test_filter_skips_the_lookup_for_tokens_never_blacklisted(self):
+        token = str(FilteredRefreshToken.for_user(self.user))
+        with self.assertNumQueries(1):  # builds the filter
+            FilteredRefreshToken(token)
+        with self.assertNumQueries(0):
+            FilteredRefreshToken(token)
+        FilteredRefreshToken(token).blacklist()
+        with self.assertRaises(TokenError):
+            FilteredRefreshToken(token)
+
+    @override_settings(JWT_BLACKLIST_FILTER_TTL=60)
+    def test_filter_refreshes_with_new_rows_only(self):
+        self.outstanding('first', 1, blacklisted=True)
+        self.assertTrue(blacklist_filter.might_contain('first'))
+        self.outstanding('second', 1, blacklisted=True)  # by another process
+        blacklist_filter.built_at -= 61
+        with self.assertNumQueries(1) as ctx:
+            self.assertTrue(blacklist_filter.might_contain('second'))
+        self.assertIn('"id" >', ctx.captured_queries[0]['sql'])
+        self.assertEqual(blacklist_filter.count, 2)
+
+        # While one thread refreshes, the others read the current filter.
+        blacklist_filter.built_at -= 61
+        with blacklist_filter.refresh_lock, self.assertNumQueries(0):
+            self.assertTrue(blacklist_filter.might_contain('first'))
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
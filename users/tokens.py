@@ -0,0 +1,180 @@
+"""
+Refresh-token blacklist upkeep.
+
+Rotation and logout add a blacklist row for every refresh, so the tables
+grow with usage. prune_expired_tokens() deletes the rows of expired tokens
+(which no longer verify anyway) in bounded batches, for cron or any other
+scheduler; `manage.py prune_tokens` runs it. BlacklistFilter puts an
+in-process bloom filter in front of the blacklist lookup that every refresh
+makes, so tokens that were never blacklisted skip the query.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class BloomFilter:
+    """Set membership with false positives (about `error_rate`) but no false negatives."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions from two independent 64-bit halves.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistFilter:
+    """
+    The jtis of unexpired blacklisted tokens. The filter is built from the
+    table once and then topped up every JWT_BLACKLIST_FILTER_TTL seconds
+    with the rows added since, by id; it is only rebuilt in full once it
+    holds more jtis than it was sized for, which also drops the expired
+    ones. One thread at a time refreshes it while the others keep reading
+    the current filter. Tokens blacklisted by this process are added
+    straight away; one blacklisted by another process can be missed until
+    the next refresh. A TTL of 0 turns the filter off.
+    """
+    # Ids are handed out before commit, so a row can become visible after
+    # higher ids have been read; every top-up looks this far back again.
+    rescan_ids = 100
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.bloom = None
+        self.built_at = 0.0
+        self.capacity = 0
+        self.count = 0
+        self.last_id = 0
+        self.added = set()  # blacklisted here since the current rebuild started
+
+    def is_stale(self, ttl):
+        return self.bloom is None or time.monotonic() - self.built_at > ttl
+
+    def might_contain(self, jti):
+        ttl = settings.JWT_BLACKLIST_FILTER_TTL
+        if ttl <= 0:
+            return True
+        if self.is_stale(ttl):
+            # Only the first build makes callers wait.
+            if self.refresh_lock.acquire(blocking=self.bloom is None):
+                try:
+                    if self.is_stale(ttl):
+                        self.refresh()
+                finally:
+                    self.refresh_lock.release()
+        return jti in self.bloom
+
+    def add(self, jti):
+        with self.lock:
+            self.added.add(jti)
+            if self.bloom is not None:
+                self.bloom.add(jti)
+
+    def rows(self, after_id=0):
+        return (
+            BlacklistedToken.objects.filter(id__gt=after_id, token__expires_at__gt=aware_utcnow())
+            .order_by().values_list('id', 'token__jti')
+        )
+
+    def refresh(self):
+        if self.bloom is None or self.count > self.capacity:
+            return self.rebuild()
+        started = time.monotonic()
+        rows = list(self.rows(max(self.last_id - self.rescan_ids, 0)).iterator())
+        with self.lock:
+            for row_id, jti in rows:
+                self.bloom.add(jti)
+                if row_id > self.last_id:
+                    self.count += 1
+            self.last_id = max([self.last_id, *(row_id for row_id, _ in rows)])
+            self.built_at = started
+
+    def rebuild(self):
+        with self.lock:
+            self.added = set()
+        started = time.monotonic()
+        rows = list(self.rows().iterator())
+        # Room to grow between rebuilds without raising the error rate.
+        capacity = 2 * len(rows) + 1024
+        bloom = BloomFilter(capacity)
+        for _, jti in rows:
+            bloom.add(jti)
+        with self.lock:
+            for jti in self.added:
+                bloom.add(jti)
+            self.bloom, self.built_at, self.capacity = bloom, started, capacity
+            self.count = len(rows) + len(self.added)
+            self.last_id = max((row_id for row_id, _ in rows), default=0)
+
+    def clear(self):
+        with self.lock:
+            self.bloom, self.built_at, self.added = None, 0.0, set()
+            self.capacity = self.count = self.last_id = 0
+
+
+blacklist_filter = BlacklistFilter()
+
+
+class FilteredRefreshToken(RefreshToken):
+    """A RefreshToken that asks the blacklist filter before the database."""
+
+    def check_blacklist(self):
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return result
+
+
+def table_sizes():
+    return {
+        'outstanding': OutstandingToken.objects.count(),
+        'blacklisted': BlacklistedToken.objects.count(),
+    }
+
+
+def prune_expired_tokens(batch_size=1000, max_seconds=None, now=None):
+    """
+    Delete expired outstanding tokens and their blacklist rows, `batch_size`
+    tokens per transaction, stopping early once `max_seconds` have passed.
+    Returns the counts, the time taken and whether anything expired is left.
+    """
+    now = now or aware_utcnow()
+    expired = OutstandingToken.objects.filter(expires_at__lte=now).order_by().values_list('id', flat=True)
+    result = {'outstanding_deleted': 0, 'blacklisted_deleted': 0, 'batches': 0, 'complete': False}
+    started = time.monotonic()
+    while max_seconds is None or time.monotonic() - started < max_seconds:
+        ids = list(expired[:batch_size])
+        if not ids:
+            result['complete'] = True
+            break
+        with transaction.atomic():
+            result['blacklisted_deleted'] += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            result['outstanding_deleted'] += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+        result['batches'] += 1
+    result['seconds'] = round(time.monotonic() - started, 3)
+    return result
@@ -3,10 +3,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from .serializers import RegisterSerializer
+from .tokens import FilteredRefreshToken
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 from rest_framework.generics import CreateAPIView
 
 # Create your views here.
@@ -14,7 +13,7 @@ from rest_framework.generics import CreateAPIView
 class RegisterView(APIView):
 
     serializer_class = RegisterSerializer
-    throttle_classes = [UserRateThrottle, AnonRateThrottle]
+    throttle_scope = 'register'
     
     permission_classes = [AllowAny]
 
@@ -33,7 +32,7 @@ class LogoutView(APIView):
             refresh_token = request.data.get("refresh")
             if not refresh_token:
                 return Response({"error": "Refresh token is required"}, status=status.HTTP_400_BAD_REQUEST)
-            token = RefreshToken(refresh_token)
+            token = FilteredRefreshToken(refresh_token)
             token.blacklist()
             return Response({"detail": "Logout successful"}, status=status.HTTP_205_RESET_CONTENT)
         except Exception as e:
@@ -41,4 +40,4 @@ class LogoutView(APIView):
         
 class ThrottledTokenObtainPairView(TokenObtainPairView):
     
-    throttle_classes = [UserRateThrottle, AnonRateThrottle]
\ No newline at end of file
+    throttle_scope = 'login'
\ No newline at end of file
@@ -1,13 +1,18 @@
 from django.contrib import admin
-from .models import Workout, Exercise, Set
+from .models import Workout, Exercise, ExerciseType, Set
 
 class SetInline(admin.TabularInline):
     model = Set
     extra = 1
 
+    def get_queryset(self, request):
+        # Set.__str__ labels each row with its exercise's name.
+        return super().get_queryset(request).select_related('exercise')
+
 class ExerciseInline(admin.TabularInline):
     model = Exercise
     extra = 1
+    exclude = ('exercise_type',)  # resolved from the name on save
 
 @admin.register(Workout)
 class WorkoutAdmin(admin.ModelAdmin):
@@ -17,11 +22,24 @@ class WorkoutAdmin(admin.ModelAdmin):
 
 @admin.register(Exercise)
 class ExerciseAdmin(admin.ModelAdmin):
-    list_display = ('name', 'workout', 'created_at', 'updated_at')
-    readonly_fields = ('created_at', 'updated_at')
+    list_display = ('name', 'exercise_type', 'workout', 'created_at', 'updated_at')
+    readonly_fields = ('exercise_type', 'created_at', 'updated_at')
     inlines = [SetInline]
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'workout':
+            # Workout.__str__ shows the owner's username in every option.
+            kwargs['queryset'] = Workout.objects.select_related('user')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 @admin.register(Set)
 class SetAdmin(admin.ModelAdmin):
     list_display = ('exercise', 'set_number', 'reps', 'weight', 'created_at', 'updated_at')
-    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(ExerciseType)
+class ExerciseTypeAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'created_at')
+    list_filter = (('user', admin.EmptyFieldListFilter),)
+    search_fields = ('name',)
+    readonly_fields = ('created_at',)
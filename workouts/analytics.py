@@ -0,0 +1,128 @@
+"""
+Vectorized progression analytics (estimated 1RM, weekly volume, PRs, trend).
+
+A user's sets for one exercise are read as columns and everything is
+computed with NumPy array operations. Weights are cast to a float in SQL and
+dates to ISO text, so the database driver hands back floats and strings,
+no Decimal or date object is built per row, and the rows go straight into
+one structured array.
+
+NumPy is optional: without it `np` is None and the analytics endpoints
+answer 503.
+"""
+from django.db import connections
+from django.db.models import CharField, F, FloatField
+from django.db.models.functions import Cast
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import ExerciseType, Set
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+FORMULAS = ('epley', 'brzycki')
+ROLLING_DAYS = 7
+ROW_DTYPE = [('day', 'datetime64[D]'), ('reps', 'int64'), ('weight', 'float64')]
+
+
+class AnalyticsUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Analytics are unavailable: NumPy is not installed."
+    default_code = 'analytics_unavailable'
+
+
+def load_columns(user, exercise, date_from=None, date_to=None):
+    """(days as datetime64[D], reps as int64, weights as float64), oldest first."""
+    # Through the catalog, so every spelling of the exercise counts.
+    type_id = ExerciseType.objects.resolve(user.id, [exercise], create=False).get(exercise)
+    sets = Set.objects.filter(user=user, exercise__exercise_type_id=type_id)
+    if date_from is not None:
+        sets = sets.filter(exercise__workout__date__gte=date_from)
+    if date_to is not None:
+        sets = sets.filter(exercise__workout__date__lte=date_to)
+    rows = sets.order_by('exercise__workout__date').values_list(
+        Cast(F('exercise__workout__date'), CharField()),
+        'reps',
+        Cast('weight', FloatField()),
+    )
+    # Straight from the cursor into a structured array: skips Django's
+    # per-row handling and any intermediate per-column lists.
+    sql, params = rows.query.sql_with_params()
+    with connections[rows.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        table = np.fromiter(cursor, dtype=ROW_DTYPE)
+    return table['day'], table['reps'], table['weight']
+
+
+def estimated_1rm(reps, weights, formula='epley'):
+    """Per-set 1RM estimates; a single is its own 1RM and a 0-rep set (a failed attempt) has none."""
+    reps_f = reps.astype(np.float64)
+    if formula == 'brzycki':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            estimate = weights * 36.0 / (37.0 - reps_f)
+        estimate[reps >= 37] = np.nan  # the formula breaks down past 36 reps
+    else:
+        estimate = weights * (1.0 + reps_f / 30.0)
+    estimate = np.where(reps == 1, weights, estimate)
+    estimate[reps == 0] = np.nan
+    return estimate
+
+
+def progression(days, reps, weights, formula='epley'):
+    """
+    Per training day: best estimated 1RM, volume, trailing 7-day volume and
+    whether the day set a new best; plus a least-squares trend of the daily
+    best against time. Inputs must be sorted by day.
+    """
+    if days.size == 0:
+        return {'days': [], 'trend': None}
+
+    # Sorted input, so each training day is a contiguous run of sets.
+    starts = np.concatenate(([0], np.flatnonzero(days[1:] != days[:-1]) + 1))
+    day_values = days[starts]
+    best = np.fmax.reduceat(estimated_1rm(reps, weights, formula), starts)
+    volume = np.add.reduceat(reps * weights, starts)
+
+    # Trailing calendar-week volume via a cumulative sum over every calendar day.
+    offsets = (day_values - day_values[0]).astype(np.int64)
+    dense = np.zeros(offsets[-1] + 1)
+    dense[offsets] = volume
+    cumulative = np.cumsum(dense)
+    trailing = cumulative[offsets] - np.where(
+        offsets >= ROLLING_DAYS, cumulative[np.maximum(offsets - ROLLING_DAYS, 0)], 0.0
+    )
+
+    # Days with no usable estimate (only failed attempts, or all sets past
+    # Brzycki's range) are NaN.
+    known = np.isfinite(best)
+    scored = np.where(known, best, -np.inf)
+    is_pr = scored > np.concatenate(([-np.inf], np.maximum.accumulate(scored)[:-1]))
+
+    trend = None
+    if np.count_nonzero(known) >= 2:
+        slope, intercept = np.polyfit(offsets[known].astype(np.float64), best[known], 1)
+        trend = {
+            'slope_per_week': round(float(slope * 7), 2),
+            'start': round(float(intercept), 2),
+            'end': round(float(intercept + slope * offsets[-1]), 2),
+        }
+
+    best_values = np.round(best, 2).astype(object)
+    best_values[~known] = None
+    columns = zip(
+        np.datetime_as_string(day_values).tolist(),
+        best_values.tolist(),
+        np.round(volume, 2).tolist(),
+        np.round(trailing, 2).tolist(),
+        is_pr.tolist(),
+    )
+    return {
+        'days': [
+            {'date': day, 'best_1rm': b, 'volume': v, 'weekly_volume': w, 'pr': pr}
+            for day, b, v, w, pr in columns
+        ],
+        'trend': trend,
+    }
@@ -0,0 +1,184 @@
+"""
+Async read endpoints for workouts, exercises and sets, for ASGI deployments
+(`uvicorn config.asgi:application`).
+
+DRF's views are synchronous, so under ASGI Django runs each request to them
+in a worker thread. These run on the event loop instead: the database is
+reached through the async ORM (acount, aget, async for) and users are
+authenticated with ClaimsJWTAuthentication.aauthenticate(). Querysets,
+filters, pagination and serializers are the sync views' own, so responses
+match theirs. GET only: writes, ETags and the response cache stay on the
+sync endpoints.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse
+from django_filters import rest_framework as django_filters
+from rest_framework import exceptions, generics, permissions
+from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.response import Response
+
+from config.metrics import serialization
+from config.routers import stop_replicas, use_replicas
+from .cache import pinned_to_primary
+from .models import Exercise
+from .pagination import StandardResultsSetPagination
+from .search import FullTextSearchFilter
+from .serializers import ExerciseSerializer, SetSerializer, WorkoutSerializer
+from .views import ExerciseQuerysetMixin, SetQuerysetMixin, WorkoutQuerysetMixin
+
+
+class AsyncReadAPIView(generics.GenericAPIView):
+    """
+    GenericAPIView with an async dispatch: authentication, permissions,
+    throttling, content negotiation and exception handling as in DRF, with
+    handlers that are coroutines.
+
+    Authenticators without an aauthenticate(), the throttle's counter store
+    and the primary-pin lookup in the cache are sync, so they run in a worker
+    thread through sync_to_async rather than on the loop.
+    """
+    http_method_names = ['get', 'head']
+    replica_token = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            if request.method.lower() not in self.http_method_names:
+                raise exceptions.MethodNotAllowed(request.method)
+            response = await getattr(self, request.method.lower())(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        finally:
+            if self.replica_token is not None:
+                stop_replicas(self.replica_token)
+                self.replica_token = None
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.rendered(self.response)
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+        request.version, request.versioning_scheme = self.determine_version(request, *args, **kwargs)
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        await sync_to_async(self.check_throttles)(request)
+        # Reads only, as in workouts.views.ReplicaReadMixin.
+        if not await sync_to_async(pinned_to_primary)(request.user.pk):
+            self.replica_token = use_replicas()
+
+    async def aperform_authentication(self, request):
+        # Request.user would otherwise authenticate synchronously on first use.
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, 'aauthenticate', None) or sync_to_async(authenticator.authenticate)
+            try:
+                user_auth_tuple = await authenticate(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._not_authenticated()
+
+    @staticmethod
+    def rendered(response):
+        """
+        The rendered response as a plain HttpResponse: Django's async handler
+        renders anything with a render() method in a worker thread.
+        """
+        response.render()
+        plain = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            plain[header] = value
+        return plain
+
+
+class AsyncListAPIView(AsyncReadAPIView):
+    async def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        with serialization():
+            data = serializer.data
+        return self.paginator.get_paginated_response(data)
+
+
+class AsyncRetrieveAPIView(AsyncReadAPIView):
+    async def get(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        with serialization():
+            data = serializer.data
+        return Response(data)
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, DjangoValidationError):
+            raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class ExerciseFilter(django_filters.FilterSet):
+    # The sync views' ModelChoiceFilter would validate the id with a
+    # synchronous query; an unknown type matches nothing instead of a 400.
+    exercise_type = django_filters.NumberFilter(field_name='exercise_type_id')
+
+    class Meta:
+        model = Exercise
+        fields = ['name', 'exercise_type']
+
+
+class AsyncWorkoutListAPIView(WorkoutQuerysetMixin, AsyncListAPIView):
+    serializer_class = WorkoutSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [django_filters.DjangoFilterBackend, OrderingFilter, FullTextSearchFilter]
+    filterset_fields = ['date', 'name']
+    ordering_fields = ['date', 'name', 'created_at']
+    ordering = ['-date', 'id']
+
+
+class AsyncWorkoutRetrieveAPIView(WorkoutQuerysetMixin, AsyncRetrieveAPIView):
+    serializer_class = WorkoutSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+
+class AsyncExerciseListAPIView(ExerciseQuerysetMixin, AsyncListAPIView):
+    serializer_class = ExerciseSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [django_filters.DjangoFilterBackend, OrderingFilter, SearchFilter]
+    filterset_class = ExerciseFilter
+    ordering_fields = ['name']
+    ordering = ['-id']
+
+
+class AsyncExerciseRetrieveAPIView(ExerciseQuerysetMixin, AsyncRetrieveAPIView):
+    serializer_class = ExerciseSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+
+class AsyncSetListAPIView(SetQuerysetMixin, AsyncListAPIView):
+    serializer_class = SetSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [django_filters.DjangoFilterBackend, OrderingFilter, SearchFilter]
+    filterset_fields = ['set_number', 'reps', 'weight']
+    ordering_fields = ['set_number', 'reps', 'weight']
+    ordering = ['-id']
+
+
+class AsyncSetRetrieveAPIView(SetQuerysetMixin, AsyncRetrieveAPIView):
+    serializer_class = SetSerializer
+    permission_classes = [permissions.IsAuthenticated]
@@ -0,0 +1,137 @@
+"""
+Per-user response cache for the workout read endpoints.
+
+Every user has a generation number stored in the cache. Cached responses are
+keyed by it, and any write to that user's workouts, exercises or sets bumps
+it once the transaction commits (see workouts.signals), so stale entries are
+never read again and simply age out of the LRU.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def is_enabled():
+    return settings.RESPONSE_CACHE_TTL > 0
+
+
+def generation_key(user_id):
+    return f'workouts:gen:{user_id}'
+
+
+def get_generation(user_id):
+    cache = get_cache()
+    key = generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Seeded from the clock so an evicted counter never restarts at a
+        # value that older entries were stored under.
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(user_id):
+    cache = get_cache()
+    try:
+        cache.incr(generation_key(user_id))
+    except ValueError:
+        cache.set(generation_key(user_id), time.time_ns(), timeout=None)
+
+
+def primary_pin_key(user_id):
+    return f'workouts:primary:{user_id}'
+
+
+def pin_to_primary(user_id):
+    get_cache().set(primary_pin_key(user_id), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def pinned_to_primary(user_id):
+    """Whether the user wrote recently enough that a replica may not have their change yet."""
+    return bool(settings.DATABASE_REPLICAS) and get_cache().get(primary_pin_key(user_id), False)
+
+
+def invalidate_user(user_id):
+    """
+    Drop the user's cached responses once the current transaction commits,
+    and keep their reads on the primary for a while: a response built from a
+    lagging replica would otherwise be cached under the new generation.
+    """
+    if user_id is None:
+        return
+    if is_enabled():
+        transaction.on_commit(lambda: bump_generation(user_id))
+    if settings.DATABASE_REPLICAS:
+        transaction.on_commit(lambda: pin_to_primary(user_id))
+
+
+def response_cache_key(request, view_name):
+    # The absolute URI covers the query string (filters, ordering, page or
+    # cursor, fields) and the host used in pagination links.
+    digest = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'workouts:resp:{request.user.id}:{get_generation(request.user.id)}:{view_name}:{digest}'
+
+
+def get_cached_validators(request, view_name):
+    """(etag, last_modified) stored for this response, or None."""
+    if not is_enabled():
+        return None
+    return get_cache().get(response_cache_key(request, view_name) + ':validators')
+
+
+def set_cached_validators(request, view_name, validators):
+    if is_enabled():
+        get_cache().set(response_cache_key(request, view_name) + ':validators', validators, timeout=settings.RESPONSE_CACHE_TTL)
+
+
+def record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def cache_stats():
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 4) if total else None}
+
+
+class CachedResponseMixin:
+    """Serves list() and retrieve() from the per-user response cache."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not is_enabled():
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = response_cache_key(request, type(self).__name__)
+        data = cache.get(key)
+        if data is not None:
+            record('hits')
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        record('misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=settings.RESPONSE_CACHE_TTL)
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,53 @@
+"""
+In-process cache of exercise name -> ExerciseType id resolutions.
+
+Keys are (user id, normalized name). Entries are only added once the
+transaction that read or created the type has committed, so a rolled-back
+insert never leaves an id behind. Any change to the catalog clears the
+cache (see workouts.signals); types are rarely edited and never deleted
+while exercises reference them.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+
+
+def normalize(name):
+    return name.strip().lower()
+
+
+def get(user_id, key):
+    if settings.EXERCISE_TYPE_CACHE_SIZE <= 0:
+        return None
+    with _lock:
+        type_id = _entries.get((user_id, key))
+        if type_id is not None:
+            _entries.move_to_end((user_id, key))
+        return type_id
+
+
+def remember(user_id, resolved):
+    """Cache `{key: type_id}` for the user after the current transaction commits."""
+    size = settings.EXERCISE_TYPE_CACHE_SIZE
+    if size <= 0 or not resolved:
+        return
+
+    def store():
+        with _lock:
+            for key, type_id in resolved.items():
+                _entries[(user_id, key)] = type_id
+                _entries.move_to_end((user_id, key))
+            while len(_entries) > size:
+                _entries.popitem(last=False)
+
+    transaction.on_commit(store)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
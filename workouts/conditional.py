@@ -0,0 +1,125 @@
+"""
+Conditional requests (ETag / Last-Modified) for the workout endpoints.
+
+Validators are computed from MAX(updated_at) and COUNT over the rows a
+response is built from, before anything is serialized. Counts are part of
+the ETag so deletions change it. MAX(updated_at) cannot see deletions, so
+a list's Last-Modified also takes the user's latest tombstone
+(DeletedRecord); If-None-Match still wins over If-Modified-Since when both
+are sent.
+"""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import get_cached_validators, set_cached_validators
+from .models import DeletedRecord
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+class ConditionalRequestMixin:
+    """
+    Adds ETag/Last-Modified to list() and retrieve(), answers matching
+    If-None-Match/If-Modified-Since with 304, and enforces If-Match on updates.
+
+    Views provide get_validator_querysets(), filtered to the requesting user.
+    The first queryset is the one the response is about, and a detail response
+    is only validated if it matched a row. While the response cache is on,
+    validators are cached under the same user generation as the responses.
+    """
+
+    def get_validators(self, request):
+        cached = get_cached_validators(request, type(self).__name__)
+        if cached is not None:
+            return cached
+        validators = self.compute_validators(request)
+        set_cached_validators(request, type(self).__name__, validators)
+        return validators
+
+    def compute_validators(self, request):
+        # One round trip: a COUNT and MAX(updated_at) subquery per queryset.
+        # The querysets are all scoped to the requesting user, so grouping by
+        # user collapses each to a single row.
+        querysets = self.get_validator_querysets()
+        annotations = {}
+        for i, queryset in enumerate(querysets):
+            grouped = queryset.order_by().values('user')
+            annotations[f'rows{i}'] = Subquery(grouped.annotate(n=Count('id')).values('n'))
+            annotations[f'latest{i}'] = Subquery(grouped.annotate(m=Max('updated_at')).values('m'))
+        if not self.is_detail():
+            tombstones = DeletedRecord.objects.filter(user=OuterRef('pk')).order_by().values('user')
+            annotations['deleted'] = Subquery(tombstones.annotate(m=Max('deleted_at')).values('m'))
+        row = get_user_model().objects.filter(pk=request.user.pk).values(**annotations).first() or {}
+
+        if not row.get('rows0') and self.is_detail():
+            return None, None
+        state, latest = [], None
+        for i in range(len(querysets)):
+            rows, newest = row.get(f'rows{i}') or 0, row.get(f'latest{i}')
+            state.append(f"{rows}@{newest.isoformat() if newest else '-'}")
+            if newest and (latest is None or newest > latest):
+                latest = newest
+        deleted = row.get('deleted')
+        if deleted:
+            state.append(f'deleted@{deleted.isoformat()}')
+            if latest is None or deleted > latest:
+                latest = deleted
+        # The query string shapes the body (filters, pages, fields), so it is
+        # part of the tag; the negotiated format is covered by Vary: Accept.
+        digest = hashlib.md5('|'.join([request.get_full_path(), *state]).encode()).hexdigest()
+        return f'"{digest}"', latest
+
+    def is_detail(self):
+        return (self.lookup_url_kwarg or self.lookup_field) in self.kwargs
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        if_match = request.headers.get('If-Match')
+        if if_match:
+            # Always fresh: this guards a write.
+            etag, _ = self.compute_validators(request)
+            tags = parse_etags(if_match)
+            # A missing object falls through to the usual 404.
+            if etag is not None and '*' not in tags and etag not in tags:
+                return Response(
+                    {'detail': 'The resource has changed since it was fetched.'},
+                    status=status.HTTP_412_PRECONDITION_FAILED,
+                )
+        return super().update(request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        if self.not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    @staticmethod
+    def not_modified(request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            tags = [_strip_weak(tag) for tag in parse_etags(if_none_match)]
+            return '*' in tags or etag in tags
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return since is not None and last_modified is not None and int(last_modified.timestamp()) <= since
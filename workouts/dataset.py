@@ -0,0 +1,101 @@
+"""
+Synthetic training histories for benchmarks and load tests: N users, each
+training a few days a week for some years, written with bulk_create.
+
+Every user gets a routine of exercise sessions that rotates through their
+training days. Working weights climb slowly over the years with some noise,
+so stats, records and progression endpoints have realistic shapes to chew on.
+Generated through `python manage.py generate_dataset`; benchmarks.endpoints
+calls generate() directly.
+"""
+import datetime
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import Exercise, ExerciseType, Set, Workout
+from .stats import rebuild_all
+
+SESSIONS = {
+    'Push': ['Bench Press', 'Overhead Press', 'Dip'],
+    'Pull': ['Deadlift', 'Barbell Row', 'Pull Up'],
+    'Legs': ['Squat', 'Lunge', 'Deadlift'],
+    'Full Body': ['Squat', 'Bench Press', 'Barbell Row', 'Overhead Press'],
+}
+EXERCISE_NAMES = list(dict.fromkeys(name for names in SESSIONS.values() for name in names))
+
+
+def usernames(prefix, users):
+    return [f'{prefix}{i}' for i in range(users)]
+
+
+def generate(users=10, years=1, days_per_week=3, sets_per_exercise=4, prefix='bench', password='bench-password',
+             seed=0, end=None, batch_size=5000):
+    """
+    Create `users` users with `years` of history up to `end` (today) and
+    return the row counts. Usernames are `prefix` plus a number.
+    """
+    end = end or datetime.date.today()
+    start = end - datetime.timedelta(days=round(365.25 * years))
+    # Hashing is deliberately slow; every user shares the one hash.
+    hashed = make_password(password)
+    User = get_user_model()
+    created = User.objects.bulk_create(
+        [User(username=name, email=f'{name}@example.com', password=hashed) for name in usernames(prefix, users)],
+        batch_size=batch_size,
+    )
+    counts = {'users': len(created), 'workouts': 0, 'exercises': 0, 'sets': 0, 'daily_stats': 0}
+    for user in created:
+        with transaction.atomic():
+            for table, written in _history(user, random.Random(f'{seed}:{user.username}'), start, end,
+                                           days_per_week, sets_per_exercise, batch_size).items():
+                counts[table] += written
+        counts['daily_stats'] += rebuild_all(user)
+    return counts
+
+
+def _history(user, rng, start, end, days_per_week, sets_per_exercise, batch_size):
+    routine = rng.sample(list(SESSIONS), k=min(days_per_week, len(SESSIONS)))
+    weekdays = sorted(rng.sample(range(7), k=days_per_week))
+    types = ExerciseType.objects.resolve(user.pk, EXERCISE_NAMES)
+    # Each exercise starts somewhere between a novice and an intermediate lift.
+    base = {name: rng.uniform(20, 100) for name in EXERCISE_NAMES}
+
+    days = [
+        start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1)
+        if (start + datetime.timedelta(days=offset)).weekday() in weekdays
+    ]
+    sessions = [routine[i % len(routine)] for i in range(len(days))]
+    workouts = Workout.objects.bulk_create(
+        [Workout(user=user, date=day, name=session) for day, session in zip(days, sessions)],
+        batch_size=batch_size,
+    )
+    exercises = Exercise.objects.bulk_create(
+        [
+            Exercise(workout=workout, user=user, name=name, exercise_type_id=types[name])
+            for workout, session in zip(workouts, sessions)
+            for name in SESSIONS[session]
+        ],
+        batch_size=batch_size,
+    )
+
+    span = max((end - start).days, 1)
+    sets, written = [], 0
+    for exercise in exercises:
+        # Up to half again the starting weight by the end of the range.
+        progress = 1 + 0.5 * (exercise.workout.date - start).days / span
+        top = base[exercise.name] * progress
+        for number in range(1, sets_per_exercise + 1):
+            weight = top * rng.uniform(0.85, 1.0)
+            sets.append(Set(
+                exercise=exercise, user=user, set_number=number,
+                reps=rng.randint(3, 12), weight=Decimal(round(weight * 2)) / 2,
+            ))
+        if len(sets) >= batch_size:
+            Set.objects.bulk_create(sets, batch_size=batch_size)
+            written, sets = written + len(sets), []
+    Set.objects.bulk_create(sets, batch_size=batch_size)
+    return {'workouts': len(workouts), 'exercises': len(exercises), 'sets': written + len(sets)}
@@ -0,0 +1,85 @@
+"""
+Streaming export of a user's training history as CSV or NDJSON.
+
+Rows come from one flat workout -> exercise -> set join read with
+values_list().iterator(), so no model instances are built and memory use
+does not depend on how much history is exported. Output is buffered into
+chunks of roughly CHUNK_BYTES and can be gzipped as it streams.
+"""
+import csv
+import io
+import json
+import zlib
+
+from .models import Set
+
+CHUNK_SIZE = 2000
+CHUNK_BYTES = 64 * 1024
+
+COLUMNS = (
+    ('workout_id', 'exercise__workout_id'),
+    ('date', 'exercise__workout__date'),
+    ('workout', 'exercise__workout__name'),
+    ('exercise_id', 'exercise_id'),
+    ('exercise', 'exercise__name'),
+    ('set_id', 'id'),
+    ('set_number', 'set_number'),
+    ('reps', 'reps'),
+    ('weight', 'weight'),
+)
+HEADER = [name for name, _ in COLUMNS]
+
+
+def export_rows(user, date_from=None, date_to=None):
+    """Tuples in COLUMNS order, oldest workout first."""
+    queryset = Set.objects.filter(user=user)
+    if date_from is not None:
+        queryset = queryset.filter(exercise__workout__date__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(exercise__workout__date__lte=date_to)
+    return (
+        queryset
+        .order_by('exercise__workout__date', 'exercise__workout_id', 'exercise_id', 'set_number', 'id')
+        .values_list(*(lookup for _, lookup in COLUMNS))
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(rows):
+    buffer, size = [], 0
+    for row in rows:
+        line = json.dumps(dict(zip(HEADER, row)), default=str) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    yield ''.join(buffer)
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+FORMATS = {
+    'csv': (csv_chunks, 'text/csv'),
+    'ndjson': (ndjson_chunks, 'application/x-ndjson'),
+}
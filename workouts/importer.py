@@ -0,0 +1,262 @@
+"""
+Bulk import of workout logs from CSV or NDJSON.
+
+The file is read a row at a time and handled in chunks. Each chunk is
+validated with plain field checks (no serializer per row), resolves its
+workouts by (date, name) and exercises by (workout, name) against what is
+already stored, and is written with bulk_create in its own transaction.
+Sets that already exist (same exercise and set number) are skipped, so
+re-running a file after a failed chunk picks up where it stopped; `start_row`
+skips the rows known to be committed without even parsing them.
+
+Rows use the export columns (see workouts.export): date, workout, exercise,
+set_number, reps and weight. Other columns, such as ids, are ignored.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import DatabaseError, connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Exercise, ExerciseType, Set, Workout
+from .signals import bulk_saved
+
+CHUNK_ROWS = 5000
+MAX_REPORTED_ERRORS = 100
+NAME_MAX_LENGTH = Workout._meta.get_field('name').max_length
+WEIGHT_LIMIT = Decimal('1000')  # max_digits=5, decimal_places=2
+# Ids per `__in` lookup: unsorted files can span many workouts, and SQLite
+# builds allow as few as 999 parameters per statement.
+IN_BATCH_SIZE = 500
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    committed_rows: int = 0
+    workouts_created: int = 0
+    exercises_created: int = 0
+    sets_created: int = 0
+    sets_skipped: int = 0
+    errors: list = field(default_factory=list)
+    error_count: int = 0
+    failed: bool = False
+
+    def add_error(self, row, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'error': message})
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+
+def read_rows(stream, file_type):
+    """Yield row dicts from a text stream; rows are numbered from 1."""
+    if file_type == 'csv':
+        yield from csv.DictReader(stream)
+    elif file_type == 'ndjson':
+        for number, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    raise ImportFormatError(f"Row {number} is not valid JSON.")
+    else:
+        raise ImportFormatError(f"Unsupported file type {file_type!r}; use csv or ndjson.")
+
+
+def detect_type(filename):
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+
+def text_stream(binary):
+    # utf-8-sig drops the byte order mark spreadsheet exports like to add.
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+def insert_sets(sets):
+    """
+    INSERT sets with one executemany() statement.
+
+    bulk_create() compiles a placeholder and prepares a value per column per
+    row, which is where most of an import's time goes; a single statement
+    reused for every row is several times faster. Primary keys are not read
+    back, so the instances keep pk=None.
+    """
+    connection = connections[router.db_for_write(Set)]
+    ops = connection.ops
+    now = timezone.now()
+    stamp = ops.adapt_datetimefield_value(now)
+    weight = Set._meta.get_field('weight')
+    columns = [Set._meta.get_field(name).column for name in (
+        'exercise', 'user', 'set_number', 'reps', 'weight', 'created_at', 'updated_at',
+    )]
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        ops.quote_name(Set._meta.db_table),
+        ', '.join(ops.quote_name(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    params = []
+    for obj in sets:
+        obj.created_at = obj.updated_at = now
+        params.append((
+            obj.exercise_id, obj.user_id, obj.set_number, obj.reps,
+            ops.adapt_decimalfield_value(obj.weight, weight.max_digits, weight.decimal_places),
+            stamp, stamp,
+        ))
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _int_at_least(value, minimum):
+    # Through Decimal, as int() would quietly truncate 5.7 to 5.
+    number = Decimal(str(value).strip())
+    if not number.is_finite() or number != number.to_integral_value() or number < minimum:
+        raise ValueError
+    return int(number)
+
+
+def _filter_in(queryset, lookup, values):
+    """`queryset` rows whose `lookup` is in `values`, IN_BATCH_SIZE values per query."""
+    values = list(values)
+    for start in range(0, len(values), IN_BATCH_SIZE):
+        yield from queryset.filter(**{f'{lookup}__in': values[start:start + IN_BATCH_SIZE]})
+
+
+def clean_row(row):
+    """Validated (date, workout, exercise, set_number, reps, weight) or an error message."""
+    if not isinstance(row, dict):
+        return None, "Expected an object."
+    try:
+        day = parse_date(str(row.get('date') or '').strip())
+    except ValueError:  # well formed but not a real day, e.g. 2024-02-30
+        day = None
+    if day is None:
+        return None, "date: use the YYYY-MM-DD format."
+    workout = str(row.get('workout') or '').strip()
+    exercise = str(row.get('exercise') or '').strip()
+    if not exercise:
+        return None, "exercise: this field is required."
+    if len(workout) > NAME_MAX_LENGTH or len(exercise) > NAME_MAX_LENGTH:
+        return None, f"Names are limited to {NAME_MAX_LENGTH} characters."
+    try:
+        set_number = _int_at_least(row.get('set_number'), 1)
+        reps = _int_at_least(row.get('reps'), 0)
+    except (InvalidOperation, ValueError):
+        return None, "set_number must be a positive integer and reps a non-negative one."
+    try:
+        weight = Decimal(str(row.get('weight'))).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None, "weight: a number is required."
+    if not weight.is_finite():
+        return None, "weight: a number is required."
+    if not 0 <= weight < WEIGHT_LIMIT:
+        return None, "weight: must be between 0 and 999.99."
+    return (day, workout, exercise, set_number, reps, weight), None
+
+
+class WorkoutImporter:
+    def __init__(self, user, chunk_rows=CHUNK_ROWS, progress=None):
+        self.user = user
+        self.chunk_rows = chunk_rows
+        self.progress = progress
+
+    def run(self, rows, start_row=0):
+        result = ImportResult(rows=start_row, committed_rows=start_row)
+        rows = islice(rows, start_row, None)
+        while True:
+            chunk = list(islice(rows, self.chunk_rows))
+            if not chunk:
+                break
+            first = result.rows + 1
+            result.rows += len(chunk)
+            cleaned = []
+            for number, row in enumerate(chunk, first):
+                values, error = clean_row(row)
+                if error:
+                    result.add_error(number, error)
+                else:
+                    cleaned.append(values)
+            try:
+                counts = self.write_chunk(cleaned)
+            except DatabaseError as exc:
+                result.failed = True
+                result.add_error(first, f"Chunk starting here was rolled back: {exc}")
+                break
+            for name, count in counts.items():
+                setattr(result, name, getattr(result, name) + count)
+            result.committed_rows = result.rows
+            if self.progress:
+                self.progress(result)
+        return result
+
+    @transaction.atomic
+    def write_chunk(self, cleaned):
+        """Write one chunk of cleaned rows; returns the ImportResult counters to add."""
+        counts = dict.fromkeys(('workouts_created', 'exercises_created', 'sets_created', 'sets_skipped'), 0)
+        if not cleaned:
+            return counts
+        user = self.user
+        days = [row[0] for row in cleaned]
+        workouts = {
+            (w.date, w.name): w.id for w in Workout.objects.filter(
+                user=user, date__range=(min(days), max(days))
+            ).only('id', 'date', 'name').order_by('id')
+        }
+        new_workouts = {}
+        for day, name, *_ in cleaned:
+            if (day, name) not in workouts and (day, name) not in new_workouts:
+                new_workouts[(day, name)] = Workout(user=user, date=day, name=name)
+        if new_workouts:
+            Workout.objects.bulk_create(new_workouts.values())
+            workouts.update((key, w.id) for key, w in new_workouts.items())
+            counts['workouts_created'] = len(new_workouts)
+            bulk_saved.send(sender=Workout, objs=list(new_workouts.values()))
+
+        exercises = {
+            (e.workout_id, e.name): e.id for e in _filter_in(
+                Exercise.objects.filter(user=user).only('id', 'workout', 'name').order_by('id'),
+                'workout_id', set(workouts.values()),
+            )
+        }
+        existing_sets = set(_filter_in(
+            Set.objects.filter(user=user).values_list('exercise_id', 'set_number'),
+            'exercise_id', set(exercises.values()),
+        ))
+        new_exercises = {}
+        for day, workout_name, name, *_ in cleaned:
+            key = (workouts[(day, workout_name)], name)
+            if key not in exercises and key not in new_exercises:
+                new_exercises[key] = Exercise(workout_id=key[0], user=user, name=name)
+        if new_exercises:
+            types = ExerciseType.objects.resolve(user.id, [e.name for e in new_exercises.values()])
+            for exercise in new_exercises.values():
+                exercise.exercise_type_id = types[exercise.name]
+            Exercise.objects.bulk_create(new_exercises.values())
+            exercises.update((key, e.id) for key, e in new_exercises.items())
+            counts['exercises_created'] = len(new_exercises)
+            bulk_saved.send(sender=Exercise, objs=list(new_exercises.values()))
+
+        new_sets = []
+        for day, workout_name, exercise_name, set_number, reps, weight in cleaned:
+            exercise_id = exercises[(workouts[(day, workout_name)], exercise_name)]
+            if (exercise_id, set_number) in existing_sets:
+                counts['sets_skipped'] += 1
+                continue
+            existing_sets.add((exercise_id, set_number))
+            new_sets.append(Set(exercise_id=exercise_id, user=user, set_number=set_number, reps=reps, weight=weight))
+        if new_sets:
+            insert_sets(new_sets)
+            counts['sets_created'] = len(new_sets)
+            bulk_saved.send(sender=Set, objs=new_sets)
+        return counts
@@ -0,0 +1,38 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from workouts.dataset import generate, usernames
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic users with years of workouts, exercises and sets for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--years', type=float, default=1, help="History per user, ending today.")
+        parser.add_argument('--days-per-week', type=int, default=3, help="Training days per week (1-7).")
+        parser.add_argument('--sets-per-exercise', type=int, default=4)
+        parser.add_argument('--prefix', default='bench', help="Usernames are this plus a number.")
+        parser.add_argument('--password', default='bench-password', help="Every generated user's password.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT.")
+
+    def handle(self, *args, **options):
+        if not 1 <= options['days_per_week'] <= 7:
+            raise CommandError("--days-per-week must be between 1 and 7.")
+        taken = get_user_model().objects.filter(username__in=usernames(options['prefix'], options['users']))
+        if taken.exists():
+            raise CommandError(f"Users named {options['prefix']}<n> already exist; choose another --prefix.")
+        start = time.perf_counter()
+        counts = generate(
+            users=options['users'], years=options['years'], days_per_week=options['days_per_week'],
+            sets_per_exercise=options['sets_per_exercise'], prefix=options['prefix'],
+            password=options['password'], seed=options['seed'], batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts['users']} users, {counts['workouts']} workouts, {counts['exercises']} exercises "
+            f"and {counts['sets']} sets ({counts['daily_stats']} daily stat rows) "
+            f"in {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,50 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from workouts.importer import CHUNK_ROWS, ImportFormatError, WorkoutImporter, detect_type, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import a user's workouts, exercises and sets from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help="Username of the owner.")
+        parser.add_argument('--type', choices=['csv', 'ndjson'], help="Defaults to the file extension.")
+        parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+        parser.add_argument('--start-row', type=int, default=0, help="Skip rows already committed by an earlier run.")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}.")
+
+        started = time.perf_counter()
+
+        def progress(result):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{result.committed_rows} rows committed, {result.sets_created} sets created "
+                f"({result.committed_rows / elapsed:,.0f} rows/s)"
+            )
+
+        importer = WorkoutImporter(user, chunk_rows=options['chunk_rows'], progress=progress)
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                rows = read_rows(stream, options['type'] or detect_type(options['path']))
+                result = importer.run(rows, start_row=options['start_row'])
+        except (OSError, ImportFormatError) as exc:
+            raise CommandError(str(exc))
+
+        for error in result.errors:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        if result.failed:
+            raise CommandError(f"Import stopped; resume with --start-row {result.committed_rows}.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.rows} rows: {result.workouts_created} workouts, "
+            f"{result.exercises_created} exercises, {result.sets_created} sets "
+            f"({result.sets_skipped} already present, {result.error_count} invalid)."
+        ))
@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from workouts.stats import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-exercise daily stats table from the sets."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only rebuild this username's stats.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user named {options['user']!r}.")
+        written = rebuild_all(user)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} daily stat rows."))
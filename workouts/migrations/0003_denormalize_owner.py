@@ -0,0 +1,40 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_owner(apps, schema_editor):
+    Workout = apps.get_model('workouts', 'Workout')
+    Exercise = apps.get_model('workouts', 'Exercise')
+    Set = apps.get_model('workouts', 'Set')
+
+    # Exercises first, so sets can copy the owner from their exercise.
+    Exercise.objects.update(
+        user_id=Subquery(Workout.objects.filter(pk=OuterRef('workout_id')).values('user_id')[:1])
+    )
+    Set.objects.update(
+        user_id=Subquery(Exercise.objects.filter(pk=OuterRef('exercise_id')).values('user_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0002_composite_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='user',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='set',
+            name='user',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_owner, migrations.RunPython.noop),
+    ]
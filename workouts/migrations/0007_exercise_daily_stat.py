@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:44
+
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def backfill_stats(apps, schema_editor):
+    # Same aggregate as workouts.stats.daily_totals, against the historical models.
+    Set = apps.get_model('workouts', 'Set')
+    ExerciseDailyStat = apps.get_model('workouts', 'ExerciseDailyStat')
+    estimated_1rm = Case(
+        When(reps=1, then=F('weight')),
+        default=ExpressionWrapper(F('weight') * (F('reps') + 30) / Value(30.0), output_field=DecimalField()),
+        output_field=DecimalField(max_digits=7, decimal_places=2),
+    )
+    rows = Set.objects.order_by().values(
+        'user_id', exercise_name=F('exercise__name'), date=F('exercise__workout__date'),
+    ).annotate(
+        set_count=Count('id'),
+        total_reps=Sum('reps'),
+        volume=Sum(F('reps') * F('weight'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+        top_weight=Coalesce(
+            Max('weight', filter=Q(reps__gt=0)), Value(0), output_field=DecimalField(max_digits=5, decimal_places=2)
+        ),
+        estimated_1rm=Coalesce(
+            Max(estimated_1rm, filter=Q(reps__gt=0)), Value(0), output_field=DecimalField(max_digits=7, decimal_places=2)
+        ),
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        row['estimated_1rm'] = Decimal(row['estimated_1rm']).quantize(Decimal('0.01'))
+        batch.append(ExerciseDailyStat(**row))
+        if len(batch) == 2000:
+            ExerciseDailyStat.objects.bulk_create(batch)
+            batch = []
+    ExerciseDailyStat.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0006_deleted_record'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exercise_name', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('set_count', models.PositiveIntegerField()),
+                ('total_reps', models.PositiveIntegerField()),
+                ('volume', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('top_weight', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('estimated_1rm', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'date'], name='stat_user_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'exercise_name', 'date'), name='stat_user_exercise_date_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:51
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+
+GLOBAL_EXERCISES = [
+    'Bench Press', 'Incline Bench Press', 'Overhead Press', 'Push Up', 'Dip',
+    'Squat', 'Front Squat', 'Leg Press', 'Lunge', 'Hip Thrust',
+    'Deadlift', 'Romanian Deadlift', 'Barbell Row', 'Pull Up', 'Chin Up', 'Lat Pulldown',
+    'Bicep Curl', 'Tricep Extension', 'Plank',
+]
+
+
+def build_catalog(apps, schema_editor):
+    ExerciseType = apps.get_model('workouts', 'ExerciseType')
+    Exercise = apps.get_model('workouts', 'Exercise')
+
+    ExerciseType.objects.bulk_create([ExerciseType(name=name, key=name.lower()) for name in GLOBAL_EXERCISES])
+    global_ids = {t.key: t.id for t in ExerciseType.objects.filter(user__isnull=True)}
+
+    # Every spelling a user has for a name; the first one names their entry.
+    spellings = defaultdict(list)
+    for user_id, name in Exercise.objects.values_list('user_id', 'name').distinct().order_by('user_id', 'name'):
+        spellings[(user_id, name.strip().lower())].append(name)
+    ExerciseType.objects.bulk_create(
+        [ExerciseType(user_id=user_id, name=names[0].strip(), key=key)
+         for (user_id, key), names in spellings.items() if key not in global_ids],
+        batch_size=500,
+    )
+    own_ids = {(t.user_id, t.key): t.id for t in ExerciseType.objects.filter(user__isnull=False)}
+
+    for (user_id, key), names in spellings.items():
+        type_id = global_ids.get(key) or own_ids[(user_id, key)]
+        Exercise.objects.filter(user_id=user_id, name__in=names).update(exercise_type_id=type_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0007_exercise_daily_stat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(editable=False, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='exercise',
+            name='exercise_type',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='exercises', to='workouts.exercisetype'),
+        ),
+        migrations.AddConstraint(
+            model_name='exercisetype',
+            constraint=models.UniqueConstraint(fields=('key', 'user'), name='exercisetype_user_key_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='exercisetype',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('key',), name='exercisetype_global_key_uniq'),
+        ),
+        migrations.RunPython(build_catalog, migrations.RunPython.noop),
+    ]
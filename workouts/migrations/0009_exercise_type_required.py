@@ -0,0 +1,18 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Apart from the backfill in 0008, see 0004_owner_required.
+
+    dependencies = [
+        ('workouts', '0008_exercise_type_catalog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exercise',
+            name='exercise_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='exercises', to='workouts.exercisetype'),
+        ),
+    ]
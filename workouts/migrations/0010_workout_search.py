@@ -0,0 +1,164 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+import workouts.models
+
+# Full-text index over workout name, notes and exercise names, kept in sync
+# by triggers so bulk writes (bulk_create, update(), the importer) are covered.
+# See workouts/search.py for the query side.
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE workouts_workout_fts USING fts5(
+        name, notes, exercises, tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO workouts_workout_fts (rowid, name, notes, exercises)
+    SELECT w.id, w.name, w.notes,
+           COALESCE((SELECT group_concat(e.name, ' ') FROM workouts_exercise e WHERE e.workout_id = w.id), '')
+    FROM workouts_workout w
+    """,
+    # Weighted bm25 behind the `rank` column: name, notes, exercise names.
+    "INSERT INTO workouts_workout_fts (workouts_workout_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')",
+    """
+    CREATE TRIGGER workouts_workout_fts_insert AFTER INSERT ON workouts_workout BEGIN
+        INSERT INTO workouts_workout_fts (rowid, name, notes, exercises) VALUES (NEW.id, NEW.name, NEW.notes, '');
+    END
+    """,
+    """
+    CREATE TRIGGER workouts_workout_fts_update AFTER UPDATE OF name, notes ON workouts_workout BEGIN
+        UPDATE workouts_workout_fts SET name = NEW.name, notes = NEW.notes WHERE rowid = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER workouts_workout_fts_delete AFTER DELETE ON workouts_workout BEGIN
+        DELETE FROM workouts_workout_fts WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER workouts_exercise_fts_insert AFTER INSERT ON workouts_exercise BEGIN
+        UPDATE workouts_workout_fts SET exercises = COALESCE(
+            (SELECT group_concat(name, ' ') FROM workouts_exercise WHERE workout_id = NEW.workout_id), ''
+        ) WHERE rowid = NEW.workout_id;
+    END
+    """,
+    """
+    CREATE TRIGGER workouts_exercise_fts_update AFTER UPDATE OF name, workout_id ON workouts_exercise BEGIN
+        UPDATE workouts_workout_fts SET exercises = COALESCE(
+            (SELECT group_concat(name, ' ') FROM workouts_exercise WHERE workout_id = workouts_workout_fts.rowid), ''
+        ) WHERE rowid IN (OLD.workout_id, NEW.workout_id);
+    END
+    """,
+    """
+    CREATE TRIGGER workouts_exercise_fts_delete AFTER DELETE ON workouts_exercise BEGIN
+        UPDATE workouts_workout_fts SET exercises = COALESCE(
+            (SELECT group_concat(name, ' ') FROM workouts_exercise WHERE workout_id = OLD.workout_id), ''
+        ) WHERE rowid = OLD.workout_id;
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS workouts_exercise_fts_delete',
+    'DROP TRIGGER IF EXISTS workouts_exercise_fts_update',
+    'DROP TRIGGER IF EXISTS workouts_exercise_fts_insert',
+    'DROP TRIGGER IF EXISTS workouts_workout_fts_delete',
+    'DROP TRIGGER IF EXISTS workouts_workout_fts_update',
+    'DROP TRIGGER IF EXISTS workouts_workout_fts_insert',
+    'DROP TABLE IF EXISTS workouts_workout_fts',
+]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE TABLE workouts_workout_search (
+        workout_id bigint PRIMARY KEY REFERENCES workouts_workout (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    'CREATE INDEX workouts_workout_search_document_idx ON workouts_workout_search USING GIN (document)',
+    """
+    CREATE FUNCTION workouts_workout_search_refresh(target bigint) RETURNS void AS $$
+        INSERT INTO workouts_workout_search (workout_id, document)
+        SELECT w.id,
+               setweight(to_tsvector('english', w.name), 'A')
+               || setweight(to_tsvector('english', COALESCE(
+                      (SELECT string_agg(e.name, ' ') FROM workouts_exercise e WHERE e.workout_id = w.id), '')), 'B')
+               || setweight(to_tsvector('english', w.notes), 'C')
+        FROM workouts_workout w WHERE w.id = target
+        ON CONFLICT (workout_id) DO UPDATE SET document = EXCLUDED.document;
+    $$ LANGUAGE sql
+    """,
+    """
+    CREATE FUNCTION workouts_workout_search_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_TABLE_NAME = 'workouts_workout' THEN
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM workouts_workout_search_refresh(NEW.id);
+            END IF;
+        ELSE
+            IF TG_OP <> 'INSERT' THEN
+                PERFORM workouts_workout_search_refresh(OLD.workout_id);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM workouts_workout_search_refresh(NEW.workout_id);
+            END IF;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER workouts_workout_search_sync
+    AFTER INSERT OR UPDATE OF name, notes ON workouts_workout
+    FOR EACH ROW EXECUTE FUNCTION workouts_workout_search_trigger()
+    """,
+    """
+    CREATE TRIGGER workouts_exercise_search_sync
+    AFTER INSERT OR UPDATE OF name, workout_id OR DELETE ON workouts_exercise
+    FOR EACH ROW EXECUTE FUNCTION workouts_workout_search_trigger()
+    """,
+    'SELECT workouts_workout_search_refresh(id) FROM workouts_workout',
+]
+
+POSTGRES_BACKWARD = [
+    'DROP TRIGGER IF EXISTS workouts_exercise_search_sync ON workouts_exercise',
+    'DROP TRIGGER IF EXISTS workouts_workout_search_sync ON workouts_workout',
+    'DROP FUNCTION IF EXISTS workouts_workout_search_trigger()',
+    'DROP FUNCTION IF EXISTS workouts_workout_search_refresh(bigint)',
+    'DROP TABLE IF EXISTS workouts_workout_search',
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        # Other backends fall back to LIKE matching in the filter.
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0009_exercise_type_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutSearchIndex',
+            fields=[
+                ('workout', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='workouts.workout')),
+                ('document', workouts.models.FullTextMatchField(db_column='workouts_workout_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'workouts_workout_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0010_workout_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exercise',
+            name='exercise_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='exercises', to='workouts.exercisetype'),
+        ),
+    ]
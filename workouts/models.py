@@ -1,10 +1,47 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
+from collections import defaultdict
 from datetime import datetime
 from django.conf import settings
+from django.utils import timezone
+
+
+class OwnerTrackingMixin:
+    """
+    Remembers the owner a row was loaded with so save() can spot reassignment,
+    along with any `tracked_fields` (the ones that place a row in its
+    ExerciseDailyStat buckets).
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded()
+        return instance
+
+    def remember_loaded(self):
+        self._loaded_user_id = self.__dict__.get('user_id')
+        self._loaded = {name: self.__dict__.get(name) for name in self.tracked_fields}
+
+    def loaded_value(self, name):
+        return getattr(self, '_loaded', {}).get(name)
+
+    def owner_changed(self):
+        previous = getattr(self, '_loaded_user_id', None)
+        return previous is not None and previous != self.user_id
+
+
+def _with_owner(update_fields, parent_field):
+    # Reassigning the parent through save(update_fields=...) must carry the owner along.
+    if update_fields is not None and parent_field in update_fields:
+        return {*update_fields, 'user'}
+    return update_fields
+
 
 # Create your models here.
-class Workout(models.Model):
+class Workout(OwnerTrackingMixin, models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     date = models.DateField()
     name = models.CharField(max_length=100, blank=True)
@@ -12,26 +49,260 @@ class Workout(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tracked_fields = ('date',)
+
+    class Meta:
+        indexes = [
+            # Serves the per-user history list, which sorts newest first.
+            models.Index(fields=['user', '-date'], name='workout_user_date_idx'),
+            # Lets conditional requests read MAX(updated_at) and COUNT from the index.
+            models.Index(fields=['user', 'updated_at'], name='workout_user_updated_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name or 'Unnamed Workout'} - {self.date} ({self.user.username})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self.owner_changed():
+            now = timezone.now()
+            # Types are resolved in the new owner's catalog, not left pointing
+            # at the previous owner's own entries.
+            exercises = list(Exercise.objects.filter(workout=self).values_list('id', 'name'))
+            types = ExerciseType.objects.resolve(self.user_id, [name for _, name in exercises])
+            by_type = defaultdict(list)
+            for exercise_id, name in exercises:
+                by_type[types[name]].append(exercise_id)
+            for type_id, ids in by_type.items():
+                Exercise.objects.filter(id__in=ids).update(user_id=self.user_id, exercise_type_id=type_id, updated_at=now)
+            Set.objects.filter(exercise__workout=self).update(user_id=self.user_id, updated_at=now)
+        self.remember_loaded()
+
+
+class ExerciseTypeManager(models.Manager):
+    def resolve(self, user_id, names, create=True):
+        """
+        Map each name to an ExerciseType id for the user: their own entry if
+        one matches case-insensitively, else a global one, else (with
+        `create`) a new entry of theirs. Costs no query when every name is
+        cached, one otherwise, plus an INSERT and a SELECT for new entries.
+        With `create` every name is in the result; without it, names that
+        resolve to nothing are left out.
+        """
+        from . import catalog
+
+        resolved, missing = {}, {}
+        for name in names:
+            key = catalog.normalize(name)
+            type_id = catalog.get(user_id, key)
+            if type_id is None:
+                missing.setdefault(key, name.strip())
+            else:
+                resolved[key] = type_id
+
+        found = {}
+        if missing:
+            found = self._lookup(user_id, missing)
+            new = {key: name for key, name in missing.items() if key not in found}
+            if new and create:
+                # Another request may add the same names concurrently.
+                self.bulk_create(
+                    [ExerciseType(user_id=user_id, name=name, key=key) for key, name in new.items()],
+                    ignore_conflicts=True,
+                )
+                found.update(self._lookup(user_id, new))
+                # Only if the entry went away again in between.
+                for key in new.keys() - found.keys():
+                    found[key] = self.get_or_create(user_id=user_id, key=key, defaults={'name': new[key]})[0].id
+            catalog.remember(user_id, found)
+        resolved.update(found)
+        return {name: resolved[key] for name in names if (key := catalog.normalize(name)) in resolved}
+
+    def _lookup(self, user_id, names_by_key):
+        rows = (
+            self.filter(Q(user_id=user_id) | Q(user__isnull=True), key__in=list(names_by_key))
+            .values_list('key', 'id', 'user_id')
+        )
+        found = {}
+        # The user's own entry wins over a global one.
+        for key, type_id, owner_id in sorted(rows, key=lambda row: row[2] is not None):
+            found[key] = type_id
+        return found
+
+
+class ExerciseType(models.Model):
+    """
+    Catalog of exercise kinds. Global entries have no user; users get their
+    own entries for names the global catalog does not have.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    name = models.CharField(max_length=100)
+    # catalog.normalize(name), which names are matched on: SQLite's LOWER()
+    # folds ASCII letters only, so "Écarté" would never match itself.
+    key = models.CharField(max_length=100, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ExerciseTypeManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'user'], name='exercisetype_user_key_uniq'),
+            # NULLs are distinct in unique indexes, so globals need their own.
+            models.UniqueConstraint(fields=['key'], condition=Q(user__isnull=True), name='exercisetype_global_key_uniq'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        from . import catalog
+
+        self.key = catalog.normalize(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'key'}
+        super().save(*args, **kwargs)
+
 
-class Exercise(models.Model):
+class Exercise(OwnerTrackingMixin, models.Model):
     workout = models.ForeignKey(Workout, on_delete=models.CASCADE, related_name='exercises')
+    # Denormalized from workout.user so ownership checks are single-table lookups.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, editable=False, related_name='+')
     name = models.CharField(max_length=100)
+    # Resolved from `name` on save; aggregates group on this instead of text.
+    # RESTRICT rather than PROTECT: a type in use cannot be deleted on its own,
+    # but deleting its owner cascades to the exercises too and is allowed.
+    exercise_type = models.ForeignKey(ExerciseType, on_delete=models.RESTRICT, related_name='exercises')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tracked_fields = ('workout_id', 'name')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['workout', 'id'], name='exercise_workout_id_idx'),
+            models.Index(fields=['user', 'updated_at'], name='exercise_user_updated_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
-class Set(models.Model):
+    def save(self, *args, **kwargs):
+        self.user_id = self.workout.user_id
+        update_fields = kwargs.get('update_fields')
+        kwargs['update_fields'] = _with_owner(update_fields, 'workout')
+        if self.exercise_type_id is None or self.name != self.loaded_value('name') or self.owner_changed():
+            self.exercise_type_id = ExerciseType.objects.resolve(self.user_id, [self.name])[self.name]
+            if update_fields is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'exercise_type'}
+        super().save(*args, **kwargs)
+        if self.owner_changed():
+            self.sets.update(user_id=self.user_id, updated_at=timezone.now())
+        self.remember_loaded()
+
+class Set(OwnerTrackingMixin, models.Model):
     exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name='sets')
+    # Denormalized from exercise.workout.user, see Exercise.user.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, editable=False, related_name='+')
     set_number = models.PositiveIntegerField()
     reps = models.PositiveIntegerField()
     weight = models.DecimalField(max_digits=5, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tracked_fields = ('exercise_id',)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['exercise', 'set_number'], name='set_exercise_number_idx'),
+            models.Index(fields=['user', 'updated_at'], name='set_user_updated_idx'),
+        ]
+
     def __str__(self):
         return f"{self.exercise.name} – Set {self.set_number}: Reps {self.reps} @ {self.weight}"
+
+    def save(self, *args, **kwargs):
+        self.user_id = self.exercise.user_id
+        kwargs['update_fields'] = _with_owner(kwargs.get('update_fields'), 'exercise')
+        super().save(*args, **kwargs)
+        self.remember_loaded()
+
+
+class ExerciseDailyStat(models.Model):
+    """
+    One user's sets of one catalog exercise on one day, pre-aggregated.
+
+    Maintained by workouts.stats from the Workout/Exercise/Set signals and
+    rebuilt from scratch with `manage.py rebuild_exercise_stats`.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    exercise_name = models.CharField(max_length=100)
+    date = models.DateField()
+    set_count = models.PositiveIntegerField()
+    total_reps = models.PositiveIntegerField()
+    volume = models.DecimalField(max_digits=12, decimal_places=2)  # sum of reps x weight
+    top_weight = models.DecimalField(max_digits=5, decimal_places=2)
+    estimated_1rm = models.DecimalField(max_digits=7, decimal_places=2)  # best Epley estimate
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'exercise_name', 'date'], name='stat_user_exercise_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'date'], name='stat_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.exercise_name} on {self.date}: {self.set_count} sets, volume {self.volume}"
+
+
+class FullTextMatchField(models.TextField):
+    """An FTS5 table's hidden column named after the table; `__match` runs a full-text query."""
+
+
+@FullTextMatchField.register_lookup
+class FullTextMatch(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class WorkoutSearchIndex(models.Model):
+    """
+    The SQLite FTS5 index over workouts (migration 0008), mapped so searches
+    can join it. Its rows are written by triggers, never through this model.
+    """
+    workout = models.OneToOneField(
+        Workout, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name='search_index',
+    )
+    document = FullTextMatchField(db_column='workouts_workout_fts')
+    rank = models.FloatField()  # weighted bm25, lower is better
+
+    class Meta:
+        managed = False
+        db_table = 'workouts_workout_fts'
+
+
+class DeletedRecord(models.Model):
+    """Tombstone for a deleted row, so delta sync can tell clients about it."""
+    WORKOUT = 'workout'
+    EXERCISE = 'exercise'
+    SET = 'set'
+    MODEL_CHOICES = [(WORKOUT, 'Workout'), (EXERCISE, 'Exercise'), (SET, 'Set')]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    model = models.CharField(max_length=10, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='deleted_user_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted {self.deleted_at}"
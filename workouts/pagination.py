@@ -0,0 +1,200 @@
+import base64
+import datetime
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder drops microseconds, which would make datetime cursors lossy.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset ("seek") pagination.
+
+    Pages are fetched with a WHERE clause on the ordering columns of the last
+    row seen instead of an OFFSET, and no COUNT(*) is run, so page cost does
+    not grow with how far back a client scrolls. The ordering comes from the
+    queryset, which means `?ordering=` from OrderingFilter keeps working; `id`
+    is appended as a tiebreaker when the ordering is not already unique.
+    Ordering columns must be non-nullable.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.take(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.take([obj async for obj in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """The page's rows plus one, which tells whether there is a next page."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.seek(position))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return queryset[:self.page_size + 1]
+
+    def take(self, rows):
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(requested, 1), self.max_page_size)
+
+    def get_ordering(self, queryset):
+        ordering = [
+            field for field in (queryset.query.order_by or queryset.model._meta.ordering)
+            if isinstance(field, str)
+        ]
+        ordering = ['id' if field == 'pk' else '-id' if field == '-pk' else field for field in ordering]
+        if not {'id', '-id'} & set(ordering):
+            ordering.append('id')
+        return ordering
+
+    def seek(self, position):
+        """Rows strictly after `position` in the current ordering."""
+        clauses, equal = [], {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': value}))
+            equal[name] = value
+        # Bounding the leading column lets the database start an index range
+        # at the cursor rather than filtering every earlier row.
+        leading = self.ordering[0]
+        bound = Q(**{f"{leading.lstrip('-')}__{'lte' if leading.startswith('-') else 'gte'}": position[0]})
+        return bound & reduce(or_, clauses)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = [self.get_value(self.last, field.lstrip('-')) for field in self.ordering]
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(position)
+        )
+
+    @staticmethod
+    def get_value(obj, path):
+        if isinstance(obj, dict):  # values() rows
+            return obj[path]
+        for attr in path.split('__'):
+            obj = getattr(obj, attr)
+        return obj
+
+    def encode_cursor(self, position):
+        payload = json.dumps({'o': self.ordering, 'p': position}, cls=CursorEncoder)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            ordering, position = payload['o'], payload['p']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor is only meaningful for the ordering it was issued under.
+        if ordering != self.ordering or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Page-number pagination, with keyset pagination as an opt-in.
+
+    Clients switch to keyset mode with `?pagination=cursor` and then follow
+    the `next` links; a request that carries a `cursor` stays in keyset mode.
+    """
+    page_size = 10              # Number of items per page (you can adjust)
+    page_size_query_param = 'page_size'  # Allow client to override, optional
+    max_page_size = 100         # Max limit for page_size query param
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views: COUNT and page through the async ORM."""
+        if self.use_keyset(request):
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached_property: set, it is never queried.
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        return list(self.page)
+
+    def use_keyset(self, request):
+        params = request.query_params
+        if params.get(self.mode_query_param) == 'cursor' or self.keyset_class.cursor_query_param in params:
+            self.keyset = self.keyset_class()
+            self.keyset.page_size = self.page_size
+            self.keyset.max_page_size = self.max_page_size
+            return True
+        return False
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,7 +1,62 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Workout, Exercise, Set
+from rest_framework.permissions import SAFE_METHODS
+from .models import Workout, Exercise, ExerciseType, Set, ExerciseDailyStat
+from .signals import bulk_saved
+
+
+def query_param_set(request, name):
+    """A comma-separated query parameter as a set of names, or None when absent."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    raw = request.query_params.get(name)
+    if raw is None:
+        return None
+    return {part.strip() for part in raw.split(',') if part.strip()}
+
+
+def sets_prefetch(lookup='sets'):
+    return Prefetch(lookup, queryset=Set.objects.order_by('set_number', 'id'))
+
+
+class SparseFieldsetMixin:
+    """
+    Lets read requests shape the top-level representation.
+
+    `?fields=id,date` keeps only the listed fields and `?expand=workout`
+    renders a foreign key listed in `expandable_fields` as a nested object
+    instead of an id. Nested serializers are left alone.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        for name in (query_param_set(request, 'expand') or set()) & self.expandable_fields.keys():
+            self.fields[name] = self.expandable_fields[name](read_only=True)
+        fields = query_param_set(request, 'fields')
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class WorkoutSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Workout
+        fields = ['id', 'date', 'name']
+
+class ExerciseSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Exercise
+        fields = ['id', 'name', 'workout']
+
+class SetSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = {'exercise': ExerciseSummarySerializer}
 
-class SetSerializer(serializers.ModelSerializer):
     set_number = serializers.IntegerField(min_value=1)
     reps = serializers.IntegerField(min_value=0)
     weight = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0)
@@ -9,18 +64,38 @@ class SetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Set
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+
+class SetBatchItemSerializer(SetSerializer):
+    """
+    One entry of a batch write. `exercise` is a plain id here; the batch view
+    checks ownership for every referenced exercise in a single query.
+    """
+    id = serializers.IntegerField(required=False)
+    exercise = serializers.IntegerField(source='exercise_id')
+
+    class Meta(SetSerializer.Meta):
+        fields = ['id', 'exercise', 'set_number', 'reps', 'weight']
+        read_only_fields = []
+
+class NestedSetSerializer(SetSerializer):
+    """Sets written through their exercise, which supplies `exercise` itself."""
+
+    class Meta(SetSerializer.Meta):
+        read_only_fields = ['id', 'exercise', 'user', 'created_at', 'updated_at']
 
 class NestedExerciseSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(required=False)
     name = serializers.CharField(max_length=100)
-    sets = SetSerializer(many=True, read_only=True)
+    sets = NestedSetSerializer(many=True, required=False)
 
     class Meta:
         model = Exercise
         fields = ['id', 'name', 'sets']  # no 'workout' field here
 
-class ExerciseSerializer(serializers.ModelSerializer):
+class ExerciseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = {'workout': WorkoutSummarySerializer}
+
     id = serializers.IntegerField(required=False)
     name = serializers.CharField(max_length=100)
     sets = SetSerializer(many=True, read_only=True)
@@ -29,10 +104,11 @@ class ExerciseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Exercise
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        # exercise_type is resolved from the name, see ExerciseType.objects.resolve().
+        read_only_fields = ['id', 'user', 'exercise_type', 'created_at', 'updated_at']
 
 
-class WorkoutSerializer(serializers.ModelSerializer):
+class WorkoutSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     name = serializers.CharField(max_length=100, required=False, allow_blank=True)
     date = serializers.DateField()
     exercises = NestedExerciseSerializer(many=True, required=False)
@@ -42,39 +118,182 @@ class WorkoutSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
+    @transaction.atomic
     def create(self, validated_data):
         exercises_data = validated_data.pop('exercises', [])
         workout = Workout.objects.create(**validated_data)
-        for exercise_data in exercises_data:
-            Exercise.objects.create(workout=workout, **exercise_data)
+        exercises = self._create_exercises(workout, exercises_data)
+        self._create_sets(zip(exercises, exercises_data))
+        prefetch_related_objects([workout], *self.nested_prefetches())
         return workout
 
+    @transaction.atomic
     def update(self, instance, validated_data):
+        """
+        Exercises are matched by id: listed ones are updated, unknown ones are
+        created and missing ones are deleted. An exercise that carries `sets`
+        has its sets replaced; without the key its sets are left alone.
+        """
         exercises_data = validated_data.pop('exercises', [])
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
 
         existing_exercises = {ex.id: ex for ex in instance.exercises.all()}
-        sent_ids = []
+        now = timezone.now()
+        changed, new_data, replace_sets = [], [], []
+        # New exercises' names too: one lookup for the whole payload.
+        types = ExerciseType.objects.resolve(instance.user_id, [data['name'] for data in exercises_data])
 
         for exercise_data in exercises_data:
-            ex_id = exercise_data.get('id', None)
-            if ex_id and ex_id in existing_exercises:
-                ex = existing_exercises[ex_id]
-                for attr, value in exercise_data.items():
-                    if attr != 'id':
-                        setattr(ex, attr, value)
-                ex.save()
-                sent_ids.append(ex_id)
-            else:
-                Exercise.objects.create(workout=instance, **exercise_data)
+            ex = existing_exercises.pop(exercise_data.get('id'), None)
+            if ex is None:
+                new_data.append(exercise_data)
+                continue
+            ex.name = exercise_data['name']
+            ex.exercise_type_id = types[ex.name]
+            ex.updated_at = now  # bulk_update skips auto_now
+            changed.append(ex)
+            if 'sets' in exercise_data:
+                replace_sets.append((ex, exercise_data))
+
+        if existing_exercises:
+            Exercise.objects.filter(id__in=existing_exercises).delete()
+        if changed:
+            Exercise.objects.bulk_update(changed, ['name', 'exercise_type', 'updated_at'])
+            bulk_saved.send(sender=Exercise, objs=changed)
+        if replace_sets:
+            Set.objects.filter(exercise__in=[ex for ex, _ in replace_sets]).delete()
+        new_exercises = self._create_exercises(instance, new_data, types)
+        self._create_sets([*replace_sets, *zip(new_exercises, new_data)])
+
+        # The update view drops the instance's prefetch cache after saving, so
+        # hand back a fresh copy with the nested rows already loaded.
+        return Workout.objects.prefetch_related(*self.nested_prefetches()).get(pk=instance.pk)
+
+    @staticmethod
+    def nested_prefetches():
+        # NestedExerciseSerializer renders only id, name and sets; user is read
+        # when nested sets are written.
+        return [
+            Prefetch('exercises', queryset=Exercise.objects.only('id', 'name', 'workout', 'user').order_by('id')),
+            sets_prefetch('exercises__sets'),
+        ]
+
+    def _create_exercises(self, workout, exercises_data, types=None):
+        if not exercises_data:
+            return []
+        if types is None:
+            types = ExerciseType.objects.resolve(workout.user_id, [data['name'] for data in exercises_data])
+        exercises = Exercise.objects.bulk_create([
+            Exercise(workout=workout, user_id=workout.user_id, name=data['name'], exercise_type_id=types[data['name']])
+            for data in exercises_data
+        ])
+        bulk_saved.send(sender=Exercise, objs=exercises)
+        return exercises
+
+    def _create_sets(self, exercises_with_data):
+        sets = [
+            Set(exercise=exercise, user_id=exercise.user_id, **set_data)
+            for exercise, data in exercises_with_data
+            for set_data in data.get('sets', [])
+        ]
+        if sets:
+            Set.objects.bulk_create(sets)
+            bulk_saved.send(sender=Set, objs=sets)
+
+
+class ValuesSerializer:
+    """
+    Read-only rendering of list pages from values() rows, standing in for a
+    model serializer on plain list requests (see views.LeanListMixin).
+
+    The output matches the model serializer's, but no Field object touches
+    a value: Decimals, dates and datetimes stay as the database driver hands
+    them over for the renderer (config.renderers) to write, and datetimes are
+    only moved into the current time zone as DateTimeField does. Nested
+    lists cost one query per level, like the prefetches they replace.
+    """
+    model = None
+    fields = ()  # the model serializer's keys, in its order
+    datetime_fields = ()
+    nested = {}  # key -> (ValuesSerializer, the child's foreign key to this model)
+    ordering = ('id',)
+
+    def values(self, queryset, *extra):
+        """`queryset` as values() rows; annotations come along for ordering and cursors."""
+        columns = [name for name in self.fields if name not in self.nested]
+        return queryset.prefetch_related(None).values(*columns, *extra, *queryset.query.annotations)
 
-        for ex_id in existing_exercises.keys():
-            if ex_id not in sent_ids:
-                existing_exercises[ex_id].delete()
+    def to_representation(self, rows):
+        rows = list(rows)
+        nested = {key: self.nested_representations(key, rows) for key in self.nested}
+        tz = timezone.get_current_timezone()
+        data = []
+        for row in rows:
+            for name in self.datetime_fields:
+                if row[name] is not None:
+                    row[name] = row[name].astimezone(tz)
+            for key, by_parent in nested.items():
+                row[key] = by_parent.get(row['id'], [])
+            data.append({name: row[name] for name in self.fields})
+        return data
 
-        return instance
-    
+    def nested_representations(self, key, rows):
+        """The `key` children of `rows`, represented and grouped by parent id."""
+        if not rows:
+            return {}
+        serializer_class, parent = self.nested[key]
+        serializer = serializer_class()
+        children = list(serializer.values(
+            serializer.model.objects.filter(**{f'{parent}__in': [row['id'] for row in rows]})
+            .order_by(*serializer.ordering),
+            parent,
+        ))
+        parents = [child[parent] for child in children]
+        by_parent = defaultdict(list)
+        for parent_id, child in zip(parents, serializer.to_representation(children)):
+            by_parent[parent_id].append(child)
+        return by_parent
+
+
+class SetValuesSerializer(ValuesSerializer):
+    model = Set
+    fields = ('id', 'set_number', 'reps', 'weight', 'created_at', 'updated_at', 'exercise', 'user')
+    datetime_fields = ('created_at', 'updated_at')
+    ordering = ('set_number', 'id')
+
+
+class NestedExerciseValuesSerializer(ValuesSerializer):
+    model = Exercise
+    fields = ('id', 'name', 'sets')
+    nested = {'sets': (SetValuesSerializer, 'exercise')}
+
+
+class ExerciseValuesSerializer(ValuesSerializer):
+    model = Exercise
+    fields = ('id', 'name', 'sets', 'workout', 'created_at', 'updated_at', 'user', 'exercise_type')
+    datetime_fields = ('created_at', 'updated_at')
+    nested = {'sets': (SetValuesSerializer, 'exercise')}
+
+
+class WorkoutValuesSerializer(ValuesSerializer):
+    model = Workout
+    fields = ('id', 'name', 'date', 'exercises', 'notes', 'created_at', 'updated_at', 'user')
+    datetime_fields = ('created_at', 'updated_at')
+    nested = {'exercises': (NestedExerciseValuesSerializer, 'workout')}
+
+
+class ExerciseDailyStatSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExerciseDailyStat
+        fields = ['date', 'exercise_name', 'set_count', 'total_reps', 'volume', 'top_weight', 'estimated_1rm']
 
 
+class PersonalRecordSerializer(serializers.Serializer):
+    exercise_name = serializers.CharField()
+    best_weight = serializers.DecimalField(max_digits=5, decimal_places=2)
+    best_estimated_1rm = serializers.DecimalField(max_digits=7, decimal_places=2)
+    best_volume = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total_sets = serializers.IntegerField()
+    last_trained = serializers.DateField()
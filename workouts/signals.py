@@ -0,0 +1,106 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import catalog
+from .cache import invalidate_user
+from .models import DeletedRecord, Exercise, ExerciseType, Set, Workout
+from .stats import mark_dirty
+
+# bulk_create() and bulk_update() skip post_save, so the bulk write paths send
+# this instead: sender is the model class and `objs` the rows written (the
+# importer inserts sets without reading their pks back).
+bulk_saved = Signal()
+
+
+def _owners(instance):
+    # A reassigned row is stale for its previous owner as well.
+    return {instance.user_id, getattr(instance, '_loaded_user_id', None)} - {None}
+
+
+@receiver(post_save, sender=Workout)
+@receiver(post_save, sender=Exercise)
+@receiver(post_save, sender=Set)
+@receiver(post_delete, sender=Workout)
+@receiver(post_delete, sender=Exercise)
+@receiver(post_delete, sender=Set)
+def invalidate_owner_responses(sender, instance, **kwargs):
+    for user_id in _owners(instance):
+        invalidate_user(user_id)
+
+
+@receiver(bulk_saved)
+def invalidate_bulk_owner_responses(sender, objs, **kwargs):
+    for user_id in {obj.user_id for obj in objs}:
+        invalidate_user(user_id)
+
+
+def _is_cascade(sender, origin):
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin is not None and origin_model is not sender
+
+
+@receiver(post_delete, sender=Workout)
+@receiver(post_delete, sender=Exercise)
+@receiver(post_delete, sender=Set)
+def record_deletion(sender, instance, origin=None, **kwargs):
+    # Clients cascade deletes locally, so only the rows a delete() was called
+    # on are logged, not the children removed along with them.
+    if _is_cascade(sender, origin):
+        return
+    # Written in the deleting transaction: a tombstone written after commit
+    # could be lost, and responses cached in between would miss it.
+    DeletedRecord.objects.create(user_id=instance.user_id, model=sender._meta.model_name, object_id=instance.pk)
+
+
+@receiver(post_save, sender=Workout)
+def refresh_workout_stats(sender, instance, created, **kwargs):
+    # A new workout has no sets yet; otherwise only moving it changes buckets.
+    before = (getattr(instance, '_loaded_user_id', None), instance.loaded_value('date'))
+    if not created and before != (instance.user_id, instance.date):
+        mark_dirty(days=[before, (instance.user_id, instance.date)])
+
+
+@receiver(post_save, sender=Exercise)
+def refresh_exercise_stats(sender, instance, created, **kwargs):
+    if not created:
+        mark_dirty(workout_ids=[instance.workout_id, instance.loaded_value('workout_id')])
+
+
+@receiver(post_save, sender=Set)
+def refresh_set_stats(sender, instance, **kwargs):
+    mark_dirty(exercise_ids=[instance.exercise_id, instance.loaded_value('exercise_id')])
+
+
+@receiver(post_delete, sender=Workout)
+@receiver(post_delete, sender=Exercise)
+@receiver(post_delete, sender=Set)
+def refresh_deleted_stats(sender, instance, origin=None, **kwargs):
+    # Children deleted by a cascade are covered by the row the delete began at.
+    if _is_cascade(sender, origin):
+        return
+    if sender is Workout:
+        mark_dirty(days=[(instance.user_id, instance.date)])
+    elif sender is Exercise:
+        mark_dirty(workout_ids=[instance.workout_id])
+    else:
+        mark_dirty(exercise_ids=[instance.exercise_id])
+
+
+@receiver(bulk_saved)
+def refresh_bulk_stats(sender, objs, **kwargs):
+    # Updated rows may have moved: their loaded place is refreshed too.
+    if sender is Workout:
+        mark_dirty(days=[(obj.user_id, obj.date) for obj in objs] + [
+            (obj._loaded_user_id, obj.loaded_value('date')) for obj in objs if obj.loaded_value('date') is not None
+        ])
+    elif sender is Exercise:
+        mark_dirty(workout_ids=[i for obj in objs for i in (obj.workout_id, obj.loaded_value('workout_id'))])
+    elif sender is Set:
+        mark_dirty(exercise_ids=[i for obj in objs for i in (obj.exercise_id, obj.loaded_value('exercise_id'))])
+
+
+@receiver(post_save, sender=ExerciseType)
+@receiver(post_delete, sender=ExerciseType)
+def clear_catalog_cache(sender, **kwargs):
+    catalog.clear()
@@ -0,0 +1,131 @@
+"""
+Per-exercise daily aggregates (ExerciseDailyStat) for volume and PR charts.
+
+Writes mark the (user, day) buckets they touch, and the buckets are
+recomputed from their sets once the transaction commits. Recomputing a day
+rather than applying deltas keeps maxima right when sets are deleted and
+covers renames, and a day only holds a handful of sets. Marks made in one
+transaction are collected into a single refresh; rows named by id are
+resolved to their day at that point.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Exercise, ExerciseDailyStat, Set, Workout
+
+BATCH_SIZE = 2000
+
+# Epley: weight x (1 + reps / 30); a single is its own 1RM.
+ESTIMATED_1RM = Case(
+    When(reps=1, then=F('weight')),
+    default=ExpressionWrapper(F('weight') * (F('reps') + 30) / Value(30.0), output_field=DecimalField()),
+    output_field=DecimalField(max_digits=7, decimal_places=2),
+)
+# A 0-rep set is a failed attempt: it counts as a set but not towards the
+# top weight or 1RM, which are 0 on a day without a completed set.
+COMPLETED = Q(reps__gt=0)
+
+
+def daily_totals(sets):
+    """ExerciseDailyStat field values per (user, exercise type, day) for a Set queryset."""
+    # Grouped on the catalog id; the name comes along from the catalog row.
+    return sets.order_by().values(
+        'user_id', 'exercise__exercise_type', exercise_name=F('exercise__exercise_type__name'),
+        date=F('exercise__workout__date'),
+    ).annotate(
+        set_count=Count('id'),
+        total_reps=Sum('reps'),
+        volume=Sum(F('reps') * F('weight'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+        top_weight=Coalesce(
+            Max('weight', filter=COMPLETED), Value(0), output_field=DecimalField(max_digits=5, decimal_places=2)
+        ),
+        estimated_1rm=Coalesce(
+            Max(ESTIMATED_1RM, filter=COMPLETED), Value(0), output_field=DecimalField(max_digits=7, decimal_places=2)
+        ),
+    )
+
+
+def _stat(row):
+    del row['exercise__exercise_type']
+    row['estimated_1rm'] = Decimal(row['estimated_1rm']).quantize(Decimal('0.01'))
+    return ExerciseDailyStat(**row)
+
+
+def rebuild_days(days):
+    """Recompute the stats of the given (user_id, date) buckets."""
+    by_user = defaultdict(set)
+    for user_id, day in days:
+        if user_id is not None and day is not None:
+            by_user[user_id].add(day)
+    with transaction.atomic():
+        for user_id, dates in by_user.items():
+            ExerciseDailyStat.objects.filter(user_id=user_id, date__in=dates).delete()
+            # Filtered through the workout so the (user, date) index drives the join.
+            sets = Set.objects.filter(exercise__workout__user_id=user_id, exercise__workout__date__in=dates)
+            ExerciseDailyStat.objects.bulk_create([_stat(row) for row in daily_totals(sets)])
+
+
+def rebuild_all(user=None):
+    """Rebuild every bucket (or one user's) from scratch; returns the row count."""
+    stats, sets = ExerciseDailyStat.objects.all(), Set.objects.all()
+    if user is not None:
+        stats, sets = stats.filter(user=user), sets.filter(user=user)
+    written, batch = 0, []
+    with transaction.atomic():
+        stats.delete()
+        for row in daily_totals(sets).iterator(chunk_size=BATCH_SIZE):
+            batch.append(_stat(row))
+            if len(batch) == BATCH_SIZE:
+                ExerciseDailyStat.objects.bulk_create(batch)
+                written, batch = written + len(batch), []
+        ExerciseDailyStat.objects.bulk_create(batch)
+    return written + len(batch)
+
+
+class _StatsRefresh:
+    """on_commit callback holding the buckets one transaction touched."""
+
+    def __init__(self):
+        self.days = set()
+        self.workout_ids = set()
+        self.exercise_ids = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        days = set(self.days)
+        if self.workout_ids:
+            days.update(Workout.objects.filter(pk__in=self.workout_ids).values_list('user_id', 'date'))
+        if self.exercise_ids:
+            days.update(
+                Exercise.objects.filter(pk__in=self.exercise_ids)
+                .values_list('workout__user_id', 'workout__date')
+            )
+        # Rows deleted later in the same transaction resolve to nothing here;
+        # their own deletion marked the day.
+        if days:
+            rebuild_days(days)
+
+
+def mark_dirty(days=(), workout_ids=(), exercise_ids=()):
+    """Schedule a refresh of the buckets for these days, workouts and exercises."""
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        for _, callback, _ in connection.run_on_commit:
+            if isinstance(callback, _StatsRefresh) and not callback.done:
+                refresh = callback
+                break
+        else:
+            refresh = _StatsRefresh()
+            transaction.on_commit(refresh)
+    else:
+        refresh = _StatsRefresh()
+    refresh.days.update(days)
+    refresh.workout_ids.update(i for i in workout_ids if i is not None)
+    refresh.exercise_ids.update(i for i in exercise_ids if i is not None)
+    if not connection.in_atomic_block:
+        refresh()
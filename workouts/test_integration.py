@@ -1,9 +1,10 @@
 from django.urls import reverse
 from rest_framework.test import APITestCase
+from config.nplusone import NPlusOneTestMixin
 from rest_framework import status
 from workouts.models import Workout
 
-class UserFlowIntegrationTests(APITestCase):
+class UserFlowIntegrationTests(NPlusOneTestMixin, APITestCase):
     def test_register_login_crud_workout(self):
         # Register user
         register_url = reverse('register')
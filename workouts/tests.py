@@ -1,17 +1,61 @@
+import asyncio
+import gzip
+import io
+import itertools
+import json
+import os
+import re
+import tempfile
+import unittest
+import unittest.mock
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections
+from django.db.models import RestrictedError
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from rest_framework.test import APITestCase, APIClient
+from rest_framework import test
+from rest_framework.test import APIRequestFactory, APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from config.routers import ReplicaRouter, stop_replicas, use_replicas
+from config.throttling import CacheCounterStore, SlidingWindowThrottle, SQLiteCounterStore
+from config.sqlite import verify_pragmas
+from config import metrics
+from config.nplusone import NPlusOneTestMixin, fingerprint
+from config.renderers import FastJSONParser, FastJSONRenderer
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from rest_framework import status
-from workouts.models import Workout, Exercise, Set
-from datetime import date
+from workouts.models import DeletedRecord, ExerciseDailyStat, ExerciseType, Workout, Exercise, Set
+from datetime import date, datetime, timezone as dt_timezone
 from rest_framework.settings import api_settings
 from django.utils import timezone
 from datetime import timedelta
 
 api_settings.DEFAULT_THROTTLE_CLASSES = []
 
+# Imported after the throttle override so the views pick it up.
+from rest_framework.generics import RetrieveUpdateDestroyAPIView
+from rest_framework.request import Request
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.renderers import JSONRenderer
+from django.contrib import admin
+from workouts import analytics, async_views, catalog, views
+from workouts.admin import SetInline
+from workouts.cache import get_cache as get_response_cache
+from workouts.importer import WorkoutImporter, insert_sets, read_rows
+
 User = get_user_model()
 
+
+class APITestCase(NPlusOneTestMixin, test.APITestCase):
+    """Requests that run an N+1 query pattern fail the test."""
+
 class WorkoutTests(APITestCase):
 
     def setUp(self):
@@ -352,3 +396,1327 @@ class NestedWorkoutTests(APITestCase):
         names = [ex['name'] for ex in response.data['exercises']]
         self.assertIn("Updated Exercise", names)
         self.assertIn("New Exercise", names)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite specific')
+class QueryPlanTests(APITestCase):
+    """Every get_queryset must be answered from an index, never a full table scan."""
+
+    # "SCAN workouts_set" is a full scan; "SCAN ... USING INDEX" walks an index.
+    FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)\b(?! USING)')
+
+    VIEWS = [
+        views.WorkoutListCreateAPIView,
+        views.WorkoutRetrieveUpdateDestroyAPIView,
+        views.ExerciseListCreateAPIView,
+        views.ExerciseRetrieveUpdateDestroyAPIView,
+        views.SetListCreateAPIView,
+        views.SetRetrieveUpdateDestroyAPIView,
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='planuser', password='testpass')
+        self.factory = RequestFactory()
+
+    def get_view_queryset(self, view_class):
+        request = Request(self.factory.get('/'))
+        request.user = self.user
+        view = view_class(request=request, format_kwarg=None, args=(), kwargs={'pk': 1})
+        # filter_queryset applies the default ordering, which is part of the plan.
+        return view.filter_queryset(view.get_queryset())
+
+    def assertNoFullScan(self, queryset, label):
+        plan = queryset.explain()
+        self.assertEqual(self.FULL_SCAN.findall(plan), [], f"{label} falls back to a full table scan:\n{plan}")
+
+    def test_list_querysets_use_indexes(self):
+        for view_class in self.VIEWS:
+            with self.subTest(view=view_class.__name__):
+                self.assertNoFullScan(self.get_view_queryset(view_class), view_class.__name__)
+
+    def test_detail_lookups_use_indexes(self):
+        for view_class in self.VIEWS:
+            if not issubclass(view_class, RetrieveUpdateDestroyAPIView):
+                continue
+            with self.subTest(view=view_class.__name__):
+                queryset = self.get_view_queryset(view_class).filter(pk=1)
+                self.assertNoFullScan(queryset, view_class.__name__)
+
+    def test_set_list_is_served_in_index_order(self):
+        plan = self.get_view_queryset(views.SetListCreateAPIView).explain()
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class OwnerDenormalizationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='testpass')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='testpass')
+        self.workout = Workout.objects.create(user=self.user, date='2024-01-01', name='Owned')
+        self.exercise = Exercise.objects.create(workout=self.workout, name='Row')
+        self.set = Set.objects.create(exercise=self.exercise, set_number=1, reps=5, weight=60)
+
+    def test_owner_copied_on_create(self):
+        self.assertEqual(self.exercise.user_id, self.user.id)
+        self.assertEqual(self.set.user_id, self.user.id)
+
+    def test_workout_reassignment_moves_children(self):
+        workout = Workout.objects.get(pk=self.workout.pk)
+        workout.user = self.other
+        workout.save()
+        exercise = Exercise.objects.select_related('exercise_type').get(pk=self.exercise.pk)
+        self.assertEqual((exercise.user_id, exercise.exercise_type.user_id), (self.other.id, self.other.id))
+        self.assertEqual(Set.objects.get(pk=self.set.pk).user_id, self.other.id)
+        # Nothing of the previous owner's catalog is referenced any more.
+        self.user.delete()
+        self.assertTrue(Exercise.objects.filter(pk=self.exercise.pk).exists())
+
+    def test_exercise_reassignment_moves_sets(self):
+        other_workout = Workout.objects.create(user=self.other, date='2024-01-02')
+        exercise = Exercise.objects.get(pk=self.exercise.pk)
+        exercise.workout = other_workout
+        exercise.save(update_fields=['workout'])
+        self.assertEqual(Exercise.objects.get(pk=self.exercise.pk).user_id, self.other.id)
+        self.assertEqual(Set.objects.get(pk=self.set.pk).user_id, self.other.id)
+
+    def test_sets_of_other_users_are_hidden(self):
+        self.client.force_authenticate(user=self.other)
+        response = self.client.get(reverse('set-list-create'))
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get(reverse('set-detail', args=[self.set.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BulkNestedWriteTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='bulkuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+
+    def payload(self, exercise_count, sets_per_exercise):
+        return {
+            "date": "2024-01-01",
+            "name": "Full session",
+            "exercises": [
+                {
+                    "name": f"Exercise {i}",
+                    "sets": [
+                        {"set_number": n, "reps": 5, "weight": "100.00"}
+                        for n in range(1, sets_per_exercise + 1)
+                    ],
+                }
+                for i in range(exercise_count)
+            ],
+        }
+
+    def count_queries(self, method, url, payload):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, payload, format='json')
+        self.assertIn(response.status_code, [status.HTTP_200_OK, status.HTTP_201_CREATED], response.data)
+        return len(ctx.captured_queries)
+
+    def test_create_workout_with_sets(self):
+        response = self.client.post(reverse('workout-list-create'), self.payload(2, 3), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([len(ex['sets']) for ex in response.data['exercises']], [3, 3])
+        self.assertEqual(Set.objects.filter(user=self.user).count(), 6)
+
+    def test_update_replaces_sets_only_when_sent(self):
+        response = self.client.post(reverse('workout-list-create'), self.payload(2, 3), format='json')
+        first, second = response.data['exercises']
+        payload = {
+            "date": "2024-01-01",
+            "exercises": [
+                {"id": first['id'], "name": "Renamed", "sets": [{"set_number": 1, "reps": 8, "weight": "60.00"}]},
+                {"id": second['id'], "name": second['name']},
+            ],
+        }
+        response = self.client.put(reverse('workout-detail', args=[response.data['id']]), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['exercises'][0]['name'], "Renamed")
+        self.assertEqual([s['reps'] for s in response.data['exercises'][0]['sets']], [8])
+        self.assertEqual(len(response.data['exercises'][1]['sets']), 3)
+
+    def test_create_query_count_is_constant(self):
+        url = reverse('workout-list-create')
+        small = self.count_queries('post', url, self.payload(1, 1))
+        with self.assertNumQueries(small):
+            self.client.post(url, self.payload(20, 5), format='json')
+
+    def test_update_query_count_is_constant(self):
+        def seeded_workout():
+            response = self.client.post(reverse('workout-list-create'), self.payload(3, 2), format='json')
+            return response.data
+
+        def update_payload(workout, extra):
+            # Keep one exercise with new sets, drop the rest, add `extra` new ones.
+            kept = workout['exercises'][0]
+            payload = self.payload(extra, 4)
+            payload['exercises'].insert(0, {"id": kept['id'], "name": "Kept", "sets": [{"set_number": 1, "reps": 1, "weight": "1.00"}]})
+            return payload
+
+        workout = seeded_workout()
+        small = self.count_queries('put', reverse('workout-detail', args=[workout['id']]), update_payload(workout, 1))
+        workout = seeded_workout()
+        with self.assertNumQueries(small):
+            self.client.put(reverse('workout-detail', args=[workout['id']]), update_payload(workout, 25), format='json')
+
+
+class SetBatchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='batchuser', email='batch@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.workout = Workout.objects.create(user=self.user, date='2024-01-01', name='Batch')
+        self.exercise = Exercise.objects.create(workout=self.workout, name='Squat')
+        other = User.objects.create_user(username='batchother', email='batchother@example.com', password='testpass')
+        other_workout = Workout.objects.create(user=other, date='2024-01-01')
+        self.foreign_exercise = Exercise.objects.create(workout=other_workout, name='Not yours')
+        self.url = reverse('set-batch')
+
+    def sets(self, count, exercise=None):
+        exercise = exercise or self.exercise
+        return [{"exercise": exercise.id, "set_number": n, "reps": 5, "weight": "100.00"} for n in range(1, count + 1)]
+
+    def test_batch_create(self):
+        response = self.client.post(self.url, self.sets(3), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.data['results']], ['created'] * 3)
+        self.assertEqual(Set.objects.filter(exercise=self.exercise, user=self.user).count(), 3)
+        self.assertEqual(response.data['results'][0]['data']['weight'], "100.00")
+
+    def test_batch_upsert_and_per_item_errors(self):
+        existing = Set.objects.create(exercise=self.exercise, set_number=1, reps=3, weight=80)
+        payload = [
+            {"id": existing.id, "exercise": self.exercise.id, "set_number": 1, "reps": 6, "weight": "82.50"},
+            {"exercise": self.exercise.id, "set_number": 2, "reps": -1, "weight": "80.00"},
+            self.sets(1, exercise=self.foreign_exercise)[0],
+            {"id": 999999, "exercise": self.exercise.id, "set_number": 3, "reps": 5, "weight": "80.00"},
+            self.sets(1)[0],
+        ]
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        results = response.data['results']
+        self.assertEqual([r['status'] for r in results], ['updated', 'error', 'error', 'error', 'created'])
+        self.assertIn('reps', results[1]['errors'])
+        self.assertIn('exercise', results[2]['errors'])
+        self.assertIn('id', results[3]['errors'])
+        existing.refresh_from_db()
+        self.assertEqual(existing.reps, 6)
+        self.assertFalse(Set.objects.filter(exercise=self.foreign_exercise).exists())
+
+    def test_batch_rejects_non_list(self):
+        response = self.client.post(self.url, self.sets(1)[0], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(self.url, self.sets(2), format='json')
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            self.client.post(self.url, self.sets(30), format='json')
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='keysetuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        # Several workouts share a date so the id tiebreaker matters.
+        self.workouts = [
+            Workout.objects.create(user=self.user, date=date(2024, 1, 1 + i // 3), name=f"W{i:02d}")
+            for i in range(25)
+        ]
+
+    def walk(self, url):
+        seen, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return seen, pages
+
+    def test_walks_every_workout_once_in_order(self):
+        seen, pages = self.walk(reverse('workout-list-create') + '?pagination=cursor&page_size=7')
+        expected = [w.id for w in sorted(self.workouts, key=lambda w: (-w.date.toordinal(), w.id))]
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 4)
+
+    def test_respects_ordering_and_filters(self):
+        url = reverse('workout-list-create') + '?pagination=cursor&page_size=4&ordering=-name&date=2024-01-02'
+        seen, _ = self.walk(url)
+        expected = [w.id for w in sorted(self.workouts, key=lambda w: w.name, reverse=True) if w.date == date(2024, 1, 2)]
+        self.assertEqual(seen, expected)
+
+    def test_sets_pages_skip_count_query(self):
+        workout = self.workouts[0]
+        exercise = Exercise.objects.create(workout=workout, name='Curl')
+        for n in range(1, 6):
+            Set.objects.create(exercise=exercise, set_number=n, reps=10, weight=20)
+        url = reverse('set-list-create') + '?pagination=cursor&page_size=2'
+        seen, _ = self.walk(url)
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        self.assertFalse(any('__count' in q['sql'] for q in ctx.captured_queries))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('workout-list-create') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_mode_unchanged(self):
+        response = self.client.get(reverse('workout-list-create'))
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+
+
+class ListQueryCountTests(APITestCase):
+    """
+    Each list endpoint costs a fixed number of queries however many rows a
+    page holds. The first query of every read computes the ETag validators.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='countuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        for day in range(1, 6):
+            workout = Workout.objects.create(user=self.user, date=date(2024, 1, day), name=f"Day {day}", notes="long notes")
+            for name in ('Squat', 'Bench', 'Row'):
+                exercise = Exercise.objects.create(workout=workout, name=name)
+                for n in range(1, 4):
+                    Set.objects.create(exercise=exercise, set_number=n, reps=5, weight=100)
+
+    def test_workout_list(self):
+        # Validators, COUNT, workouts, exercises, sets.
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('workout-list-create'))
+        self.assertEqual(len(response.data['results'][0]['exercises'][0]['sets']), 3)
+        with self.assertNumQueries(4):
+            self.client.get(reverse('workout-list-create') + '?pagination=cursor')
+
+    def test_workout_detail(self):
+        workout = Workout.objects.first()
+        with self.assertNumQueries(4):
+            self.client.get(reverse('workout-detail', args=[workout.id]))
+
+    def test_exercise_list(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('exercise-list-create'))
+        self.assertEqual(len(response.data['results'][0]['sets']), 3)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('exercise-list-create') + '?expand=workout')
+        self.assertIn('date', response.data['results'][0]['workout'])
+
+    def test_set_list(self):
+        with self.assertNumQueries(3):
+            self.client.get(reverse('set-list-create'))
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('set-list-create') + '?expand=exercise')
+        self.assertIn(response.data['results'][0]['exercise']['name'], ('Squat', 'Bench', 'Row'))
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sparseuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        workout = Workout.objects.create(user=self.user, date='2024-01-01', name='Sparse', notes='n' * 1000)
+        Exercise.objects.create(workout=workout, name='Squat')
+
+    def test_fields_limit_representation_and_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('workout-list-create') + '?fields=id,date,name')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'date', 'name'})
+        # Validators, COUNT and the page: no exercise prefetch, no notes column.
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertNotIn('"notes"', ctx.captured_queries[-1]['sql'])
+
+    def test_fields_are_ignored_on_writes(self):
+        response = self.client.post(
+            reverse('workout-list-create') + '?fields=id', {"date": "2024-02-01", "name": "Kept"}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['name'], "Kept")
+
+
+@override_settings(RESPONSE_CACHE_TTL=60)
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.user = User.objects.create_user(username='cacheuser', email='cache@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.workout = Workout.objects.create(user=self.user, date='2024-01-01', name='Cached')
+        self.url = reverse('workout-list-create')
+
+    def test_second_read_is_served_from_cache(self):
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['name'], 'Cached')
+
+    def test_query_params_are_part_of_the_key(self):
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url + '?fields=id')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(self.url + '?page_size=1')['X-Cache'], 'MISS')
+
+    def test_writes_invalidate_list_and_detail(self):
+        detail = reverse('workout-detail', args=[self.workout.id])
+        self.client.get(self.url)
+        self.client.get(detail)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('set-batch'), [], format='json')  # no-op write
+            exercise = Exercise.objects.create(workout=self.workout, name='Fresh')
+        response = self.client.get(detail)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['exercises'][0]['name'], 'Fresh')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('set-batch'), [
+                {"exercise": exercise.id, "set_number": 1, "reps": 5, "weight": "50.00"},
+            ], format='json')
+        response = self.client.get(detail)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['exercises'][0]['sets']), 1)
+
+    def test_users_do_not_share_entries(self):
+        self.client.get(self.url)
+        other = User.objects.create_user(username='cacheother', email='cacheother@example.com', password='testpass')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'], [])
+
+    def test_stats_are_admin_only(self):
+        self.assertEqual(self.client.get(reverse('response-cache-stats')).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.get(self.url)
+        self.client.get(self.url)
+        admin = User.objects.create_superuser(username='cacheadmin', email='cacheadmin@example.com', password='testpass')
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(reverse('response-cache-stats'))
+        self.assertGreaterEqual(response.data['hits'], 1)
+        self.assertGreaterEqual(response.data['misses'], 1)
+
+
+class ConditionalRequestTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='etaguser', email='etag@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.workout = Workout.objects.create(user=self.user, date='2024-01-01', name='Tagged')
+        self.exercise = Exercise.objects.create(workout=self.workout, name='Squat')
+        self.set = Set.objects.create(exercise=self.exercise, set_number=1, reps=5, weight=100)
+        self.list_url = reverse('workout-list-create')
+        self.detail_url = reverse('workout-detail', args=[self.workout.id])
+
+    def test_matching_etag_skips_the_body(self):
+        etag = self.client.get(self.list_url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_nested_changes_and_deletes_change_the_etag(self):
+        etag = self.client.get(self.list_url)['ETag']
+        Set.objects.create(exercise=self.exercise, set_number=2, reps=5, weight=100)
+        second = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        Set.objects.filter(set_number=2).delete()
+        third = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+
+    def test_query_string_is_part_of_the_etag(self):
+        etag = self.client.get(self.list_url)['ETag']
+        response = self.client.get(self.list_url + '?fields=id', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.detail_url)['Last-Modified']
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_deletions_move_a_lists_last_modified(self):
+        hour_ago = timezone.now() - timedelta(hours=1)
+        for model in (Workout, Exercise, Set):
+            model.objects.update(updated_at=hour_ago)
+        last_modified = self.client.get(self.list_url)['Last-Modified']
+        response = self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('set-detail', args=[self.set.id]))
+        response = self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['exercises'][0]['sets'], [])
+
+    def test_if_match_guards_updates(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        payload = {"date": "2024-01-01", "name": "First writer"}
+        response = self.client.patch(self.detail_url, payload, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        payload = {"date": "2024-01-01", "name": "Second writer"}
+        response = self.client.patch(self.detail_url, payload, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Workout.objects.get(pk=self.workout.pk).name, "First writer")
+
+    def test_missing_object_is_still_404(self):
+        url = reverse('workout-detail', args=[999999])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(RESPONSE_CACHE_TTL=60)
+    def test_cached_validators_answer_without_queries(self):
+        get_response_cache().clear()
+        etag = self.client.get(self.list_url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class DeltaSyncTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='syncuser', email='sync@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.workout = Workout.objects.create(user=self.user, date='2024-01-01', name='Synced')
+        self.exercise = Exercise.objects.create(workout=self.workout, name='Squat')
+        self.set = Set.objects.create(exercise=self.exercise, set_number=1, reps=5, weight=100)
+        self.url = reverse('sync')
+
+    def sync(self, token=None):
+        response = self.client.get(self.url, {'since': token} if token else {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_full_sync_returns_everything(self):
+        other = User.objects.create_user(username='othersync', email='othersync@example.com', password='testpass')
+        Workout.objects.create(user=other, date='2024-01-01', name='Not mine')
+        data = self.sync()
+        self.assertEqual([w['id'] for w in data['workouts']], [self.workout.id])
+        self.assertEqual(data['exercises'][0]['workout'], self.workout.id)
+        self.assertEqual(data['sets'][0]['exercise'], self.exercise.id)
+        self.assertEqual(data['deleted'], [])
+
+    def test_incremental_sync_returns_only_changes(self):
+        old = timezone.now() - timedelta(hours=1)
+        Workout.objects.update(updated_at=old)
+        Exercise.objects.update(updated_at=old)
+        Set.objects.update(updated_at=old)
+        token = self.sync()['token']
+        self.set.reps = 6
+        self.set.save()
+        data = self.sync(token)
+        self.assertEqual(data['workouts'], [])
+        self.assertEqual(data['exercises'], [])
+        self.assertEqual([(s['id'], s['reps']) for s in data['sets']], [(self.set.id, 6)])
+
+    def test_deleting_a_workout_logs_only_the_workout(self):
+        token = self.sync()['token']
+        workout_id = self.workout.id
+        # Part of the delete itself, not left to a commit hook.
+        with self.captureOnCommitCallbacks(execute=False):
+            self.workout.delete()
+        self.assertEqual(DeletedRecord.objects.count(), 1)
+        data = self.sync(token)
+        self.assertEqual(
+            [(d['model'], d['object_id']) for d in data['deleted']], [('workout', workout_id)]
+        )
+
+    def test_invalid_token_is_rejected(self):
+        response = self.client.get(self.url, {'since': 'not-a-token'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='exportuser', email='export@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        for day in (1, 2):
+            workout = Workout.objects.create(user=self.user, date=f'2024-01-0{day}', name=f'Day {day}')
+            exercise = Exercise.objects.create(workout=workout, name='Squat')
+            Set.objects.create(exercise=exercise, set_number=1, reps=5, weight=100)
+        self.url = reverse('export')
+
+    def test_csv_export(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['workout_id', 'date', 'workout'])
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ['2024-01-01', '2024-01-02'])
+
+    def test_ndjson_export_with_date_range(self):
+        response = self.client.get(self.url, {'type': 'ndjson', 'date_from': '2024-01-02'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([(row['date'], row['reps'], row['weight']) for row in rows], [('2024-01-02', 5, '100.00')])
+
+    def test_gzip_on_request(self):
+        response = self.client.get(self.url, {'type': 'ndjson'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(body.splitlines()), 2)
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'type': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'date_to': 'soon'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportTests(APITestCase):
+    CSV = (
+        "date,workout,exercise,set_number,reps,weight\n"
+        "2024-01-01,Legs,Squat,1,5,100\n"
+        "2024-01-01,Legs,Squat,2,5,100\n"
+        "2024-01-01,Legs,Lunge,1,10,20.5\n"
+        "2024-01-02,Push,Bench Press,1,8,80\n"
+        "2024-01-02,Push,Bench Press,x,8,80\n"
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', email='import@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+
+    def run_import(self, text, **kwargs):
+        return WorkoutImporter(self.user, **kwargs).run(read_rows(io.StringIO(text), 'csv'))
+
+    def test_import_deduplicates_and_reports_bad_rows(self):
+        Workout.objects.create(user=self.user, date='2024-01-01', name='Legs')
+        result = self.run_import(self.CSV)
+        self.assertEqual((result.workouts_created, result.exercises_created, result.sets_created), (1, 3, 4))
+        self.assertEqual([error['row'] for error in result.errors], [5])
+        self.assertEqual(Workout.objects.filter(user=self.user).count(), 2)
+        lunge = Set.objects.get(exercise__name='Lunge')
+        self.assertEqual((lunge.user_id, lunge.weight), (self.user.id, Decimal('20.50')))
+
+        again = self.run_import(self.CSV)
+        self.assertEqual((again.sets_created, again.sets_skipped), (0, 4))
+
+    def test_malformed_values_are_row_errors(self):
+        result = self.run_import(
+            "date,workout,exercise,set_number,reps,weight\n"
+            "2024-02-30,Legs,Squat,1,5,100\n"
+            "2024-01-01,Legs,Squat,1,5,NaN\n"
+            "2024-01-01,Legs,Squat,2,5,Infinity\n"
+            "2024-01-01,Legs,Squat,3,0,100\n"
+            "2024-01-01,Legs,Squat,4,5.7,100\n"
+            "2024-01-01,Legs,Squat,4.5,5,100\n"
+            "2024-01-01,Legs,Squat,5.0,5,100\n"
+        )
+        self.assertEqual([error['row'] for error in result.errors], [1, 2, 3, 5, 6])
+        self.assertEqual(
+            list(Set.objects.filter(user=self.user).order_by('set_number').values_list('set_number', 'reps')),
+            [(3, 0), (5, 5)],
+        )
+
+    def test_lookups_are_batched(self):
+        with unittest.mock.patch('workouts.importer.IN_BATCH_SIZE', 1):
+            self.assertEqual(self.run_import(self.CSV).sets_created, 4)
+            with CaptureQueriesContext(connection) as queries:
+                again = self.run_import(self.CSV)
+        self.assertEqual((again.exercises_created, again.sets_created, again.sets_skipped), (0, 0, 4))
+        # One query per workout for its exercises.
+        self.assertEqual(sum('FROM "workouts_exercise"' in q['sql'] for q in queries.captured_queries), 2)
+
+    def test_failed_chunk_rolls_back_and_can_resume(self):
+        calls = []
+
+        def flaky_insert(sets):
+            calls.append(len(sets))
+            if len(calls) == 2:
+                raise DatabaseError("disk full")
+            return insert_sets(sets)
+
+        with unittest.mock.patch('workouts.importer.insert_sets', flaky_insert):
+            result = self.run_import(self.CSV, chunk_rows=2)
+        self.assertTrue(result.failed)
+        self.assertEqual(result.committed_rows, 2)
+        self.assertEqual(Set.objects.count(), 2)
+
+        resumed = WorkoutImporter(self.user, chunk_rows=2).run(
+            read_rows(io.StringIO(self.CSV), 'csv'), start_row=result.committed_rows
+        )
+        self.assertFalse(resumed.failed)
+        self.assertEqual(Set.objects.count(), 4)
+
+    def test_upload_endpoint(self):
+        upload = SimpleUploadedFile('history.csv', self.CSV.encode(), content_type='text/csv')
+        response = self.client.post(reverse('import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['sets_created'], 4)
+        self.assertEqual(response.data['error_count'], 1)
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as handle:
+            handle.write('{"date": "2024-03-01", "workout": "Pull", "exercise": "Row", "set_number": 1, "reps": 8, "weight": 60}\n')
+        self.addCleanup(os.unlink, handle.name)
+        out = io.StringIO()
+        call_command('import_workouts', handle.name, user='importer', stdout=out)
+        self.assertIn('1 sets', out.getvalue())
+        self.assertEqual(Set.objects.filter(user=self.user).count(), 1)
+
+
+class ExerciseStatsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='statsuser', email='stats@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.workout = Workout.objects.create(user=self.user, date='2024-01-01', name='Legs')
+            self.exercise = Exercise.objects.create(workout=self.workout, name='Squat')
+            self.heavy = Set.objects.create(exercise=self.exercise, set_number=1, reps=3, weight=120)
+            Set.objects.create(exercise=self.exercise, set_number=2, reps=5, weight=100)
+
+    def stats(self):
+        return list(ExerciseDailyStat.objects.filter(user=self.user).order_by('date', 'exercise_name').values_list(
+            'exercise_name', 'date', 'set_count', 'total_reps', 'volume', 'top_weight', 'estimated_1rm',
+        ))
+
+    def test_writes_keep_the_day_current(self):
+        self.assertEqual(self.stats(), [
+            ('Squat', date(2024, 1, 1), 2, 8, Decimal('860.00'), Decimal('120.00'), Decimal('132.00')),
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.heavy.delete()
+        self.assertEqual(self.stats()[0][2:6], (1, 5, Decimal('500.00'), Decimal('100.00')))
+
+    def test_failed_attempts_are_not_records(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Set.objects.create(exercise=self.exercise, set_number=3, reps=0, weight=150)
+            missed = Exercise.objects.create(
+                workout=Workout.objects.create(user=self.user, date='2024-01-02'), name='Squat'
+            )
+            Set.objects.create(exercise=missed, set_number=1, reps=0, weight=160)
+        self.assertEqual([row[2:] for row in self.stats()], [
+            (3, 8, Decimal('860.00'), Decimal('120.00'), Decimal('132.00')),
+            (1, 0, Decimal('0.00'), Decimal('0.00'), Decimal('0.00')),
+        ])
+        records = self.client.get(reverse('stats-records')).data
+        self.assertEqual((records[0]['best_weight'], records[0]['total_sets']), ('120.00', 4))
+
+    def test_renames_and_moves_rebuild_both_buckets(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exercise.name = 'Front Squat'
+            self.exercise.save()
+        self.assertEqual([row[0] for row in self.stats()], ['Front Squat'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.workout.date = date(2024, 1, 5)
+            self.workout.save()
+        self.assertEqual([row[1] for row in self.stats()], [date(2024, 1, 5)])
+
+    def test_batch_moves_rebuild_both_days(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            later = Workout.objects.create(user=self.user, date='2024-01-08', name='Legs')
+            target = Exercise.objects.create(workout=later, name='Squat')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('set-batch'), [
+                {"id": self.heavy.id, "exercise": target.id, "set_number": 1, "reps": 3, "weight": "120.00"},
+            ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row[1:6] for row in self.stats()], [
+            (date(2024, 1, 1), 1, 5, Decimal('500.00'), Decimal('100.00')),
+            (date(2024, 1, 8), 1, 3, Decimal('360.00'), Decimal('120.00')),
+        ])
+
+    def test_cascading_delete_clears_the_day(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.workout.delete()
+        self.assertEqual(self.stats(), [])
+
+    def test_bulk_writes_and_rebuild_agree(self):
+        payload = {"date": "2024-01-02", "name": "Again", "exercises": [
+            {"name": "Squat", "sets": [{"set_number": 1, "reps": 1, "weight": 140}]},
+        ]}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('workout-list-create'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        incremental = self.stats()
+        self.assertEqual(incremental[1][5:], (Decimal('140.00'), Decimal('140.00')))
+        ExerciseDailyStat.objects.all().delete()
+        call_command('rebuild_exercise_stats', stdout=io.StringIO())
+        self.assertEqual(self.stats(), incremental)
+
+    def test_volume_and_records_endpoints(self):
+        response = self.client.get(reverse('stats-volume'), {'exercise': 'Squat', 'date_from': '2024-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['volume'], '860.00')
+        response = self.client.get(reverse('stats-records'), {'exercise': ' squat'})
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(self.client.get(reverse('stats-volume'), {'exercise': 'Lunge'}).data, [])
+        response = self.client.get(reverse('stats-records'))
+        self.assertEqual(response.data[0]['best_estimated_1rm'], '132.00')
+        self.assertEqual(response.data[0]['last_trained'], '2024-01-01')
+
+
+@unittest.skipIf(analytics.np is None, "NumPy is not installed")
+class ProgressionAnalyticsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='analyst', email='analyst@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        for day, sets in (('2024-01-01', [(5, 100), (1, 110)]), ('2024-01-03', [(5, 90)]), ('2024-01-10', [(3, 120)])):
+            workout = Workout.objects.create(user=self.user, date=day, name='Bench day')
+            exercise = Exercise.objects.create(workout=workout, name='Bench')
+            for number, (reps, weight) in enumerate(sets, 1):
+                Set.objects.create(exercise=exercise, set_number=number, reps=reps, weight=weight)
+        self.url = reverse('analytics-progression')
+
+    def test_progression(self):
+        response = self.client.get(self.url, {'exercise': 'Bench'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        days = response.data['days']
+        self.assertEqual([d['date'] for d in days], ['2024-01-01', '2024-01-03', '2024-01-10'])
+        # Epley: 100 x 5 -> 116.67 beats the 110 single.
+        self.assertEqual([d['best_1rm'] for d in days], [116.67, 105.0, 132.0])
+        self.assertEqual([d['pr'] for d in days], [True, False, True])
+        self.assertEqual([d['volume'] for d in days], [610.0, 450.0, 360.0])
+        # The 10th's window (4th-10th) no longer includes the 3rd.
+        self.assertEqual([d['weekly_volume'] for d in days], [610.0, 1060.0, 360.0])
+        self.assertGreater(response.data['trend']['slope_per_week'], 0)
+
+    def test_failed_attempts_have_no_estimate(self):
+        exercise = Exercise.objects.get(workout__date='2024-01-03')
+        Set.objects.create(exercise=exercise, set_number=2, reps=0, weight=200)
+        workout = Workout.objects.create(user=self.user, date='2024-01-12', name='Bench day')
+        Set.objects.create(exercise=Exercise.objects.create(workout=workout, name='Bench'), set_number=1, reps=0, weight=200)
+        days = self.client.get(self.url, {'exercise': 'Bench'}).data['days']
+        self.assertEqual([d['best_1rm'] for d in days], [116.67, 105.0, 132.0, None])
+        self.assertEqual([d['pr'] for d in days], [True, False, True, False])
+
+    def test_brzycki_and_validation(self):
+        response = self.client.get(self.url, {'exercise': 'Bench', 'formula': 'brzycki'})
+        self.assertEqual(response.data['days'][0]['best_1rm'], 112.5)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        empty = self.client.get(self.url, {'exercise': 'Squat'})
+        self.assertEqual(empty.data['days'], [])
+        self.assertIsNone(empty.data['trend'])
+
+
+class ExerciseCatalogTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cataloguser', email='catalog@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.workout = Workout.objects.create(user=self.user, date='2024-01-01', name='Catalog')
+
+    def test_names_resolve_case_insensitively(self):
+        first = Exercise.objects.create(workout=self.workout, name='bench press')
+        second = Exercise.objects.create(workout=self.workout, name='BENCH PRESS ')
+        self.assertEqual(first.exercise_type_id, second.exercise_type_id)
+        self.assertIsNone(first.exercise_type.user_id)  # the global entry
+
+        own = Exercise.objects.create(workout=self.workout, name='Zercher Squat')
+        self.assertEqual(own.exercise_type.user_id, self.user.id)
+        other = User.objects.create_user(username='cataloguser2', email='catalog2@example.com', password='testpass')
+        theirs = Exercise.objects.create(
+            workout=Workout.objects.create(user=other, date='2024-01-01'), name='zercher squat'
+        )
+        self.assertNotEqual(theirs.exercise_type_id, own.exercise_type_id)
+
+    def test_non_ascii_names_resolve(self):
+        first = Exercise.objects.create(workout=self.workout, name='Écarté')
+        second = Exercise.objects.create(workout=self.workout, name='ÉCARTÉ')
+        self.assertEqual(first.exercise_type_id, second.exercise_type_id)
+        payload = {"date": "2024-01-02", "exercises": [{"name": "écarté"}, {"name": "Über Row"}]}
+        response = self.client.post(reverse('workout-list-create'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        types = Exercise.objects.filter(workout_id=response.data['id']).order_by('id').values_list('exercise_type', flat=True)
+        self.assertEqual(types[0], first.exercise_type_id)
+        self.assertEqual(ExerciseType.objects.get(pk=types[1]).key, 'über row')
+
+    def test_api_writes_and_renames_set_the_type(self):
+        payload = {"date": "2024-01-02", "exercises": [{"name": "Squat"}, {"name": "squat"}]}
+        response = self.client.post(reverse('workout-list-create'), payload, format='json')
+        exercises = Exercise.objects.filter(workout_id=response.data['id'])
+        self.assertEqual(len({e.exercise_type_id for e in exercises}), 1)
+
+        response = self.client.patch(
+            reverse('exercise-detail', args=[exercises[0].id]), {"name": "Deadlift"}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ExerciseType.objects.get(pk=response.data['exercise_type']).name, 'Deadlift')
+
+    def test_deleting_a_user_removes_their_own_types(self):
+        own = Exercise.objects.create(workout=self.workout, name='Weird Thing').exercise_type
+        squat = Exercise.objects.create(workout=self.workout, name='Squat').exercise_type
+        with self.assertRaises(RestrictedError):
+            own.delete()
+        self.user.delete()
+        self.assertFalse(ExerciseType.objects.filter(pk=own.pk).exists())
+        self.assertTrue(ExerciseType.objects.filter(pk=squat.pk).exists())
+        self.assertFalse(Exercise.objects.exists())
+
+    @override_settings(EXERCISE_TYPE_CACHE_SIZE=100)
+    def test_resolution_is_cached_after_commit(self):
+        catalog.clear()
+        self.addCleanup(catalog.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            ExerciseType.objects.resolve(self.user.id, ['Plank'])
+        with self.assertNumQueries(0):
+            resolved = ExerciseType.objects.resolve(self.user.id, ['plank'])
+        self.assertEqual(ExerciseType.objects.get(pk=resolved['plank']).name, 'Plank')
+
+
+class FullTextSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher', email='search@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.notes_only = Workout.objects.create(
+            user=self.user, date='2024-01-01', name='Morning', notes='Felt strong on deadlifts today'
+        )
+        self.named = Workout.objects.create(user=self.user, date='2024-01-02', name='Deadlift day')
+        self.by_exercise = Workout.objects.create(user=self.user, date='2024-01-03', name='Pull')
+        Exercise.objects.create(workout=self.by_exercise, name='Romanian Deadlift')
+        self.unrelated = Workout.objects.create(user=self.user, date='2024-01-04', name='Push', notes='bench only')
+        other = User.objects.create_user(username='searcher2', email='search2@example.com', password='testpass')
+        Workout.objects.create(user=other, date='2024-01-01', name='Deadlift day')
+        self.url = reverse('workout-list-create')
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [w['id'] for w in response.data['results']]
+
+    def test_matches_name_notes_and_exercises_ranked(self):
+        ids = self.search(search='deadlift')
+        self.assertEqual(set(ids), {self.notes_only.id, self.named.id, self.by_exercise.id})
+        # A name hit outranks the same word buried in the notes.
+        self.assertEqual(ids[0], self.named.id)
+        self.assertEqual(ids[-1], self.notes_only.id)
+
+    def test_prefix_terms_and_explicit_ordering(self):
+        self.assertEqual(self.search(search='romanian dead'), [self.by_exercise.id])
+        self.assertEqual(
+            self.search(search='deadl', ordering='date'),
+            [self.notes_only.id, self.named.id, self.by_exercise.id],
+        )
+
+    def test_index_follows_writes(self):
+        self.unrelated.notes = 'bench, then deadlifts'
+        self.unrelated.save()
+        self.assertIn(self.unrelated.id, self.search(search='deadlift'))
+        Exercise.objects.filter(workout=self.by_exercise).update(name='Good Morning')
+        self.assertNotIn(self.by_exercise.id, self.search(search='deadlift'))
+        self.named.delete()
+        self.assertNotIn(self.named.id, self.search(search='deadlift'))
+
+    def test_syntax_is_not_passed_through(self):
+        self.assertEqual(self.search(search='"deadlift* ('), [self.named.id, self.by_exercise.id, self.notes_only.id])
+        self.assertEqual(len(self.search(search='!!!')), 4)
+
+    def test_keyset_pages_through_ranked_results(self):
+        first = self.client.get(self.url, {'search': 'deadlift', 'pagination': 'cursor', 'page_size': 2}).data
+        second = self.client.get(first['next']).data
+        ids = [w['id'] for w in first['results'] + second['results']]
+        self.assertEqual(ids, self.search(search='deadlift'))
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite connection setup')
+class SQLitePragmaTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_connections_run_with_configured_pragmas(self):
+        verify_pragmas(connection, settings.SQLITE_PRAGMAS)
+        with self.assertRaisesMessage(ImproperlyConfigured, "synchronous is 1, configured 'full'"):
+            verify_pragmas(connection, {'synchronous': 'full'})
+
+    def test_file_database_uses_wal(self):
+        with tempfile.TemporaryDirectory() as directory:
+            default = connections['default']
+            wrapper = type(default)({**default.settings_dict, 'NAME': os.path.join(directory, 'db.sqlite3')})
+            try:
+                verify_pragmas(wrapper, settings.SQLITE_PRAGMAS)
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+            finally:
+                wrapper.close()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReadReplicaRoutingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='replica', email='replica@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        get_response_cache().clear()
+        self.addCleanup(get_response_cache().clear)
+
+    def test_router_reads_from_replicas_only_when_asked(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Workout))
+        token = use_replicas()
+        try:
+            self.assertEqual(router.db_for_read(Workout), 'replica1')
+            self.assertEqual(router.db_for_write(Workout), 'default')
+        finally:
+            stop_replicas(token)
+        self.assertIsNone(router.db_for_read(Workout))
+        self.assertFalse(router.allow_migrate('replica1', 'workouts'))
+        self.assertIsNone(router.allow_migrate('default', 'workouts'))
+
+    def test_gets_use_replicas_until_the_user_writes(self):
+        url = reverse('workout-list-create')
+        # The test database has no replica alias; stay on the primary but record the choice.
+        with unittest.mock.patch('config.routers.choose_replica', return_value=None) as choose:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            self.assertTrue(choose.called)
+
+            choose.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, {'date': '2024-01-01', 'name': 'Legs'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertFalse(choose.called)
+
+            # Pinned to the primary right after the write.
+            self.assertEqual(len(self.client.get(url).data['results']), 1)
+            self.assertFalse(choose.called)
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'anon': '3/minute', 'login': '2/minute', 'sets': '4/minute'},
+})
+class SlidingWindowThrottleTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'throttle.sqlite3')
+        self.store = SQLiteCounterStore(self.path)
+
+    def check(self, scope, at, method='get', attribute='throttle_scope'):
+        request = Request(getattr(APIRequestFactory(), method)('/'))
+        request.user = AnonymousUser()
+        view = type('View', (), {attribute: scope})()
+        throttle = SlidingWindowThrottle()
+        throttle.timer = lambda: at
+        with unittest.mock.patch('config.throttling.get_store', return_value=self.store):
+            return throttle.allow_request(request, view), throttle
+
+    def test_scopes_have_their_own_limits(self):
+        self.assertEqual([self.check('login', 10)[0] for _ in range(3)], [True, True, False])
+        self.assertEqual([self.check('sets', 10)[0] for _ in range(5)], [True] * 4 + [False])
+        self.assertEqual([self.check(None, 10)[0] for _ in range(4)], [True] * 3 + [False])
+
+    def test_previous_window_weighs_in(self):
+        for _ in range(4):
+            self.assertTrue(self.check('sets', 50)[0])
+        # 10s into the next window: 4 * 5/6 + 1 > 4.
+        allowed, throttle = self.check('sets', 70)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 5)
+        # 50s in: 4 * 1/6 + 2 (the refused request counts too) + 1.
+        self.assertTrue(self.check('sets', 110)[0])
+
+    def test_write_scopes_leave_reads_alone(self):
+        writes = [self.check('sets', 10, 'post', 'write_throttle_scope')[1].limit for _ in range(2)]
+        reads = [self.check('sets', 10, 'get', 'write_throttle_scope')[1].limit for _ in range(2)]
+        self.assertEqual((writes, reads), ([4, 4], [3, 3]))
+
+    def test_pruning_keeps_other_durations(self):
+        self.assertEqual(self.store.hit('hour', 1, 3600), (0, 1))
+        self.store.hit('minute', 100, 60)
+        # Minute windows 101 and 102 prune; the hour counter lives until 10800s.
+        self.store.hit('minute', 101, 60)
+        self.store.hit('minute', 102, 60)
+        self.assertEqual(self.store.hit('hour', 1, 3600), (0, 2))
+        keys = self.store.connection().execute('SELECT key FROM throttle_counter ORDER BY key').fetchall()
+        self.assertEqual(keys, [('hour:1',), ('minute:101',), ('minute:102',)])
+
+    def test_counters_are_shared_between_stores(self):
+        other = SQLiteCounterStore(self.path)
+        self.assertEqual(self.store.hit('k', 7, 60), (0, 1))
+        self.assertEqual(other.hit('k', 7, 60), (0, 2))
+        self.assertEqual(other.hit('k', 8, 60), (2, 1))
+        cache_store = CacheCounterStore('throttle')
+        self.addCleanup(caches['throttle'].clear)
+        self.assertEqual([cache_store.hit('k', 7, 60) for _ in range(2)], [(0, 1), (0, 2)])
+        self.assertEqual(cache_store.hit('k', 8, 60), (2, 1))
+
+
+
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='asyncuser', email='asyncuser@example.com', password='testpass')
+        other = User.objects.create_user(username='asyncother', email='asyncother@example.com', password='testpass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        for day in range(1, 13):
+            workout = Workout.objects.create(user=self.user, date=date(2024, 1, day), name=f"Day {day}", notes="Heavy legs")
+            exercise = Exercise.objects.create(workout=workout, name='Squat' if day % 2 else 'Bench')
+            Set.objects.create(exercise=exercise, set_number=1, reps=5, weight=100 + day)
+        self.other_workout = Workout.objects.create(user=other, date=date(2024, 1, 1), name="Theirs")
+
+    def assertSameAsSync(self, sync_url, async_url):
+        expected, actual = self.client.get(sync_url), self.client.get(async_url)
+        self.assertEqual(actual.status_code, expected.status_code)
+        # Pagination links differ by path only.
+        self.assertEqual(actual.content.replace(b'/api/async/', b'/api/'), expected.content)
+        return actual
+
+    def test_lists_match_sync_views(self):
+        for name in ('workout', 'exercise', 'set'):
+            sync_url = reverse('workout-list-create' if name == 'workout' else f'{name}-list-create')
+            async_url = reverse(f'async-{name}-list')
+            self.assertSameAsSync(sync_url, async_url)
+            self.assertSameAsSync(sync_url + '?page=2&page_size=5&fields=id', async_url + '?page=2&page_size=5&fields=id')
+        self.assertSameAsSync(reverse('workout-list-create') + '?search=legs&ordering=name', reverse('async-workout-list') + '?search=legs&ordering=name')
+        self.assertSameAsSync(reverse('exercise-list-create') + '?expand=workout&name=Squat', reverse('async-exercise-list') + '?expand=workout&name=Squat')
+        type_id = Exercise.objects.filter(name='Bench').values_list('exercise_type_id', flat=True)[0]
+        response = self.client.get(reverse('async-exercise-list') + f'?exercise_type={type_id}')
+        self.assertEqual(response.json()['count'], 6)
+
+    def test_keyset_pages(self):
+        url, seen = reverse('async-workout-list') + '?pagination=cursor&page_size=5', []
+        while url:
+            page = self.client.get(url).json()
+            seen.extend(item['id'] for item in page['results'])
+            url = page['next']
+        self.assertEqual(seen, list(Workout.objects.filter(user=self.user).order_by('-date', 'id').values_list('id', flat=True)))
+
+    def test_detail(self):
+        workout = Workout.objects.filter(user=self.user).first()
+        self.assertSameAsSync(reverse('workout-detail', args=[workout.id]), reverse('async-workout-detail', args=[workout.id]))
+        exercise = workout.exercises.first()
+        self.assertSameAsSync(reverse('exercise-detail', args=[exercise.id]), reverse('async-exercise-detail', args=[exercise.id]))
+        self.assertSameAsSync(reverse('set-detail', args=[exercise.sets.first().id]), reverse('async-set-detail', args=[exercise.sets.first().id]))
+        response = self.assertSameAsSync(
+            reverse('workout-detail', args=[self.other_workout.id]), reverse('async-workout-detail', args=[self.other_workout.id])
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_authentication_and_methods(self):
+        url = reverse('async-workout-list')
+        self.assertEqual(self.client.post(url, {}, format='json').status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.client.credentials()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.is_active = False
+        self.user.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_sync_checks_run_off_the_event_loop(self):
+        on_loop = {}
+
+        def running_loop():
+            try:
+                return asyncio.get_running_loop() is not None
+            except RuntimeError:
+                return False
+
+        class RecordingThrottle(SlidingWindowThrottle):
+            def allow_request(self, request, view):
+                on_loop['throttle'] = running_loop()
+                return True
+
+        def pinned(user_id):
+            on_loop['pin'] = running_loop()
+            return False
+
+        with unittest.mock.patch.object(async_views.AsyncWorkoutListAPIView, 'throttle_classes', [RecordingThrottle]), \
+                unittest.mock.patch.object(async_views, 'pinned_to_primary', pinned):
+            self.assertEqual(self.client.get(reverse('async-workout-list')).status_code, status.HTTP_200_OK)
+        self.assertEqual(on_loop, {'throttle': False, 'pin': False})
+
+
+@override_settings(METRICS_SAMPLE_RATE=1, METRICS_TOKEN='scrape-me')
+class MetricsTests(APITestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.user = User.objects.create_user(username='metricsuser', email='metrics@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        workout = Workout.objects.create(user=self.user, date=date(2024, 1, 1), name="Legs")
+        Exercise.objects.create(workout=workout, name='Squat')
+
+    def scrape(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.content.decode()
+
+    def test_records_per_url_name(self):
+        for _ in range(2):
+            self.client.get(reverse('workout-list-create'))
+        body = self.scrape()
+        labels = 'view="workout-list-create",method="GET"'
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 2', body)
+        self.assertIn(f'http_response_serialize_seconds_count{{{labels}}} 2', body)
+        self.assertIn(f'http_response_render_seconds_count{{{labels}}} 2', body)
+        # Validators, COUNT, workouts, exercises, sets.
+        self.assertIn(f'http_request_db_queries_sum{{{labels}}} 10', body)
+        self.assertIn(f'http_request_db_queries_bucket{{{labels},le="5"}} 2', body)
+        self.assertIn(f'http_request_db_queries_bucket{{{labels},le="3"}} 0', body)
+        self.assertRegex(body, rf'http_response_size_bytes_sum{{{labels}}} [1-9]')
+
+    def test_serialization_is_timed_once_per_response(self):
+        workout = Workout.objects.get(user=self.user)
+        with unittest.mock.patch('config.metrics.time.perf_counter', side_effect=itertools.count()):
+            self.client.get(reverse('workout-detail', args=[workout.pk]))
+        self.client.get(reverse('workout-list-create') + '?fields=id,exercises')
+        self.client.get(reverse('async-workout-list'))
+        body = self.scrape()
+        for view in ('workout-detail', 'workout-list-create', 'async-workout-list'):
+            self.assertIn(f'http_response_serialize_seconds_count{{view="{view}",method="GET"}} 1', body)
+        # One tick in and one out, for a workout with a nested exercise.
+        self.assertIn('http_response_serialize_seconds_sum{view="workout-detail",method="GET"} 1.0', body)
+
+    def test_unsampled_requests_are_only_timed(self):
+        with override_settings(METRICS_SAMPLE_RATE=0):
+            self.client.get(reverse('workout-list-create'))
+        body = self.scrape()
+        self.assertIn('http_request_duration_seconds_count{view="workout-list-create",method="GET"} 1', body)
+        self.assertNotIn('http_request_db_queries_count{view="workout-list-create"', body)
+
+    def test_endpoint_is_protected(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(
+            self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, status.HTTP_401_UNAUTHORIZED
+        )
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(
+                self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, status.HTTP_404_NOT_FOUND
+            )
+
+
+class NPlusOneDetectionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='nplusone', email='nplusone@example.com', password='testpass')
+        for day in range(1, 5):
+            workout = Workout.objects.create(user=self.user, date=date(2024, 1, day), name=f"Day {day}")
+            exercise = Exercise.objects.create(workout=workout, name='Squat')
+            for n in range(1, 3):
+                Set.objects.create(exercise=exercise, set_number=n, reps=5, weight=100)
+
+    def test_fingerprint_ignores_parameters(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE a = 1 AND b IN (%s, %s) AND c = \'x\''),
+            fingerprint('SELECT * FROM t WHERE a = 22 AND b IN (%s, %s, %s) AND c = \'y\''),
+        )
+
+    def test_detects_lazy_loads_in_a_loop(self):
+        with self.assertRaises(self.failureException) as ctx:
+            with self.assertNoNPlusOne():
+                [str(s) for s in Set.objects.all()]
+        self.assertIn('workouts_exercise', str(ctx.exception))
+        self.assertIn('tests.py', str(ctx.exception))
+        with self.assertNoNPlusOne():
+            [str(s) for s in Set.objects.select_related('exercise')]
+            [str(w) for w in Workout.objects.select_related('user')]
+
+    def test_admin_pages(self):
+        self.client.force_login(self.user)
+        exercise = Exercise.objects.first()
+        for url in (
+            reverse('admin:workouts_workout_changelist'),
+            reverse('admin:workouts_exercise_changelist'),
+            reverse('admin:workouts_set_changelist'),
+            reverse('admin:workouts_exercise_change', args=[exercise.id]),
+            reverse('admin:workouts_set_change', args=[exercise.sets.first().id]),
+            reverse('admin:workouts_workout_delete', args=[exercise.workout_id]),
+        ):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK, url)
+
+    def test_staging_mode_logs(self):
+        with override_settings(NPLUSONE_MODE='log'), self.assertLogs('config.nplusone', 'WARNING') as logs:
+            with unittest.mock.patch.object(SetInline, 'get_queryset', admin.TabularInline.get_queryset):
+                client = APIClient()
+                client.force_login(self.user)
+                exercise = Exercise.objects.first()
+                response = client.get(reverse('admin:workouts_exercise_change', args=[exercise.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('self.exercise.name', logs.output[0])
+
+
+class GenerateDatasetTests(APITestCase):
+    def test_generates_histories_that_log_in(self):
+        out = io.StringIO()
+        call_command('generate_dataset', users=2, years=0.25, days_per_week=3, prefix='gen', stdout=out)
+        self.assertIn('Created 2 users', out.getvalue())
+        user = User.objects.get(username='gen1')
+        workouts = Workout.objects.filter(user=user)
+        self.assertTrue(12 <= workouts.count() <= 42)
+        self.assertEqual(len({workout.date.weekday() for workout in workouts}), 3)
+        exercises = Exercise.objects.filter(user=user)
+        self.assertFalse(exercises.filter(exercise_type__isnull=True).exists())
+        self.assertEqual(Set.objects.filter(user=user).count(), exercises.count() * 4)
+        self.assertTrue(ExerciseDailyStat.objects.filter(user=user).exists())
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'gen1', 'password': 'bench-password'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertRaisesMessage(CommandError, 'already exist'):
+            call_command('generate_dataset', users=1, prefix='gen', stdout=out)
+
+
+class LeanListTests(APITestCase):
+    """Plain list requests are rendered from values() rows; `?fields=` takes the serializer path."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='leanuser', email='lean@example.com', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        for day in range(1, 4):
+            self.client.post(reverse('workout-list-create'), {
+                "date": f"2024-01-0{day}", "name": f"Push day {day}", "notes": "Felt\u2028strong",
+                "exercises": [
+                    {"name": "Bench Press", "sets": [{"set_number": 1, "reps": 5, "weight": "82.5"}]},
+                    {"name": "Dip", "sets": [
+                        {"set_number": 2, "reps": 8, "weight": 0}, {"set_number": 1, "reps": 10, "weight": "10.25"},
+                    ]},
+                ],
+            }, format='json')
+        Workout.objects.create(user=self.user, date=date(2024, 1, 9), name='Rest')
+
+    def assertSameAsSerializer(self, name, serializer_class, **params):
+        fields = ','.join(serializer_class().fields)
+        lean = self.client.get(reverse(name), params)
+        regular = self.client.get(reverse(name), {**params, 'fields': fields})
+        self.assertEqual(lean.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(lean.content)['results'], json.loads(regular.content)['results'])
+        return lean
+
+    def test_lists_match_the_serializers(self):
+        response = self.assertSameAsSerializer('workout-list-create', views.WorkoutSerializer)
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertEqual(response.data['results'][1]['exercises'][1]['sets'][0]['set_number'], 1)
+        self.assertIn(b'\\u2028', response.content)
+        self.assertSameAsSerializer('workout-list-create', views.WorkoutSerializer, search='push', ordering='name')
+        self.assertSameAsSerializer('exercise-list-create', views.ExerciseSerializer, page_size=100)
+        self.assertSameAsSerializer('set-list-create', views.SetSerializer, ordering='weight')
+
+    def test_cursor_pages(self):
+        url, seen = reverse('workout-list-create') + '?pagination=cursor&page_size=3', []
+        while url:
+            response = self.client.get(url)
+            seen += [workout['id'] for workout in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, list(Workout.objects.order_by('-date', 'id').values_list('id', flat=True)))
+
+    def test_query_count(self):
+        self.client.get(reverse('workout-list-create'))
+        # Validators, COUNT, workouts, exercises, sets.
+        with self.assertNumQueries(5):
+            self.client.get(reverse('workout-list-create'))
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    DATA = {
+        'weight': Decimal('82.50'),
+        'date': date(2024, 1, 2),
+        'utc': datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+        'local': timezone.localtime(datetime(2024, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc)),
+        'text': 'línea nueva',
+        'nested': [{'id': 1, 'error': ErrorDetail('Nope.', code='invalid')}],
+        3: None,
+    }
+
+    def test_matches_drf(self):
+        # Decimals as DecimalField renders them; DRF's encoder would write a float.
+        expected = JSONRenderer().render({**self.DATA, 'weight': '82.50'})
+        self.assertEqual(FastJSONRenderer().render(self.DATA), expected)
+        with unittest.mock.patch('config.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.DATA), expected)
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'COERCE_DECIMAL_TO_STRING': False}):
+            self.assertIn(b'"weight":82.5', FastJSONRenderer().render(self.DATA))
+
+    def test_indent(self):
+        self.assertEqual(
+            FastJSONRenderer().render({'a': [1]}, 'application/json; indent=4'),
+            JSONRenderer().render({'a': [1]}, 'application/json; indent=4'),
+        )
+        self.assertEqual(json.loads(FastJSONRenderer().render({'a': [1]}, 'application/json; indent=2')), {'a': [1]})
+
+    def test_parser(self):
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO('{"name": "Café", "weight": 82.5}'.encode())), {'name': 'Café', 'weight': 82.5})
+        with self.assertRaisesMessage(ParseError, 'JSON parse error'):
+            parser.parse(io.BytesIO(b'{"name": '))
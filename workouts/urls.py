@@ -6,6 +6,22 @@ from .views import (
     ExerciseRetrieveUpdateDestroyAPIView,
     SetListCreateAPIView,
     SetRetrieveUpdateDestroyAPIView,
+    SetBatchAPIView,
+    ResponseCacheStatsView,
+    SyncAPIView,
+    ExportAPIView,
+    ImportAPIView,
+    ExerciseVolumeView,
+    PersonalRecordsView,
+    ProgressionAnalyticsView,
+    )
+from .async_views import (
+    AsyncWorkoutListAPIView,
+    AsyncWorkoutRetrieveAPIView,
+    AsyncExerciseListAPIView,
+    AsyncExerciseRetrieveAPIView,
+    AsyncSetListAPIView,
+    AsyncSetRetrieveAPIView,
     )
 
 urlpatterns = [
@@ -14,5 +30,20 @@ urlpatterns = [
     path('exercises/', ExerciseListCreateAPIView.as_view(), name='exercise-list-create'),
     path('exercises/<int:pk>/', ExerciseRetrieveUpdateDestroyAPIView.as_view(), name='exercise-detail'),
     path('sets/', SetListCreateAPIView.as_view(), name='set-list-create'),
+    path('sets/batch/', SetBatchAPIView.as_view(), name='set-batch'),
     path('sets/<int:pk>/', SetRetrieveUpdateDestroyAPIView.as_view(), name='set-detail'),
+    path('sync/', SyncAPIView.as_view(), name='sync'),
+    path('export/', ExportAPIView.as_view(), name='export'),
+    path('import/', ImportAPIView.as_view(), name='import'),
+    path('stats/volume/', ExerciseVolumeView.as_view(), name='stats-volume'),
+    path('stats/records/', PersonalRecordsView.as_view(), name='stats-records'),
+    path('analytics/progression/', ProgressionAnalyticsView.as_view(), name='analytics-progression'),
+    path('cache/stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
+    # Read-only async counterparts, for ASGI deployments (see async_views).
+    path('async/workouts/', AsyncWorkoutListAPIView.as_view(), name='async-workout-list'),
+    path('async/workouts/<int:pk>/', AsyncWorkoutRetrieveAPIView.as_view(), name='async-workout-detail'),
+    path('async/exercises/', AsyncExerciseListAPIView.as_view(), name='async-exercise-list'),
+    path('async/exercises/<int:pk>/', AsyncExerciseRetrieveAPIView.as_view(), name='async-exercise-detail'),
+    path('async/sets/', AsyncSetListAPIView.as_view(), name='async-set-list'),
+    path('async/sets/<int:pk>/', AsyncSetRetrieveAPIView.as_view(), name='async-set-detail'),
 ]
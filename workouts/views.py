@@ -1,72 +1,253 @@
-from rest_framework import generics, permissions, filters
-from .models import Workout, Exercise, Set
-from .serializers import WorkoutSerializer, ExerciseSerializer, SetSerializer
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.cache import patch_vary_headers
+from rest_framework import generics, permissions, filters, status
+from django.db.models import Max, Subquery, Sum
+from .models import Workout, Exercise, ExerciseType, Set, ExerciseDailyStat
+from .serializers import (
+    WorkoutSerializer, ExerciseSerializer, SetSerializer, SetBatchItemSerializer,
+    ExerciseDailyStatSerializer, PersonalRecordSerializer, query_param_set, sets_prefetch,
+    WorkoutValuesSerializer, ExerciseValuesSerializer, SetValuesSerializer,
+)
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from . import analytics
+from .cache import CachedResponseMixin, cache_stats, pinned_to_primary
+from .conditional import ConditionalRequestMixin
+from .export import FORMATS, export_rows, gzip_chunks
+from .importer import ImportFormatError, WorkoutImporter, detect_type, read_rows, text_stream
+from .pagination import StandardResultsSetPagination
+from .search import FullTextSearchFilter
+from .signals import bulk_saved
+from .sync import changes_since, decode_token, encode_token, stream_json
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.settings import api_settings
+from config.metrics import serialization
+from config.routers import stop_replicas, use_replicas
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10              # Number of items per page (you can adjust)
-    page_size_query_param = 'page_size'  # Allow client to override, optional
-    max_page_size = 100         # Max limit for page_size query param
 
-class WorkoutListCreateAPIView(generics.ListCreateAPIView):
+def date_range_params(request):
+    """The `date_from` and `date_to` query parameters that were sent, as dates."""
+    dates = {}
+    for param in ('date_from', 'date_to'):
+        value = request.query_params.get(param)
+        if value:
+            try:
+                dates[param] = parse_date(value)
+            except ValueError:
+                dates[param] = None
+            if dates[param] is None:
+                raise ValidationError({param: ["Use the YYYY-MM-DD format."]})
+    return dates
+
+
+class ReplicaReadMixin:
+    """
+    Runs a GET request's queries against a read replica (config.routers),
+    unless the user has written recently (see workouts.cache.pinned_to_primary).
+    Authentication has already happened by then, against the primary.
+    """
+    replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in permissions.SAFE_METHODS and not pinned_to_primary(request.user.pk):
+            self.replica_token = use_replicas()
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.replica_token is not None:
+                stop_replicas(self.replica_token)
+                self.replica_token = None
+
+
+class SparseQuerysetMixin:
+    """
+    Keeps querysets in line with what `?fields=` and `?expand=` will render
+    (see SparseFieldsetMixin): unrequested relations are not loaded and
+    unrequested heavy columns are deferred.
+    """
+    deferrable_fields = ()
+
+    def wants(self, field):
+        """Whether a relation should be loaded up front for rendering."""
+        if self.request.method not in permissions.SAFE_METHODS:
+            return False
+        fields = query_param_set(self.request, 'fields')
+        return fields is None or field in fields
+
+    def expands(self, field):
+        return self.wants(field) and field in (query_param_set(self.request, 'expand') or set())
+
+    def project(self, queryset):
+        fields = query_param_set(self.request, 'fields')
+        if fields is None:
+            return queryset
+        ordering = query_param_set(self.request, api_settings.ORDERING_PARAM) or set()
+        ordering = {field.lstrip('-') for field in ordering}
+        deferred = [f for f in self.deferrable_fields if f not in fields and f not in ordering]
+        return queryset.defer(*deferred) if deferred else queryset
+
+
+class TimedSerializationMixin:
+    """
+    list() and retrieve() with the response data built under
+    config.metrics.serialization(), so sampled requests account the time
+    spent in serializers once per response.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(queryset if page is None else page, many=True)
+        with serialization():
+            data = serializer.data
+        return Response(data) if page is None else self.get_paginated_response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        with serialization():
+            data = serializer.data
+        return Response(data)
+
+
+class LeanListMixin(TimedSerializationMixin):
+    """
+    Renders plain list requests with `values_serializer_class` (see
+    serializers.ValuesSerializer) from values() rows: the same output
+    without the per-field work. Requests that shape the output with
+    `?fields=` or `?expand=` go through the serializer.
+    """
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.values_serializer_class is None or {'fields', 'expand'} & request.query_params.keys():
+            return super().list(request, *args, **kwargs)
+        serializer = self.values_serializer_class()
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        with serialization():
+            data = serializer.to_representation(queryset if page is None else page)
+        return Response(data) if page is None else self.get_paginated_response(data)
+
+
+class WorkoutQuerysetMixin(SparseQuerysetMixin):
+    deferrable_fields = ('notes', 'created_at', 'updated_at')
+
+    def get_queryset(self):
+        queryset = self.project(Workout.objects.filter(user=self.request.user))
+        if self.wants('exercises'):
+            queryset = queryset.prefetch_related(*WorkoutSerializer.nested_prefetches())
+        return queryset
+
+    def get_validator_querysets(self):
+        user, pk = self.request.user, self.kwargs.get('pk')
+        if pk is None:
+            return [Workout.objects.filter(user=user), Exercise.objects.filter(user=user), Set.objects.filter(user=user)]
+        return [
+            Workout.objects.filter(user=user, pk=pk),
+            Exercise.objects.filter(user=user, workout_id=pk),
+            Set.objects.filter(user=user, exercise__workout_id=pk),
+        ]
+
+
+class ExerciseQuerysetMixin(SparseQuerysetMixin):
+    deferrable_fields = ('created_at', 'updated_at')
+
+    def get_queryset(self):
+        queryset = self.project(Exercise.objects.filter(user=self.request.user))
+        if self.wants('sets'):
+            queryset = queryset.prefetch_related(sets_prefetch())
+        if self.expands('workout'):
+            queryset = queryset.select_related('workout')
+        return queryset
+
+    def get_validator_querysets(self):
+        user, pk = self.request.user, self.kwargs.get('pk')
+        if pk is None:
+            querysets = [Exercise.objects.filter(user=user), Set.objects.filter(user=user)]
+        else:
+            querysets = [Exercise.objects.filter(user=user, pk=pk), Set.objects.filter(user=user, exercise_id=pk)]
+        if self.expands('workout'):
+            querysets.append(Workout.objects.filter(user=user))
+        return querysets
+
+
+class SetQuerysetMixin(SparseQuerysetMixin):
+    deferrable_fields = ('created_at', 'updated_at')
+
+    def get_queryset(self):
+        queryset = self.project(Set.objects.filter(user=self.request.user))
+        if self.expands('exercise'):
+            queryset = queryset.select_related('exercise')
+        return queryset
+
+    def get_validator_querysets(self):
+        user, pk = self.request.user, self.kwargs.get('pk')
+        querysets = [Set.objects.filter(user=user) if pk is None else Set.objects.filter(user=user, pk=pk)]
+        if self.expands('exercise'):
+            querysets.append(Exercise.objects.filter(user=user))
+        return querysets
+
+
+class WorkoutListCreateAPIView(ReplicaReadMixin, ConditionalRequestMixin, CachedResponseMixin, LeanListMixin, WorkoutQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = WorkoutSerializer
+    values_serializer_class = WorkoutValuesSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
+    filter_backends = [DjangoFilterBackend, OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['date', 'name']  # You can filter by date or name
     ordering_fields = ['date', 'name', 'created_at']  # You can order by these
-    ordering = ['-date']  # Default ordering
-
-    def get_queryset(self):
-        return Workout.objects.filter(user=self.request.user).prefetch_related('exercises')
+    ordering = ['-date', 'id']  # Default ordering, id keeps it stable for keyset pages
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class WorkoutRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+class WorkoutRetrieveUpdateDestroyAPIView(ReplicaReadMixin, ConditionalRequestMixin, CachedResponseMixin, TimedSerializationMixin, WorkoutQuerysetMixin, RetrieveUpdateDestroyAPIView):
     serializer_class = WorkoutSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        return Workout.objects.filter(user=self.request.user)
-
-class ExerciseListCreateAPIView(ListCreateAPIView):
+class ExerciseListCreateAPIView(ReplicaReadMixin, ConditionalRequestMixin, CachedResponseMixin, LeanListMixin, ExerciseQuerysetMixin, ListCreateAPIView):
     serializer_class = ExerciseSerializer
+    values_serializer_class = ExerciseValuesSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
 
     # Use only fields that exist on the Exercise model
-    filterset_fields = ['name']
+    filterset_fields = ['name', 'exercise_type']
     ordering_fields = ['name']
     ordering = ['-id']
 
-    def get_queryset(self):
-        return Exercise.objects.filter(workout__user=self.request.user).select_related('workout')
-
     def perform_create(self, serializer):
         workout = serializer.validated_data.get('workout')
-        if workout.user != self.request.user:
+        if workout.user_id != self.request.user.id:
             raise PermissionDenied("You do not own this workout.")
         serializer.save()
 
 
-class ExerciseRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+class ExerciseRetrieveUpdateDestroyAPIView(ReplicaReadMixin, ConditionalRequestMixin, CachedResponseMixin, TimedSerializationMixin, ExerciseQuerysetMixin, RetrieveUpdateDestroyAPIView):
     serializer_class = ExerciseSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         # Restrict access to exercises belonging to the user's workouts
-        return Exercise.objects.filter(workout__user=self.request.user).select_related('workout').order_by('id')
+        return super().get_queryset().order_by('id')
 
-class SetListCreateAPIView(ListCreateAPIView):
+class SetListCreateAPIView(ReplicaReadMixin, ConditionalRequestMixin, CachedResponseMixin, LeanListMixin, SetQuerysetMixin, ListCreateAPIView):
     serializer_class = SetSerializer
+    values_serializer_class = SetValuesSerializer
     permission_classes = [IsAuthenticated]
+    write_throttle_scope = 'sets'
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
 
@@ -75,19 +256,260 @@ class SetListCreateAPIView(ListCreateAPIView):
     ordering_fields = ['set_number', 'reps', 'weight']
     ordering = ['-id']
 
-    def get_queryset(self):
-        return Set.objects.filter(exercise__workout__user=self.request.user).select_related('exercise', 'exercise__workout')
-
     def perform_create(self, serializer):
         exercise = serializer.validated_data.get('exercise')
-        if exercise.workout.user != self.request.user:
+        if exercise.user_id != self.request.user.id:
             raise PermissionDenied("You do not own this exercise.")
         serializer.save()
 
 
-class SetRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+class SetRetrieveUpdateDestroyAPIView(ReplicaReadMixin, ConditionalRequestMixin, CachedResponseMixin, TimedSerializationMixin, SetQuerysetMixin, RetrieveUpdateDestroyAPIView):
     serializer_class = SetSerializer
     permission_classes = [IsAuthenticated]
+    write_throttle_scope = 'sets'
 
     def get_queryset(self):
-        return Set.objects.filter(exercise__workout__user=self.request.user).select_related('exercise', 'exercise__workout').order_by('id')
+        return super().get_queryset().order_by('id')
+
+
+class SetBatchAPIView(generics.GenericAPIView):
+    """
+    Create or update many sets in one request.
+
+    The body is a list of set payloads; entries with an `id` update that set,
+    the rest are created. Every entry gets a result in request order, and
+    invalid entries do not stop the valid ones from being written.
+    """
+    serializer_class = SetBatchItemSerializer
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'sets'
+    max_batch_size = 500
+
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError("Expected a list of sets.")
+        if len(items) > self.max_batch_size:
+            raise ValidationError(f"A batch can contain at most {self.max_batch_size} sets.")
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = self.error_result(index, serializer.errors)
+
+        user = request.user
+        owned_exercises = set(
+            Exercise.objects.filter(user=user, id__in={data['exercise_id'] for _, data in valid})
+            .values_list('id', flat=True)
+        )
+        existing_sets = Set.objects.filter(user=user, id__in=[data['id'] for _, data in valid if 'id' in data]).in_bulk()
+
+        now = timezone.now()
+        to_create, to_update, seen_ids = [], [], set()
+        for index, data in valid:
+            set_id = data.pop('id', None)
+            if data['exercise_id'] not in owned_exercises:
+                results[index] = self.error_result(index, {'exercise': ["You do not own this exercise."]})
+            elif set_id is None:
+                to_create.append((index, Set(user_id=user.id, **data)))
+            elif set_id not in existing_sets or set_id in seen_ids:
+                reason = "Set not found." if set_id not in existing_sets else "Set appears more than once in this batch."
+                results[index] = self.error_result(index, {'id': [reason]})
+            else:
+                seen_ids.add(set_id)
+                obj = existing_sets[set_id]
+                for attr, value in data.items():
+                    setattr(obj, attr, value)
+                obj.updated_at = now  # bulk_update skips auto_now
+                to_update.append((index, obj))
+
+        with transaction.atomic():
+            if to_create:
+                Set.objects.bulk_create([obj for _, obj in to_create])
+            if to_update:
+                Set.objects.bulk_update(
+                    [obj for _, obj in to_update],
+                    ['exercise', 'set_number', 'reps', 'weight', 'updated_at'],
+                )
+            written = [obj for _, obj in to_create + to_update]
+            if written:
+                bulk_saved.send(sender=Set, objs=written)
+
+        for outcome, written in (('created', to_create), ('updated', to_update)):
+            for index, obj in written:
+                results[index] = {'index': index, 'status': outcome, 'data': SetSerializer(obj).data}
+
+        failed = any(result['status'] == 'error' for result in results)
+        return Response(
+            {'results': results},
+            status=status.HTTP_207_MULTI_STATUS if failed else status.HTTP_200_OK,
+        )
+
+    @staticmethod
+    def error_result(index, errors):
+        return {'index': index, 'status': 'error', 'errors': errors}
+
+
+class ResponseCacheStatsView(APIView):
+    """Hit/miss counters of this process's response cache."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats())
+
+
+class SyncAPIView(APIView):
+    """
+    Delta sync: `GET /api/sync/?since=<token>` streams the workouts, exercises
+    and sets changed after the token, tombstones for deleted rows, and the
+    token to send next time. Without `since` the whole history is returned.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        since = None
+        token = request.query_params.get('since')
+        if token:
+            try:
+                since = decode_token(token)
+            except ValueError:
+                raise ValidationError({'since': ["Invalid sync token."]})
+        # Taken before reading so nothing written during the sync is skipped.
+        next_token = encode_token(timezone.now())
+        return StreamingHttpResponse(
+            stream_json(next_token, changes_since(request.user, since)),
+            content_type='application/json',
+        )
+
+
+class ExportAPIView(APIView):
+    """
+    Streams the user's sets, joined with their exercise and workout, as CSV
+    (default) or NDJSON: `GET /api/export/?type=ndjson&date_from=2024-01-01`.
+    The body is gzipped on the fly when the client accepts it.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # `format` is taken by DRF's renderer override, hence `type`.
+        export_type = request.query_params.get('type', 'csv')
+        if export_type not in FORMATS:
+            raise ValidationError({'type': [f"Choose one of: {', '.join(FORMATS)}."]})
+        to_chunks, content_type = FORMATS[export_type]
+        chunks = to_chunks(export_rows(request.user, **date_range_params(request)))
+        gzipped = 'gzip' in request.headers.get('Accept-Encoding', '')
+        response = StreamingHttpResponse(
+            gzip_chunks(chunks) if gzipped else chunks, content_type=content_type
+        )
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        response['Content-Disposition'] = f'attachment; filename="workouts.{export_type}"'
+        return response
+
+
+class ImportAPIView(APIView):
+    """
+    Upload a CSV or NDJSON history file as `file` (multipart). The file is
+    imported in committed chunks; the response reports what was written, the
+    invalid rows, and `committed_rows` to pass back as `start_row` if a chunk
+    failed.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': ["No file was submitted."]})
+        try:
+            start_row = max(int(request.data.get('start_row', 0)), 0)
+        except (TypeError, ValueError):
+            raise ValidationError({'start_row': ["A valid integer is required."]})
+        file_type = request.data.get('type') or detect_type(upload.name)
+        try:
+            rows = read_rows(text_stream(upload.file), file_type)
+            result = WorkoutImporter(request.user).run(rows, start_row=start_row)
+        except (ImportFormatError, UnicodeDecodeError) as exc:
+            raise ValidationError({'file': [str(exc)]})
+        return Response(
+            result.as_dict(),
+            status=status.HTTP_207_MULTI_STATUS if result.error_count else status.HTTP_200_OK,
+        )
+
+
+class ExerciseStatsMixin:
+    permission_classes = [IsAuthenticated]
+
+    def get_stats(self):
+        stats = ExerciseDailyStat.objects.filter(user=self.request.user)
+        exercise = self.request.query_params.get('exercise')
+        if exercise:
+            # Through the catalog, like the analytics: stats carry its names.
+            type_id = ExerciseType.objects.resolve(self.request.user.id, [exercise], create=False).get(exercise)
+            stats = stats.filter(exercise_name=Subquery(ExerciseType.objects.filter(pk=type_id).values('name')))
+        dates = date_range_params(self.request)
+        if 'date_from' in dates:
+            stats = stats.filter(date__gte=dates['date_from'])
+        if 'date_to' in dates:
+            stats = stats.filter(date__lte=dates['date_to'])
+        return stats
+
+
+class ExerciseVolumeView(ReplicaReadMixin, ExerciseStatsMixin, TimedSerializationMixin, generics.ListAPIView):
+    """
+    Per-day volume, top weight and estimated 1RM for charts, read from the
+    precomputed daily stats. Filter with `exercise`, `date_from` and `date_to`.
+    """
+    serializer_class = ExerciseDailyStatSerializer
+    pagination_class = None  # a chart wants the whole range; rows are per day
+    filter_backends = []
+
+    def get_queryset(self):
+        return self.get_stats().order_by('date', 'exercise_name')
+
+
+class PersonalRecordsView(ReplicaReadMixin, ExerciseStatsMixin, APIView):
+    """Best top weight, estimated 1RM and daily volume per exercise."""
+
+    def get(self, request):
+        records = self.get_stats().values('exercise_name').annotate(
+            best_weight=Max('top_weight'),
+            best_estimated_1rm=Max('estimated_1rm'),
+            best_volume=Max('volume'),
+            total_sets=Sum('set_count'),
+            last_trained=Max('date'),
+        ).order_by('exercise_name')
+        with serialization():
+            data = PersonalRecordSerializer(records, many=True).data
+        return Response(data)
+
+
+class ProgressionAnalyticsView(ReplicaReadMixin, APIView):
+    """
+    `GET /api/analytics/progression/?exercise=Bench Press` returns, per
+    training day, the best estimated 1RM (`formula=epley|brzycki`), volume,
+    trailing 7-day volume and PR flag, plus a linear trend of the daily best.
+    Accepts `date_from` and `date_to`.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if analytics.np is None:
+            raise analytics.AnalyticsUnavailable()
+        exercise = request.query_params.get('exercise')
+        if not exercise:
+            raise ValidationError({'exercise': ["This parameter is required."]})
+        formula = request.query_params.get('formula', 'epley')
+        if formula not in analytics.FORMULAS:
+            raise ValidationError({'formula': [f"Choose one of: {', '.join(analytics.FORMULAS)}."]})
+        columns = analytics.load_columns(request.user, exercise, **date_range_params(request))
+        return Response({
+            'exercise': exercise,
+            'formula': formula,
+            **analytics.progression(*columns, formula=formula),
+        })